@@ -13,20 +13,36 @@ import tempfile
 import os
 import re
 import zipfile
-import pandas as pd
 from datetime import datetime
-from docx import Document
 import json
 import shutil
 from pathlib import Path
 import threading
-from io import BytesIO
+from io import StringIO
+import csv
 import base64
 import time
 import glob
 import platform
 import traceback
-from typing import Dict, List, Tuple, Optional, Any
+from collections import deque
+from typing import Dict, Tuple, Optional, Any
+from docxreplace_engine import (DocumentProcessor, run_documents, run_archive, count_archive_documents,
+                                directory_fingerprint, build_result_archive,
+                                timing_rows, regex_risk_warnings,
+                                DOCX_ENGINE, DOCX_REWRITE_ENGINE, XML_ENGINE, ARCHIVE_COMPRESSION,
+                                DEFAULT_REGEX_BUDGET, PIPELINE_MAX_BYTES)
+from docxreplace_cache import ResultCache, DEFAULT_CACHE_PATH
+from docxreplace_loaders import FileManifest, scan_folder, read_excel_paths, DEFAULT_INCLUDE, DEFAULT_EXCLUDE
+from docxreplace_jobs import start_job, get_job, PAUSED
+from docxreplace_journal import RunJournal, new_journal_path, interrupted_journals
+
+# Console ring buffer size, lines shown, and the minimum gap between console redraws
+CONSOLE_BUFFER_LINES = 200
+CONSOLE_DISPLAY_LINES = 20
+CONSOLE_RENDER_INTERVAL = 0.25
+# How often the page refreshes while a background job runs
+JOB_POLL_INTERVAL = 1.0
 
 # Configure Streamlit page
 st.set_page_config(
@@ -686,14 +702,17 @@ class SessionState:
         if 'replacement_map' not in st.session_state:
             st.session_state.replacement_map = {}
         if 'loaded_files' not in st.session_state:
-            st.session_state.loaded_files = []
+            st.session_state.loaded_files = FileManifest()
         if 'temp_directories' not in st.session_state:
             st.session_state.temp_directories = []
         if 'backup_history' not in st.session_state:
             st.session_state.backup_history = []
         if 'console_messages' not in st.session_state:
-            st.session_state.console_messages = ["[READY] DocXReplace v3.0 initialized", 
-                                                "[READY] Load files and replacement patterns to begin"]
+            st.session_state.console_messages = deque(["[READY] DocXReplace v3.0 initialized", 
+                                                      "[READY] Load files and replacement patterns to begin"],
+                                                     maxlen=CONSOLE_BUFFER_LINES)
+        if 'console_rendered_at' not in st.session_state:
+            st.session_state.console_rendered_at = 0.0
         if 'process_progress' not in st.session_state:
             st.session_state.process_progress = 0
         if 'process_status' not in st.session_state:
@@ -704,131 +723,32 @@ class SessionState:
             st.session_state.results = []
         if 'regex_mode' not in st.session_state:
             st.session_state.regex_mode = False
-
-class DocumentProcessor:
-    """Handle document processing operations"""
-    
-    @staticmethod
-    def validate_replacement_map(replacement_map: Dict[str, str]) -> List[str]:
-        """Validate replacement map for common issues"""
-        errors = []
-        
-        for old_text, new_text in replacement_map.items():
-            if not old_text.strip():
-                errors.append("Empty search pattern found")
-            if len(old_text) > 1000:
-                errors.append(f"Search pattern too long: {old_text[:50]}...")
-            if not isinstance(new_text, str):
-                errors.append(f"Invalid replacement type for '{old_text}': expected string")
-        
-        return errors
-    
-    @staticmethod
-    def perform_replacement_in_doc(doc: Document, file_path: str, 
-                                 replacement_map: Dict[str, str], 
-                                 regex_mode: bool = False) -> Tuple[int, List[Dict]]:
-        """Perform replacements in a document with enhanced error handling"""
-        replacements_made = 0
-        replacement_details = []
-        
-        try:
-            # Process paragraphs
-            for para_idx, para in enumerate(doc.paragraphs):
-                original_text = para.text
-                modified_text = original_text
-                
-                for old_text, new_text in replacement_map.items():
-                    try:
-                        if regex_mode:
-                            if "{{match}}" in new_text:
-                                def replace_with_match(match):
-                                    matched_groups = match.groups()
-                                    replacement = new_text
-                                    if matched_groups:
-                                        for i, group in enumerate(matched_groups):
-                                            replacement = replacement.replace("{{match}}", group, 1)
-                                    else:
-                                        replacement = replacement.replace("{{match}}", match.group(0))
-                                    return replacement
-                                modified_text = re.sub(old_text, replace_with_match, modified_text)
-                            else:
-                                modified_text = re.sub(old_text, new_text, modified_text)
-                        else:
-                            if old_text in modified_text:
-                                modified_text = modified_text.replace(old_text, new_text)
-                    except re.error as e:
-                        log_message(f"⚠️ Invalid regex pattern '{old_text}': {e}")
-                        continue
-                    except Exception as e:
-                        log_message(f"❌ Error processing pattern '{old_text}': {e}")
-                        continue
-                
-                if modified_text != original_text:
-                    try:
-                        para.clear()
-                        para.add_run(modified_text)
-                    except Exception:
-                        para.text = modified_text
-                    
-                    replacements_made += 1
-                    replacement_details.append({
-                        'location': f'paragraph_{para_idx}',
-                        'original': original_text[:100] + '...' if len(original_text) > 100 else original_text,
-                        'modified': modified_text[:100] + '...' if len(modified_text) > 100 else modified_text
-                    })
-            
-            # Process tables
-            for table_idx, table in enumerate(doc.tables):
-                for row_idx, row in enumerate(table.rows):
-                    for cell_idx, cell in enumerate(row.cells):
-                        for para_idx, para in enumerate(cell.paragraphs):
-                            original_text = para.text
-                            modified_text = original_text
-                            
-                            for old_text, new_text in replacement_map.items():
-                                try:
-                                    if regex_mode:
-                                        if "{{match}}" in new_text:
-                                            def replace_with_match(match):
-                                                matched_groups = match.groups()
-                                                replacement = new_text
-                                                if matched_groups:
-                                                    for i, group in enumerate(matched_groups):
-                                                        replacement = replacement.replace("{{match}}", group, 1)
-                                                else:
-                                                    replacement = replacement.replace("{{match}}", match.group(0))
-                                                return replacement
-                                            modified_text = re.sub(old_text, replace_with_match, modified_text)
-                                        else:
-                                            modified_text = re.sub(old_text, new_text, modified_text)
-                                    else:
-                                        if old_text in modified_text:
-                                            modified_text = modified_text.replace(old_text, new_text)
-                                except re.error:
-                                    continue
-                                except Exception as e:
-                                    log_message(f"❌ Error in table processing: {e}")
-                                    continue
-                            
-                            if modified_text != original_text:
-                                try:
-                                    para.clear()
-                                    para.add_run(modified_text)
-                                except Exception:
-                                    para.text = modified_text
-                                
-                                replacements_made += 1
-                                replacement_details.append({
-                                    'location': f'table_{table_idx}_row_{row_idx}_cell_{cell_idx}_para_{para_idx}',
-                                    'original': original_text[:50] + '...' if len(original_text) > 50 else original_text,
-                                    'modified': modified_text[:50] + '...' if len(modified_text) > 50 else modified_text
-                                })
-        
-        except Exception as e:
-            log_message(f"❌ Critical error processing document {file_path}: {e}")
-            raise
-        
-        return replacements_made, replacement_details
+        if 'regex_budget' not in st.session_state:
+            st.session_state.regex_budget = DEFAULT_REGEX_BUDGET
+        if 'worker_count' not in st.session_state:
+            st.session_state.worker_count = 1
+        if 'engine' not in st.session_state:
+            st.session_state.engine = DOCX_ENGINE
+        if 'quick_reject' not in st.session_state:
+            st.session_state.quick_reject = True
+        if 'archive_source' not in st.session_state:
+            st.session_state.archive_source = None
+        if 'result_archive' not in st.session_state:
+            st.session_state.result_archive = None
+        if 'use_result_cache' not in st.session_state:
+            st.session_state.use_result_cache = False
+        if 'profile_patterns' not in st.session_state:
+            st.session_state.profile_patterns = False
+        if 'mirror_tree' not in st.session_state:
+            st.session_state.mirror_tree = False
+        if 'loaded_upload' not in st.session_state:
+            st.session_state.loaded_upload = None
+        if 'pipelined_io' not in st.session_state:
+            st.session_state.pipelined_io = False
+        if 'job_id' not in st.session_state:
+            st.session_state.job_id = None
+        if 'job_cursor' not in st.session_state:
+            st.session_state.job_cursor = 0
 
 def log_message(message, console_placeholder=None):
     """Add message to console log"""
@@ -836,21 +756,26 @@ def log_message(message, console_placeholder=None):
     formatted_msg = f"[{timestamp}] {message}"
     st.session_state.console_messages.append(formatted_msg)
     
-    # Keep only last 30 messages
-    if len(st.session_state.console_messages) > 30:
-        st.session_state.console_messages = st.session_state.console_messages[-30:]
-    
-    # Update console display if placeholder provided
+    # Update console display if placeholder provided, coalescing bursts of messages
     if console_placeholder:
-        console_text = '\n'.join(st.session_state.console_messages)
-        console_placeholder.markdown(
-            f'<div class="console-area">{console_text}</div>',
-            unsafe_allow_html=True
-        )
+        render_console(console_placeholder)
+
+def render_console(console_placeholder, force=False):
+    """Redraw the console, at most once per CONSOLE_RENDER_INTERVAL unless forced"""
+    now = time.monotonic()
+    if not force and now - st.session_state.console_rendered_at < CONSOLE_RENDER_INTERVAL:
+        return
+    st.session_state.console_rendered_at = now
+    
+    console_text = '\n'.join(list(st.session_state.console_messages)[-CONSOLE_DISPLAY_LINES:])
+    console_placeholder.markdown(
+        f'<div class="console-area">{console_text}</div>',
+        unsafe_allow_html=True
+    )
 
 def clear_console():
     """Clear console messages"""
-    st.session_state.console_messages = ["[READY] Console cleared"]
+    st.session_state.console_messages = deque(["[READY] Console cleared"], maxlen=CONSOLE_BUFFER_LINES)
 
 def create_replacement_template():
     """Create token replacement template JSON"""
@@ -896,30 +821,35 @@ def create_regex_template():
     
     return json.dumps(template, indent=2)
 
-def load_files_from_folder(folder_path: str):
-    """Load files from folder"""
-    st.session_state.loaded_files = []
+def load_files_from_folder(folder_path: str, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE,
+                           max_depth: Optional[int] = None, status_placeholder=None):
+    """Load files from folder, publishing batches while the tree is still being scanned"""
+    st.session_state.loaded_files = FileManifest()
+    st.session_state.archive_source = None
     if not os.path.exists(folder_path):
         return
     
-    file_count = 0
+    def add_batch(found, counts):
+        st.session_state.loaded_files.extend(found)
+        if status_placeholder:
+            status_placeholder.info(f"📁 Scanning {os.path.basename(folder_path)}: "
+                                    f"{counts['found']} files in {counts['folders']} folders")
+    
     try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.endswith('.docx') and not file.startswith('~'):
-                    full_path = os.path.join(root, file)
-                    if os.path.exists(full_path):
-                        st.session_state.loaded_files.append(full_path)
-                        file_count += 1
+        loaded_files = scan_folder(folder_path, include, exclude, max_depth, on_batch=add_batch)
+        st.session_state.loaded_files = loaded_files
+        if status_placeholder:
+            status_placeholder.empty()
         
-        log_message(f"📁 Loaded {file_count} files from folder: {os.path.basename(folder_path)}")
+        log_message(f"📁 Loaded {len(st.session_state.loaded_files)} files from folder: {os.path.basename(folder_path)}")
         
     except Exception as e:
         log_message(f"❌ Error scanning folder: {str(e)}")
 
 def load_files_from_zip(zip_path: str):
     """Load files from ZIP archive"""
-    st.session_state.loaded_files = []
+    st.session_state.loaded_files = FileManifest()
+    st.session_state.archive_source = None
     
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
@@ -936,7 +866,7 @@ def load_files_from_zip(zip_path: str):
                     with open(extracted_path, 'wb') as f:
                         f.write(file_data)
                     
-                    st.session_state.loaded_files.append(extracted_path)
+                    st.session_state.loaded_files.add(extracted_path)
             
             log_message(f"📦 Extracted {len(st.session_state.loaded_files)} files from ZIP: {os.path.basename(zip_path)}")
             log_message(f"📁 Temporary folder: {temp_dir}")
@@ -945,21 +875,64 @@ def load_files_from_zip(zip_path: str):
         st.error(f"Failed to load ZIP file: {str(e)}")
         log_message(f"❌ Error loading ZIP: {str(e)}")
 
-def load_files_from_excel(excel_path: str):
-    """Load files from Excel scan results"""
+def upload_id(upload) -> str:
+    """Identity of an uploaded file; a new upload of the same name gets a new ID"""
+    return getattr(upload, 'file_id', upload.name)
+
+def is_new_upload(kind: str, upload) -> bool:
+    """True the first time an upload is seen, so page reruns (e.g. job polling) do not load it again"""
+    key = (kind, upload_id(upload))
+    if st.session_state.loaded_upload == key:
+        return False
+    st.session_state.loaded_upload = key
+    return True
+
+def load_archive_stream(zip_file):
+    """Use an uploaded ZIP as a streamed source without extracting it"""
+    current = st.session_state.archive_source
+    if current and current['file_id'] == upload_id(zip_file):
+        return
+    
+    st.session_state.loaded_files = FileManifest()
+    st.session_state.archive_source = None
+    st.session_state.loaded_upload = ('stream', upload_id(zip_file))
     try:
-        df = pd.read_excel(excel_path)
-        if 'File Path' in df.columns:
-            all_paths = df['File Path'].tolist()
-            st.session_state.loaded_files = [path for path in all_paths if os.path.exists(path)]
-            missing_count = len(all_paths) - len(st.session_state.loaded_files)
-            
-            log_message(f"📊 Loaded {len(st.session_state.loaded_files)} files from Excel: {os.path.basename(excel_path)}")
-            
-            if missing_count > 0:
-                log_message(f"⚠️ {missing_count} files from Excel list were not found")
-        else:
-            st.error("Excel file must contain 'File Path' column")
+        zip_file.seek(0)
+        document_count = count_archive_documents(zip_file)
+        st.session_state.archive_source = {
+            'upload': zip_file,
+            'file_id': upload_id(zip_file),
+            'name': zip_file.name,
+            'documents': document_count
+        }
+        log_message(f"📦 Streaming {document_count} files from ZIP: {zip_file.name}")
+    except Exception as e:
+        st.error(f"Failed to load ZIP file: {str(e)}")
+        log_message(f"❌ Error loading ZIP: {str(e)}")
+
+def load_files_from_excel(excel_source, source_name: str = None, status_placeholder=None):
+    """Load files from Excel scan results, publishing each checked batch as it arrives"""
+    source_name = source_name or os.path.basename(excel_source)
+    
+    def add_batch(existing, counts):
+        st.session_state.loaded_files.extend(existing)
+        if status_placeholder:
+            status_placeholder.info(f"📊 Reading {source_name}: {counts['found']} found, "
+                                    f"{counts['missing']} missing, {counts['duplicates']} duplicates")
+    
+    try:
+        st.session_state.loaded_files = FileManifest()
+        st.session_state.archive_source = None
+        st.session_state.loaded_files, counts = read_excel_paths(excel_source, on_batch=add_batch)
+        if status_placeholder:
+            status_placeholder.empty()
+        
+        log_message(f"📊 Loaded {len(st.session_state.loaded_files)} files from Excel: {source_name}")
+        
+        if counts['missing'] > 0:
+            log_message(f"⚠️ {counts['missing']} files from Excel list were not found")
+        if counts['duplicates'] > 0:
+            log_message(f"ℹ️ Skipped {counts['duplicates']} duplicate paths in Excel list")
     except Exception as e:
         st.error(f"Failed to load Excel file: {str(e)}")
 
@@ -982,186 +955,266 @@ def cleanup_temp_files():
     st.session_state.temp_directories = []
     if cleaned_count > 0:
         log_message(f"✅ Cleaned up {cleaned_count} temporary directories")
-        st.session_state.loaded_files = []
+        st.session_state.loaded_files = FileManifest()
 
-def create_output_copy(file_path: str, output_root: str, session_timestamp: str = None) -> Tuple[str, str]:
-    """Create a copy of the file in output directory for modification"""
-    if session_timestamp is None:
-        session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    output_dir = os.path.join(output_root, f"modified_{session_timestamp}")
-    
-    try:
-        os.makedirs(output_dir, exist_ok=True)
-    except PermissionError:
-        user_docs = os.path.expanduser("~/Documents")
-        output_dir = os.path.join(user_docs, "DocReplace_Output", f"modified_{session_timestamp}")
-        os.makedirs(output_dir, exist_ok=True)
-        log_message(f"⚠️ Using fallback output location: {output_dir}")
-    
-    output_filename = os.path.basename(file_path)
-    base_name, ext = os.path.splitext(output_filename)
-    counter = 1
-    output_path = os.path.join(output_dir, output_filename)
-    
-    while os.path.exists(output_path):
-        output_filename = f"{base_name}_{counter}{ext}"
-        output_path = os.path.join(output_dir, output_filename)
-        counter += 1
-    
-    try:
-        shutil.copy2(file_path, output_path)
-        log_message(f"📋 Created working copy: {os.path.basename(file_path)} → {output_filename}")
-    except Exception as e:
-        log_message(f"❌ Copy failed for {os.path.basename(file_path)}: {str(e)}")
-        raise
-    
-    return output_dir, output_path
-
-def process_documents(mode: str, output_folder: str = None, progress_placeholder=None, console_placeholder=None):
-    """Main document processing function"""
-    if not st.session_state.loaded_files:
+def process_documents(mode: str, output_folder: str = None):
+    """Validate the inputs and start processing as a background job"""
+    archive_source = st.session_state.archive_source
+    if not st.session_state.loaded_files and not archive_source:
         st.error("Please load files to process first.")
-        return
+        return None
     
     if not st.session_state.replacement_map:
         st.error("Please load a replacement file first.")
-        return
+        return None
     
-    if mode != "Dry Run (preview only)" and "Modified Copies" in mode and not output_folder:
+    if not archive_source and mode != "Dry Run (preview only)" and "Modified Copies" in mode and not output_folder:
         st.error("Please select an output folder.")
-        return
-    
-    total_files = len(st.session_state.loaded_files)
-    processed_files = 0
-    modified_files = 0
-    total_replacements = 0
-    current_output_dir = None
-    session_timestamp = None
-    start_time = time.time()
+        return None
     
-    log_message(f"🚀 Starting {mode} on {total_files} files...", console_placeholder)
+    # The worker thread cannot read session state, so capture the run settings now
+    replacement_map = dict(st.session_state.replacement_map)
+    regex_mode = st.session_state.regex_mode
+    engine = st.session_state.engine
+    quick_reject = st.session_state.quick_reject
+    profile_patterns = st.session_state.profile_patterns
+    regex_budget = st.session_state.regex_budget
+    
+    if not archive_source:
+        loaded_files = st.session_state.loaded_files
+        # A dry run changes nothing, so there is nothing worth resuming
+        journal_path = None if mode == "Dry Run (preview only)" else new_journal_path()
+        return start_documents_job(loaded_files, replacement_map, regex_mode, mode, output_folder, engine,
+                                   st.session_state.mirror_tree, journal_path,
+                                   f"{mode} on {len(loaded_files)} files")
+    
+    # Archive-to-archive: documents go straight from the upload into a new ZIP on disk
+    output_archive = None
+    if mode != "Dry Run (preview only)":
+        temp_dir = tempfile.mkdtemp(prefix='docx_replace_')
+        st.session_state.temp_directories.append(temp_dir)
+        output_archive = os.path.join(temp_dir, "replaced_files.zip")
+    upload = archive_source['upload']
+    description = f"{mode} on {archive_source['name']}"
+    
+    def run(job):
+        upload.seek(0)
+        return run_archive(
+            upload,
+            replacement_map,
+            regex_mode,
+            mode,
+            output_archive,
+            log=job.log,
+            progress=job.update_progress,
+            engine=engine,
+            quick_reject=quick_reject,
+            checkpoint=job.checkpoint,
+            on_file=job.add_file,
+            profile_patterns=profile_patterns,
+            regex_budget=regex_budget
+        )
     
-    for i, file_path in enumerate(st.session_state.loaded_files):
-        if not os.path.exists(file_path):
-            log_message(f"⚠️ File not found: {file_path}", console_placeholder)
-            continue
-        
+    return launch_job(run, description)
+
+def start_documents_job(file_paths, replacement_map: Dict[str, str], regex_mode: bool, mode: str,
+                        output_folder: Optional[str], engine: str, mirror_tree: bool,
+                        journal_path: Optional[str], description: str):
+    """Start a folder/Excel run as a background job, journaled (with a journal_path) so it can be resumed"""
+    workers = st.session_state.worker_count
+    pipelined = st.session_state.pipelined_io
+    use_result_cache = st.session_state.use_result_cache
+    quick_reject = st.session_state.quick_reject
+    profile_patterns = st.session_state.profile_patterns
+    regex_budget = st.session_state.regex_budget
+    
+    def run(job):
+        # SQLite connections belong to the thread that opens them
+        result_cache = ResultCache(DEFAULT_CACHE_PATH) if use_result_cache else None
+        journal = RunJournal(journal_path) if journal_path else None
         try:
-            # Update progress
-            progress = int((i / total_files) * 100)
-            st.session_state.process_progress = progress
-            st.session_state.process_status = f"Processing {os.path.basename(file_path)[:20]}..."
-            
-            if progress_placeholder:
-                progress_placeholder.progress(progress / 100)
-            
-            # Load document
-            doc = Document(file_path)
-            
-            # Perform replacements
-            replacements_made, replacement_details = DocumentProcessor.perform_replacement_in_doc(
-                doc, file_path, st.session_state.replacement_map, st.session_state.regex_mode)
-            
-            if replacements_made > 0:
-                if mode == "Dry Run (preview only)":
-                    log_message(f"🔍 Would modify {os.path.basename(file_path)}: {replacements_made} replacements", console_placeholder)
-                    modified_files += 1
-                else:
-                    if "Modified Copies" in mode:
-                        # Create output copy
-                        if current_output_dir is None:
-                            session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            current_output_dir, output_file_path = create_output_copy(
-                                file_path, output_folder, session_timestamp)
-                        else:
-                            _, output_file_path = create_output_copy(
-                                file_path, output_folder, session_timestamp)
-                        
-                        # Save modified document to output copy
-                        doc.save(output_file_path)
-                        modified_files += 1
-                        total_replacements += replacements_made
-                        
-                        log_message(f"✅ Created modified copy of {os.path.basename(file_path)}: {replacements_made} replacements", console_placeholder)
-                    else:
-                        # In-place replacement
-                        doc.save(file_path)
-                        modified_files += 1
-                        total_replacements += replacements_made
-                        
-                        log_message(f"✅ Modified {os.path.basename(file_path)}: {replacements_made} replacements", console_placeholder)
-            else:
-                log_message(f"➖ No changes needed: {os.path.basename(file_path)}", console_placeholder)
-            
-            processed_files += 1
-            
-        except Exception as e:
-            log_message(f"❌ Error processing {os.path.basename(file_path)}: {str(e)}", console_placeholder)
+            return run_documents(
+                file_paths,
+                replacement_map,
+                regex_mode,
+                mode,
+                output_folder,
+                workers=workers,
+                log=job.log,
+                progress=job.update_progress,
+                engine=engine,
+                quick_reject=quick_reject,
+                result_cache=result_cache,
+                checkpoint=job.checkpoint,
+                on_file=job.add_file,
+                profile_patterns=profile_patterns,
+                regex_budget=regex_budget,
+                mirror_tree=mirror_tree,
+                journal=journal,
+                pipelined=pipelined
+            )
         finally:
-            # Clean up document from memory
-            if 'doc' in locals():
-                del doc
+            if journal is not None:
+                journal.close()
+            if result_cache is not None:
+                result_cache.close()
+    
+    return launch_job(run, description)
+
+def resume_journal(journal_path: str):
+    """Start an interrupted run again from its journal; finished files are skipped"""
+    settings = RunJournal(journal_path).settings
+    return start_documents_job(settings['files'], dict(settings['replacement_map']), settings['regex_mode'],
+                               settings['mode'], settings['output_folder'], settings['engine'],
+                               settings['mirror_tree'], journal_path,
+                               f"Resume {settings['mode']} on {len(settings['files'])} files")
+
+def launch_job(run, description: str):
+    """Start a background job with its own run log and follow it from this page"""
+    # Full-fidelity log for download; the console only keeps the most recent lines
+    log_dir = tempfile.mkdtemp(prefix='docx_replace_log_')
+    st.session_state.temp_directories.append(log_dir)
+    log_path = os.path.join(log_dir, f"docxreplace_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    
+    job = start_job(run, description, log_path)
+    attach_job(job)
+    st.session_state.process_progress = 0
+    st.session_state.process_status = "Starting..."
+    return job
+
+def get_query_job_id():
+    """Job ID carried in the page URL, so a reloaded page can re-attach"""
+    if hasattr(st, 'query_params'):
+        return st.query_params.get('job')
+    return st.experimental_get_query_params().get('job', [None])[0]
+
+def set_query_job_id(job_id):
+    if hasattr(st, 'query_params'):
+        if job_id:
+            st.query_params['job'] = job_id
+        elif 'job' in st.query_params:
+            del st.query_params['job']
+    else:
+        st.experimental_set_query_params(**({'job': job_id} if job_id else {}))
+
+def attach_job(job):
+    """Follow a background job from this page session"""
+    st.session_state.job_id = job.id
+    st.session_state.job_cursor = 0
+    set_query_job_id(job.id)
+
+def poll_job():
+    """Pull a job's new console lines and progress into the page; returns it while it is still running"""
+    job_id = st.session_state.job_id or get_query_job_id()
+    job = get_job(job_id)
+    if job is None:
+        if job_id:
+            st.session_state.job_id = None
+            set_query_job_id(None)
+        return None
+    
+    if st.session_state.job_id != job.id:
+        # Fresh page session re-attaching through the URL: replay the job's console
+        attach_job(job)
+        log_message(f"🔗 Re-attached to job {job.id}: {job.description}")
+    
+    lines, st.session_state.job_cursor = job.lines_since(st.session_state.job_cursor)
+    st.session_state.console_messages.extend(lines)
+    
+    snapshot = job.snapshot()
+    if snapshot['total']:
+        st.session_state.process_progress = int((snapshot['index'] / snapshot['total']) * 100)
+    if snapshot['status'] == PAUSED or (job.pause_requested and not job.done):
+        st.session_state.process_status = f"Paused after {snapshot['files_done']} files (job {job.id})"
+    elif snapshot['current_file']:
+        st.session_state.process_status = (f"Processing {os.path.basename(snapshot['current_file'])[:20]}... "
+                                           f"({snapshot['files_done']}/{snapshot['total']}, job {job.id})")
+    
+    if job.done:
+        finish_job(job)
+        return None
+    return job
+
+def finish_job(job):
+    """Move a finished job's results into the page and stop following it"""
+    st.session_state.job_id = None
+    set_query_job_id(None)
+    
+    if job.results is None:
+        st.session_state.process_status = "Processing failed"
+        st.error(f"❌ Processing failed: {job.error}")
+        return
+    
+    results = job.results
+    results['run_log'] = job.log_path
+    mode = results['mode']
     
     # Add to backup history if outputs were created
-    if current_output_dir and mode != "Dry Run (preview only)":
+    output_location = results['output_dir'] or results.get('output_archive')
+    if output_location and mode != "Dry Run (preview only)":
         st.session_state.backup_history.append({
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'backup_dir': current_output_dir,
-            'files_modified': modified_files,
-            'total_replacements': total_replacements,
+            'backup_dir': output_location,
+            'files_modified': results['modified_files'],
+            'total_replacements': results['total_replacements'],
             'mode': mode
         })
     
-    # Final summary
-    elapsed_total = time.time() - start_time
-    
-    if mode == "Dry Run (preview only)":
-        log_message(f"\n📋 Dry Run Complete:", console_placeholder)
-        log_message(f"   • Files processed: {processed_files}", console_placeholder)
-        log_message(f"   • Files that would be modified: {modified_files}", console_placeholder)
-        log_message(f"   • Time elapsed: {elapsed_total:.1f}s", console_placeholder)
-        st.success(f"Dry run completed! {modified_files} files would be modified")
+    if results.get('cancelled'):
+        st.warning(f"⏹️ Processing cancelled after {results['processed_files']} files")
+    elif mode == "Dry Run (preview only)":
+        st.success(f"Dry run completed! {results['modified_files']} files would be modified")
     else:
-        log_message(f"\n🎉 Replacement Complete:", console_placeholder)
-        log_message(f"   • Files processed: {processed_files}", console_placeholder)
-        log_message(f"   • Files modified: {modified_files}", console_placeholder)
-        log_message(f"   • Total replacements: {total_replacements}", console_placeholder)
-        log_message(f"   • Time elapsed: {elapsed_total:.1f}s", console_placeholder)
-        if current_output_dir:
-            log_message(f"   • Output folder: {current_output_dir}", console_placeholder)
-        st.success(f"Replacement completed! {modified_files} files modified with {total_replacements} total replacements")
+        st.success(f"Replacement completed! {results['modified_files']} files modified with {results['total_replacements']} total replacements")
     
     # Update final progress
     st.session_state.process_progress = 100
-    st.session_state.process_status = "Processing completed!"
-    if progress_placeholder:
-        progress_placeholder.progress(1.0)
+    st.session_state.process_status = "Processing cancelled" if results.get('cancelled') else "Processing completed!"
     
     # Store results
-    st.session_state.results = {
-        'processed_files': processed_files,
-        'modified_files': modified_files,
-        'total_replacements': total_replacements,
-        'output_dir': current_output_dir,
-        'mode': mode
-    }
+    st.session_state.results = results
+    if results['modified_files'] > 0:
+        st.success(f"🎉 Processing completed! Modified {results['modified_files']} files")
+        st.balloons()
+    else:
+        st.info("ℹ️ Processing completed but no files were modified")
+
+def export_timings(results: Dict[str, Any]) -> Tuple[str, str]:
+    """Per-file stage timings as (CSV, JSON) text, built once per run"""
+    if 'timings_export' not in results:
+        rows = timing_rows(results.get('files', []))
+        csv_buffer = StringIO()
+        if rows:
+            writer = csv.DictWriter(csv_buffer, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        results['timings_export'] = (
+            csv_buffer.getvalue(),
+            json.dumps({'stages': results.get('stage_timings', {}), 'files': rows}, indent=2, ensure_ascii=False)
+        )
+    return results['timings_export']
 
-def create_zip_download(output_dir: str, zip_name: str = "replaced_files"):
-    """Create ZIP file for download"""
+def create_zip_download(output_dir: str, zip_name: str = "replaced_files",
+                        compression: str = "Stored (fastest)"):
+    """Create ZIP file for download, reusing the cached archive while the output is unchanged"""
     try:
-        zip_buffer = BytesIO()
+        # Reruns only re-stat the folder; the archive is rebuilt when its contents or the compression change
+        cache_key = (os.path.abspath(output_dir), directory_fingerprint(output_dir), compression)
+        cached = st.session_state.result_archive
+        if cached and cached['key'] == cache_key and os.path.exists(cached['path']):
+            return cached['path']
         
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add all files from output directory
-            for root, dirs, files in os.walk(output_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, output_dir)
-                    zipf.write(file_path, arcname)
+        if cached:
+            shutil.rmtree(os.path.dirname(cached['path']), ignore_errors=True)
+            if os.path.dirname(cached['path']) in st.session_state.temp_directories:
+                st.session_state.temp_directories.remove(os.path.dirname(cached['path']))
+            st.session_state.result_archive = None
         
-        zip_buffer.seek(0)
-        return zip_buffer.getvalue()
+        temp_dir = tempfile.mkdtemp(prefix='docx_replace_')
+        st.session_state.temp_directories.append(temp_dir)
+        archive_path = build_result_archive(output_dir, os.path.join(temp_dir, f"{zip_name}.zip"), compression)
+        st.session_state.result_archive = {'key': cache_key, 'path': archive_path}
+        return archive_path
         
     except Exception as e:
         st.error(f"Error creating ZIP: {str(e)}")
@@ -1179,17 +1232,10 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.1f} {size_names[i]}"
 
 def get_files_stats():
-    """Get total size and file count of loaded files"""
-    total_size = 0
+    """Get total size and file count of loaded files (from the manifest, no filesystem access)"""
+    total_size = st.session_state.loaded_files.total_size
     file_count = len(st.session_state.loaded_files)
     
-    for file_path in st.session_state.loaded_files:
-        try:
-            size = os.path.getsize(file_path)
-            total_size += size
-        except OSError:
-            continue
-    
     size_mb = round(total_size / 1024 / 1024, 1)
     return f"{file_count} files ({size_mb} MB total)"
 
@@ -1228,9 +1274,43 @@ def main():
                 key="folder_path_input"
             )
             
+            with st.expander("Scan Options", expanded=False):
+                include_globs = st.text_input(
+                    "Include",
+                    value=", ".join(DEFAULT_INCLUDE),
+                    help="Comma-separated glob patterns matched against file names (or relative paths, for patterns with a '/')",
+                    key="folder_include_input"
+                )
+                exclude_globs = st.text_input(
+                    "Exclude",
+                    value=", ".join(DEFAULT_EXCLUDE),
+                    help="Comma-separated glob patterns; matching folders are skipped entirely",
+                    key="folder_exclude_input"
+                )
+                limit_depth = st.checkbox(
+                    "Limit Depth",
+                    value=False,
+                    help="Scan only a fixed number of folder levels instead of the whole tree",
+                    key="folder_limit_depth_input"
+                )
+                max_depth = st.number_input(
+                    "Max Depth",
+                    min_value=0,
+                    value=0,
+                    disabled=not limit_depth,
+                    help="How many folder levels below the selected folder to scan (0 = only the selected folder)",
+                    key="folder_max_depth_input"
+                )
+            
             if folder_path and os.path.exists(folder_path):
                 if st.button("Load from Folder", use_container_width=True, key="load_folder_btn"):
-                    load_files_from_folder(folder_path)
+                    load_files_from_folder(
+                        folder_path,
+                        include=[pattern.strip() for pattern in include_globs.split(',') if pattern.strip()],
+                        exclude=[pattern.strip() for pattern in exclude_globs.split(',') if pattern.strip()],
+                        max_depth=int(max_depth) if limit_depth else None,
+                        status_placeholder=st.empty()
+                    )
                     st.rerun()
         
         with file_tab2:
@@ -1242,16 +1322,11 @@ def main():
             )
             
             if excel_file is not None:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                    tmp_file.write(excel_file.read())
-                    temp_excel_path = tmp_file.name
-                
-                try:
-                    load_files_from_excel(temp_excel_path)
-                    st.success(f"✅ Loaded files from Excel: {excel_file.name}")
-                finally:
-                    os.unlink(temp_excel_path)
+                if is_new_upload('excel', excel_file):
+                    # openpyxl streams the upload directly, no temp copy needed
+                    excel_file.seek(0)
+                    load_files_from_excel(excel_file, excel_file.name, st.empty())
+                st.success(f"✅ Loaded files from Excel: {excel_file.name}")
         
         with file_tab3:
             zip_file = st.file_uploader(
@@ -1261,20 +1336,34 @@ def main():
                 key="zip_uploader"
             )
             
-            if zip_file is not None:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-                    tmp_file.write(zip_file.read())
-                    temp_zip_path = tmp_file.name
-                
-                try:
-                    load_files_from_zip(temp_zip_path)
-                    st.success(f"✅ Loaded files from ZIP: {zip_file.name}")
-                finally:
-                    os.unlink(temp_zip_path)
+            stream_archive = st.checkbox(
+                "Stream archive (no extraction)",
+                value=False,
+                help="Process documents straight from the ZIP into a new ZIP without extracting to a temp folder",
+                key="zip_stream_checkbox"
+            )
+            
+            if zip_file is not None and stream_archive:
+                load_archive_stream(zip_file)
+            elif zip_file is not None:
+                if is_new_upload('zip', zip_file):
+                    # Save uploaded file temporarily
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
+                        zip_file.seek(0)
+                        tmp_file.write(zip_file.read())
+                        temp_zip_path = tmp_file.name
+                    
+                    try:
+                        load_files_from_zip(temp_zip_path)
+                    finally:
+                        os.unlink(temp_zip_path)
+                st.success(f"✅ Loaded files from ZIP: {zip_file.name}")
         
         # Show loaded files status
-        if st.session_state.loaded_files:
+        if st.session_state.archive_source:
+            archive_source = st.session_state.archive_source
+            st.success(f"📄 Loaded: {archive_source['documents']} files streamed from {archive_source['name']}")
+        elif st.session_state.loaded_files:
             files_stats = get_files_stats()
             st.success(f"📄 Loaded: {files_stats}")
         else:
@@ -1311,6 +1400,18 @@ def main():
             key="regex_mode_checkbox"
         )
         
+        if st.session_state.regex_mode:
+            # Runaway patterns are stopped and quarantined instead of hanging the run
+            st.session_state.regex_budget = st.number_input(
+                "Regex Time Budget (s)",
+                min_value=0.0,
+                max_value=3600.0,
+                value=float(st.session_state.regex_budget),
+                step=5.0,
+                help="Seconds one pattern may spend on one paragraph in regex mode; a pattern that overruns is skipped for the rest of the run (0 = no limit)",
+                key="regex_budget_input"
+            )
+        
         # Template creation
         template_col1, template_col2 = st.columns(2)
         
@@ -1361,6 +1462,62 @@ def main():
             key="processing_mode_selector"
         )
         
+        # Replacement engine
+        st.session_state.engine = st.selectbox(
+            "Replacement Engine",
+            [DOCX_ENGINE, DOCX_REWRITE_ENGINE, XML_ENGINE],
+            index=[DOCX_ENGINE, DOCX_REWRITE_ENGINE, XML_ENGINE].index(st.session_state.engine),
+            help="python-docx edits only the text a replacement touches, keeping run formatting, bookmarks and fields; "
+                 "'rewrite changed paragraphs' rebuilds each changed paragraph as one plain run (the old behavior). "
+                 "Raw XML streams the text without loading the full document model",
+            key="engine_selector"
+        )
+        
+        # Parallel execution across CPU cores
+        st.session_state.worker_count = st.number_input(
+            "Parallel Workers",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=min(st.session_state.worker_count, os.cpu_count() or 1),
+            help="Number of worker processes; 1 processes files sequentially",
+            key="worker_count_input"
+        )
+        
+        # Overlap reads and writes with the replacement work (network shares)
+        st.session_state.pipelined_io = st.checkbox(
+            "Pipelined I/O",
+            value=st.session_state.pipelined_io,
+            disabled=st.session_state.worker_count > 1,
+            help=f"With 1 worker: prefetch upcoming documents and write outputs in the background while the "
+                 f"current one is processed (up to {PIPELINE_MAX_BYTES // (1024 * 1024)} MB in memory). "
+                 f"Helps most on network shares; also applies to regex runs with a time budget",
+            key="pipelined_io_checkbox"
+        )
+        
+        # Pre-parse scan that skips documents with no possible match
+        st.session_state.quick_reject = st.checkbox(
+            "Quick-reject Scan",
+            value=st.session_state.quick_reject,
+            help="Scan each document's text for the search terms first and skip files that cannot match",
+            key="quick_reject_checkbox"
+        )
+        
+        # Persistent cache of results for unchanged (file, replacement map) pairs
+        st.session_state.use_result_cache = st.checkbox(
+            "Result Cache",
+            value=st.session_state.use_result_cache,
+            help=f"Reuse results for documents already processed with the same patterns (stored in {DEFAULT_CACHE_PATH})",
+            key="result_cache_checkbox"
+        )
+        
+        # Per-pattern match counts and timing, to find dead and expensive patterns
+        st.session_state.profile_patterns = st.checkbox(
+            "Pattern Profiling",
+            value=st.session_state.profile_patterns,
+            help="Count matches and time spent per pattern (adds some overhead to each paragraph)",
+            key="profile_patterns_checkbox"
+        )
+        
         # Output folder (only for modified copies mode)
         output_folder = None
         if "Modified Copies" in processing_mode:
@@ -1375,6 +1532,14 @@ def main():
                 st.warning("⚠️ Output folder does not exist")
             elif output_folder:
                 st.success("✅ Output folder is valid")
+            
+            st.session_state.mirror_tree = st.checkbox(
+                "Mirror Folder Structure",
+                value=st.session_state.mirror_tree,
+                help="Keep each copy's subfolder (relative to the loaded files' common folder) instead of "
+                     "putting every copy in one folder",
+                key="mirror_tree_checkbox"
+            )
         
         st.markdown("---")
         
@@ -1388,6 +1553,17 @@ def main():
         if st.button("📋 Clear Console", use_container_width=True, key="clear_console_btn"):
             clear_console()
             st.rerun()
+        
+        if os.path.exists(DEFAULT_CACHE_PATH):
+            if st.button("🗑️ Clear Result Cache", use_container_width=True, key="clear_cache_btn"):
+                result_cache = ResultCache(DEFAULT_CACHE_PATH)
+                try:
+                    cache_stats = result_cache.stats()
+                    result_cache.clear()
+                finally:
+                    result_cache.close()
+                log_message(f"🗑️ Cleared {cache_stats['entries']} cached results ({format_file_size(cache_stats['bytes'])})")
+                st.rerun()
     
     # Main content area
     col1, col2 = st.columns([2, 1], gap="medium")
@@ -1404,64 +1580,55 @@ def main():
         progress_placeholder = st.empty()
         status_placeholder = st.empty()
         
+        # Pull in progress from a background job started by this page or named in the URL
+        active_job = poll_job()
+        st.session_state.process_running = active_job is not None
+        
         if st.session_state.process_progress > 0:
             progress_placeholder.progress(st.session_state.process_progress / 100)
             status_placeholder.info(f"Status: {st.session_state.process_status}")
         
         # Check if processing can be started
         can_process = (
-            st.session_state.loaded_files and 
+            (st.session_state.loaded_files or st.session_state.archive_source) and 
             st.session_state.replacement_map and 
             not st.session_state.process_running
         )
         
-        # Additional validation for output folder
-        if "Modified Copies" in processing_mode and not output_folder:
+        # Additional validation for output folder (streamed archives write a new ZIP instead)
+        if "Modified Copies" in processing_mode and not output_folder and not st.session_state.archive_source:
             can_process = False
         
         col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 1])
         
         with col_btn1:
-            if st.button("🚀 Start Processing", disabled=not can_process, use_container_width=True, key="start_process_btn"):
-                if can_process:
-                    st.session_state.process_running = True
-                    
-                    # Create placeholders for real-time updates
-                    console_placeholder = st.empty()
-                    
-                    # Execute processing
-                    try:
-                        process_documents(
-                            processing_mode,
-                            output_folder,
-                            progress_placeholder,
-                            console_placeholder
-                        )
-                        
-                        if st.session_state.results:
-                            if st.session_state.results['modified_files'] > 0:
-                                st.success(f"🎉 Processing completed! Modified {st.session_state.results['modified_files']} files")
-                                st.balloons()
-                            else:
-                                st.info("ℹ️ Processing completed but no files were modified")
-                    
-                    except Exception as e:
-                        st.error(f"❌ Processing failed: {str(e)}")
-                        log_message(f"❌ Processing error: {str(e)}")
-                    
-                    finally:
-                        st.session_state.process_running = False
+            if active_job is not None:
+                if active_job.pause_requested:
+                    if st.button("▶️ Resume", use_container_width=True, key="resume_process_btn"):
+                        active_job.resume()
+                        st.rerun()
+                elif st.button("⏸️ Pause", use_container_width=True, key="pause_process_btn"):
+                    active_job.pause()
+                    st.rerun()
+            elif st.button("🚀 Start Processing", disabled=not can_process, use_container_width=True, key="start_process_btn"):
+                if can_process and process_documents(processing_mode, output_folder):
+                    st.rerun()
         
         with col_btn2:
-            if st.button("📊 Results", use_container_width=True, key="results_btn"):
+            if active_job is not None:
+                if st.button("⏹️ Cancel", use_container_width=True, key="cancel_process_btn"):
+                    active_job.cancel()
+                    st.rerun()
+            elif st.button("📊 Results", use_container_width=True, key="results_btn"):
                 if st.session_state.results:
                     st.info(f"📊 Last run: {st.session_state.results['modified_files']} files modified")
                 else:
                     st.warning("No processing results available")
         
         with col_btn3:
-            if st.button("🔄 Reset", use_container_width=True, key="reset_btn"):
-                st.session_state.loaded_files = []
+            if st.button("🔄 Reset", disabled=active_job is not None, use_container_width=True, key="reset_btn"):
+                st.session_state.loaded_files = FileManifest()
+                st.session_state.archive_source = None
                 st.session_state.replacement_map = {}
                 st.session_state.process_progress = 0
                 st.session_state.process_status = "Ready to process"
@@ -1469,6 +1636,29 @@ def main():
                 clear_console()
                 st.rerun()
         
+        # Runs that stopped before finishing (crash, server restart, cancel) can pick up where they left off
+        interrupted = interrupted_journals() if active_job is None else []
+        if interrupted:
+            with st.expander(f"⏯️ Interrupted Runs ({len(interrupted)})", expanded=False):
+                for journal in interrupted[:5]:
+                    header = journal['header']
+                    col_info, col_resume, col_discard = st.columns([3, 1, 1])
+                    with col_info:
+                        st.caption(f"{header['mode']} · {journal['done']} of {header['file_count']} files done "
+                                   f"· started {header['session_timestamp']}")
+                    with col_resume:
+                        if st.button("▶️ Resume", use_container_width=True, key=f"resume_run_{journal['path']}"):
+                            log_message(f"⏯️ Resuming interrupted run: {os.path.basename(journal['path'])}")
+                            if resume_journal(journal['path']):
+                                st.rerun()
+                    with col_discard:
+                        if st.button("🗑️ Discard", use_container_width=True, key=f"discard_run_{journal['path']}"):
+                            try:
+                                os.remove(journal['path'])
+                            except OSError as e:
+                                st.error(f"Could not discard run: {str(e)}")
+                            st.rerun()
+        
         # Validation and Help Section
         st.markdown("""
         <div class="modern-card">
@@ -1486,6 +1676,7 @@ def main():
                     errors = DocumentProcessor.validate_replacement_map(st.session_state.replacement_map)
                     
                     # Validate regex patterns if regex mode is enabled
+                    risky = []
                     if st.session_state.regex_mode:
                         regex_errors = []
                         for pattern in st.session_state.replacement_map.keys():
@@ -1493,6 +1684,8 @@ def main():
                                 re.compile(pattern)
                             except re.error as e:
                                 regex_errors.append(f"'{pattern}': {e}")
+                                continue
+                            risky.extend(f"'{pattern}': {warning}" for warning in regex_risk_warnings(pattern))
                         errors.extend(regex_errors)
                     
                     if errors:
@@ -1503,6 +1696,14 @@ def main():
                             st.write(f"... and {len(errors)-5} more errors")
                     else:
                         st.success("✅ All patterns are valid!")
+                    
+                    # Static complexity check: likely catastrophic backtracking
+                    if risky:
+                        st.warning("⚠️ Some patterns may backtrack catastrophically on long paragraphs:")
+                        for warning in risky[:5]:
+                            st.write(f"• {warning}")
+                        if len(risky) > 5:
+                            st.write(f"... and {len(risky)-5} more warnings")
         
         with help_tab2:
             st.markdown("""
@@ -1586,21 +1787,97 @@ def main():
             with col_m4:
                 st.metric("📁 Mode", st.session_state.results['mode'][:10] + "...")
             
+            quarantined = st.session_state.results.get('quarantined_patterns')
+            if quarantined:
+                st.warning(f"⏱️ {len(quarantined)} patterns exceeded the regex time budget and were skipped: "
+                           + ", ".join(f"`{pattern}`" for pattern in quarantined[:5]))
+            
+            part_counts = st.session_state.results.get('part_replacements')
+            if part_counts:
+                st.caption("🧩 Replacements by part: "
+                           + ", ".join(f"{part_name} {count}" for part_name, count in part_counts.items()))
+            
+            # Stage timings: where the time went, and downloads to find slow documents
+            stage_timings = st.session_state.results.get('stage_timings')
+            if stage_timings:
+                with st.expander("⏱️ Stage Timings", expanded=False):
+                    st.table([
+                        {
+                            'Stage': stage,
+                            'Files': stats['files'],
+                            'Total (s)': f"{stats['total']:.2f}",
+                            'p50 (ms)': f"{stats['p50'] * 1000:.1f}",
+                            'p95 (ms)': f"{stats['p95'] * 1000:.1f}",
+                            'Max (ms)': f"{stats['max'] * 1000:.1f}"
+                        }
+                        for stage, stats in stage_timings.items()
+                    ])
+                    
+                    timings_csv, timings_json = export_timings(st.session_state.results)
+                    st.download_button(
+                        label="⏱️ Download Timings (CSV)",
+                        data=timings_csv,
+                        file_name="stage_timings.csv",
+                        mime="text/csv",
+                        use_container_width=True,
+                        key="download_timings_csv_btn"
+                    )
+                    st.download_button(
+                        label="⏱️ Download Timings (JSON)",
+                        data=timings_json,
+                        file_name="stage_timings.json",
+                        mime="application/json",
+                        use_container_width=True,
+                        key="download_timings_json_btn"
+                    )
+            
+            # Pattern profile: sort by matches to find dead patterns, by time to find slow ones
+            pattern_profile = st.session_state.results.get('pattern_profile')
+            if pattern_profile:
+                with st.expander("🧬 Pattern Profile", expanded=False):
+                    st.caption(f"{pattern_profile['unused']} of {len(pattern_profile['patterns'])} patterns never matched • "
+                               f"{pattern_profile['shared_ms'] / 1000:.2f}s in scans shared by all patterns")
+                    st.dataframe(
+                        pattern_profile['patterns'],
+                        column_config={
+                            'pattern': "Pattern",
+                            'matches': "Matches",
+                            'paragraphs': "Paragraphs",
+                            'files': "Files",
+                            'time_ms': st.column_config.NumberColumn("Time (ms)", format="%.1f")
+                        },
+                        use_container_width=True,
+                        hide_index=True
+                    )
+            
             # Download options
-            if st.session_state.results.get('output_dir') and os.path.exists(st.session_state.results['output_dir']):
+            output_dir = st.session_state.results.get('output_dir')
+            output_archive = st.session_state.results.get('output_archive')
+            if (output_dir and os.path.exists(output_dir)) or (output_archive and os.path.exists(output_archive)):
                 col_dl1, col_dl2 = st.columns(2)
                 
                 with col_dl1:
-                    zip_data = create_zip_download(st.session_state.results['output_dir'], "replaced_files")
-                    if zip_data:
-                        st.download_button(
-                            label="📦 Download Modified Files",
-                            data=zip_data,
-                            file_name="replaced_files.zip",
-                            mime="application/zip",
-                            use_container_width=True,
-                            key="download_results_btn"
+                    if output_archive:
+                        # Streamed runs already wrote their result archive to disk
+                        zip_path = output_archive
+                    else:
+                        compression = st.selectbox(
+                            "Archive Compression",
+                            list(ARCHIVE_COMPRESSION),
+                            help=".docx files are already compressed; storing them is fastest at nearly the same size",
+                            key="archive_compression_selector"
                         )
+                        zip_path = create_zip_download(output_dir, "replaced_files", compression)
+                    if zip_path:
+                        with open(zip_path, 'rb') as zip_data:
+                            st.download_button(
+                                label="📦 Download Modified Files",
+                                data=zip_data,
+                                file_name="replaced_files.zip",
+                                mime="application/zip",
+                                use_container_width=True,
+                                key="download_results_btn"
+                            )
                 
                 with col_dl2:
                     # Create summary report
@@ -1624,6 +1901,18 @@ def main():
                         use_container_width=True,
                         key="download_summary_btn"
                     )
+            
+            run_log = st.session_state.results.get('run_log')
+            if run_log and os.path.exists(run_log):
+                with open(run_log, 'rb') as log_data:
+                    st.download_button(
+                        label="📜 Download Run Log",
+                        data=log_data,
+                        file_name=os.path.basename(run_log),
+                        mime="text/plain",
+                        use_container_width=True,
+                        key="download_run_log_btn"
+                    )
         
         # Backup History
         if st.session_state.backup_history:
@@ -1643,11 +1932,7 @@ def main():
         """, unsafe_allow_html=True)
         
         # Console display
-        console_text = '\n'.join(st.session_state.console_messages[-20:])  # Show last 20 messages
-        st.markdown(
-            f'<div class="console-area">{console_text}</div>',
-            unsafe_allow_html=True
-        )
+        render_console(st.empty(), force=True)
         
         # System information
         st.markdown("### 💻 System Status")
@@ -1701,6 +1986,11 @@ def main():
         '</div>',
         unsafe_allow_html=True
     )
+    
+    # Keep polling while a job runs; the page stays interactive between refreshes
+    if active_job is not None:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
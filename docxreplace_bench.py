@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Benchmarks
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Synthetic corpus generator plus micro (replacement core) and macro (whole run)
+benchmarks, with JSON results that can be compared against a saved baseline.
+
+    python docxreplace_bench.py generate ./corpus --documents 50 --paragraphs 400
+    python docxreplace_bench.py run --out bench.json
+    python docxreplace_bench.py run --baseline bench.json --threshold 10
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Legal tokens matching the web app's standard template, and a regex map in the same spirit
+BENCH_LITERAL_MAP = {
+    "<<FileService.": "<<NewFileService.",
+    "</ff>": "<<PAGE_BREAK>>",
+    "</pp>": "<<HARD_RETURN>>",
+    "<c>": "<<CENTER>>",
+    "<u>": "<<UNDERLINE>>",
+    "<i>": "<<ITALIC>>",
+    "<bold>": "<<BOLD>>",
+    "[[SCOMPUTEINTO(": "<<SCOMPUTE_INTO(",
+    "PROMTINTO(": "<<PROMPT_INTO(",
+    "<<Checklist.": "<<CHECKLIST.",
+    "{ATTY": "<<ESIGN_ATTORNEY",
+}
+BENCH_REGEX_MAP = {
+    r"<<FileService\.(\w+)>>": "<<NewFileService.{{match}}>>",
+    r"\[\[(\w+)COMPUTEINTO\(": "<<{{match}}_INTO(",
+    r"PROMT(\w*)\(": "<<PROMPT_{{match}}(",
+    r"<(\w+)>": "<<{{match}}>>",
+    r"</(\w+)>": "<<END_{{match}}>>",
+}
+_CORPUS_TOKENS = ["<<FileService.ClientName>>", "</ff>", "</pp>", "<c>", "<u>", "<i>", "<bold>",
+                  "[[SCOMPUTEINTO(", "PROMTINTO(", "<<Checklist.Item>>", "{ATTY"]
+_WORDS = ("the parties agree that notice shall be given to each party in writing within thirty days "
+          "of receipt and any amendment must be signed by both the client and counsel before filing").split()
+
+DEFAULT_CORPUS = {
+    'documents': 20,
+    'paragraphs': 200,
+    'tables': 2,
+    'table_rows': 8,
+    'table_cols': 4,
+    'merged_cells': True,
+    'token_density': 0.2,
+    'split_runs': 0.3,
+    'seed': 42,
+}
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 10.0
+
+
+def _sentence(rng: random.Random, token_density: float) -> List[str]:
+    """A run of filler words with tokens sprinkled in at roughly token_density per word"""
+    words = []
+    for _ in range(rng.randint(8, 30)):
+        words.append(rng.choice(_CORPUS_TOKENS) if rng.random() < token_density else rng.choice(_WORDS))
+    return words
+
+
+def _add_text(paragraph, words: List[str], rng: random.Random, split_runs: float):
+    """Add words as runs, splitting some tokens across differently formatted runs"""
+    pending = []
+    for word in words:
+        if word in _CORPUS_TOKENS and len(word) > 2 and rng.random() < split_runs:
+            if pending:
+                paragraph.add_run(' '.join(pending) + ' ')
+                pending = []
+            cut = rng.randint(1, len(word) - 1)
+            paragraph.add_run(word[:cut])
+            paragraph.add_run(word[cut:] + ' ').bold = True
+        else:
+            pending.append(word)
+    if pending:
+        paragraph.add_run(' '.join(pending))
+
+
+def generate_corpus(directory: str, documents: int = DEFAULT_CORPUS['documents'],
+                    paragraphs: int = DEFAULT_CORPUS['paragraphs'], tables: int = DEFAULT_CORPUS['tables'],
+                    table_rows: int = DEFAULT_CORPUS['table_rows'], table_cols: int = DEFAULT_CORPUS['table_cols'],
+                    merged_cells: bool = DEFAULT_CORPUS['merged_cells'],
+                    token_density: float = DEFAULT_CORPUS['token_density'],
+                    split_runs: float = DEFAULT_CORPUS['split_runs'],
+                    seed: int = DEFAULT_CORPUS['seed']) -> List[str]:
+    """Write a synthetic .docx corpus and return the file paths.
+
+    Text, tables and token placement depend only on the arguments, so the
+    same seed produces the same documents (ZIP timestamps aside). split_runs
+    is the share of tokens split across two runs with different formatting;
+    merged_cells merges the first two cells of every other table row, and
+    one cell per table carries a nested table.
+    """
+    from docx import Document  # only needed to generate
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    file_paths = []
+    for doc_idx in range(documents):
+        doc = Document()
+        section = doc.sections[0]
+        _add_text(section.header.paragraphs[0], _sentence(rng, token_density), rng, split_runs)
+        _add_text(section.footer.paragraphs[0], _sentence(rng, token_density), rng, split_runs)
+
+        table_every = max(1, paragraphs // (tables + 1)) if tables else 0
+        tables_added = 0
+        for para_idx in range(paragraphs):
+            _add_text(doc.add_paragraph(), _sentence(rng, token_density), rng, split_runs)
+            if table_every and tables_added < tables and (para_idx + 1) % table_every == 0:
+                table = doc.add_table(rows=table_rows, cols=table_cols)
+                for row_idx, row in enumerate(table.rows):
+                    for cell in row.cells:
+                        _add_text(cell.paragraphs[0], _sentence(rng, token_density)[:8], rng, split_runs)
+                    if merged_cells and table_cols > 1 and row_idx % 2:
+                        row.cells[0].merge(row.cells[1])
+                nested = table.cell(0, table_cols - 1).add_table(rows=2, cols=2)
+                for cell in nested._cells:
+                    _add_text(cell.paragraphs[0], _sentence(rng, token_density)[:6], rng, split_runs)
+                tables_added += 1
+
+        file_path = os.path.join(directory, f"bench_{doc_idx:04d}.docx")
+        doc.save(file_path)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def _measure(func: Callable[[], Any], repeats: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Run func repeats times (after an untimed setup each time) and summarize the wall times"""
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return {'median': statistics.median(times), 'min': min(times), 'max': max(times), 'repeats': repeats}
+
+
+def micro_benchmarks(file_paths: List[str], repeats: int) -> Dict[str, Dict[str, Any]]:
+    """Replacement core, loaders and result archive, each timed in isolation"""
+    from docx import Document
+    from docxreplace_engine import (DocumentProcessor, LiteralMatcher, RegexMatcher, QuickRejectFilter,
+                                    XmlStreamProcessor, build_result_archive, save_changed_parts)
+    from docxreplace_loaders import scan_folder
+
+    literal = LiteralMatcher(BENCH_LITERAL_MAP)
+    regex = RegexMatcher(BENCH_REGEX_MAP)
+    texts = []
+    for file_path in file_paths:
+        doc = Document(file_path)
+        texts.extend(para.text for para in doc.paragraphs)
+        texts.extend(para.text for table in doc.tables for cell in table._cells for para in cell.paragraphs)
+
+    results = {
+        'literal_sub': _measure(lambda: [literal.sub(text) for text in texts], repeats),
+        'regex_sub': _measure(lambda: [regex.sub(text) for text in texts], repeats),
+        'literal_edit_rounds': _measure(lambda: [literal.edit_rounds(text) for text in texts], repeats),
+    }
+
+    # The replacement mutates documents, so each repeat works on freshly loaded ones
+    docs = []
+
+    def load():
+        docs[:] = [Document(file_path) for file_path in file_paths]
+
+    results['document_load'] = _measure(load, repeats)
+    doc_parts = []
+
+    def replace():
+        doc_parts[:] = [{} for _ in docs]
+        for doc, parts in zip(docs, doc_parts):
+            DocumentProcessor.perform_replacement_in_doc(doc, '', {}, matcher=literal, parts=parts)
+
+    results['perform_replacement_in_doc'] = _measure(replace, repeats, setup=load)
+    results['document_save'] = _measure(
+        lambda: [doc.save(io.BytesIO()) for doc in docs], repeats)
+    results['save_changed_parts'] = _measure(
+        lambda: [save_changed_parts(doc, file_path, io.BytesIO(), parts)
+                 for doc, file_path, parts in zip(docs, file_paths, doc_parts)], repeats)
+    results['xml_process_package'] = _measure(
+        lambda: [XmlStreamProcessor.process_package(file_path, None, literal) for file_path in file_paths], repeats)
+
+    quick_filter = QuickRejectFilter(literal)
+    results['quick_reject_scan'] = _measure(
+        lambda: [quick_filter.may_match(file_path) for file_path in file_paths], repeats)
+    corpus_dir = os.path.dirname(os.path.abspath(file_paths[0]))
+    results['scan_folder'] = _measure(lambda: scan_folder(corpus_dir), repeats)
+
+    with tempfile.TemporaryDirectory(prefix='docx_bench_') as temp_dir:
+        archive_path = os.path.join(temp_dir, 'results.zip')
+        results['build_result_archive'] = _measure(lambda: build_result_archive(corpus_dir, archive_path), repeats)
+
+    return results
+
+
+def macro_benchmarks(file_paths: List[str], repeats: int, workers: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Whole runs as the web app starts them, per mode and engine"""
+    import zipfile
+    from docxreplace_engine import (run_documents, run_archive, DRY_RUN_MODE, COPIES_MODE, IN_PLACE_MODE,
+                                    DOCX_ENGINE, XML_ENGINE)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='docx_bench_') as temp_dir:
+        work_dir = os.path.join(temp_dir, 'work')
+        output_dir = os.path.join(temp_dir, 'output')
+        work_files = []
+
+        def fresh_copies():
+            # In-place runs rewrite their inputs, so every repeat starts from the pristine corpus
+            shutil.rmtree(work_dir, ignore_errors=True)
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.makedirs(work_dir)
+            os.makedirs(output_dir)
+            work_files[:] = [shutil.copy2(file_path, work_dir) for file_path in file_paths]
+
+        for engine_name, engine in (('docx', DOCX_ENGINE), ('xml', XML_ENGINE)):
+            for mode_name, mode in (('dry_run', DRY_RUN_MODE), ('copies', COPIES_MODE), ('in_place', IN_PLACE_MODE)):
+                for map_name, replacement_map, regex_mode in (('literal', BENCH_LITERAL_MAP, False),
+                                                               ('regex', BENCH_REGEX_MAP, True)):
+                    results[f'run_documents.{engine_name}.{mode_name}.{map_name}'] = _measure(
+                        lambda: run_documents(work_files, replacement_map, regex_mode, mode, output_dir,
+                                              workers=workers, engine=engine, regex_budget=0),
+                        repeats, setup=fresh_copies)
+
+        for mode_name, mode in (('copies', COPIES_MODE), ('in_place', IN_PLACE_MODE)):
+            results[f'run_documents.docx.{mode_name}.literal.pipelined'] = _measure(
+                lambda: run_documents(work_files, BENCH_LITERAL_MAP, False, mode, output_dir,
+                                      engine=DOCX_ENGINE, pipelined=True),
+                repeats, setup=fresh_copies)
+
+        archive_path = os.path.join(temp_dir, 'corpus.zip')
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_STORED) as zout:
+            for file_path in file_paths:
+                zout.write(file_path, os.path.basename(file_path))
+        output_archive = os.path.join(temp_dir, 'replaced.zip')
+        for mode_name, mode in (('dry_run', DRY_RUN_MODE), ('copies', COPIES_MODE)):
+            results[f'run_archive.docx.{mode_name}.literal'] = _measure(
+                lambda: run_archive(archive_path, BENCH_LITERAL_MAP, False, mode, output_archive), repeats)
+
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Median-to-median change per benchmark present in both; regression when slower by more than threshold %"""
+    rows = []
+    for name, current in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous is None or not previous['median']:
+            continue
+        change = (current['median'] - previous['median']) / previous['median'] * 100
+        rows.append({'benchmark': name, 'baseline': previous['median'], 'current': current['median'],
+                     'change_pct': change, 'regression': change > threshold})
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='docxreplace-bench', description="DocXReplace corpus generator and benchmarks.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def corpus_options(command):
+        command.add_argument('--documents', type=int, default=DEFAULT_CORPUS['documents'])
+        command.add_argument('--paragraphs', type=int, default=DEFAULT_CORPUS['paragraphs'], help="body paragraphs per document")
+        command.add_argument('--tables', type=int, default=DEFAULT_CORPUS['tables'], help="tables per document")
+        command.add_argument('--table-rows', type=int, default=DEFAULT_CORPUS['table_rows'])
+        command.add_argument('--table-cols', type=int, default=DEFAULT_CORPUS['table_cols'])
+        command.add_argument('--no-merged-cells', action='store_true', help="do not merge table cells")
+        command.add_argument('--token-density', type=float, default=DEFAULT_CORPUS['token_density'],
+                             help="share of words that are replacement tokens (default: 0.2)")
+        command.add_argument('--split-runs', type=float, default=DEFAULT_CORPUS['split_runs'],
+                             help="share of tokens split across two runs (default: 0.3)")
+        command.add_argument('--seed', type=int, default=DEFAULT_CORPUS['seed'])
+
+    generate = commands.add_parser('generate', help="write a synthetic corpus")
+    generate.add_argument('directory')
+    corpus_options(generate)
+
+    run = commands.add_parser('run', help="run the benchmarks")
+    run.add_argument('--corpus', help="existing corpus folder (default: generate one in a temp folder)")
+    corpus_options(run)
+    run.add_argument('--suite', choices=('micro', 'macro', 'all'), default='all')
+    run.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="timed repeats per benchmark (default: 3)")
+    run.add_argument('--workers', type=int, default=1, help="worker processes for macro runs (default: 1)")
+    run.add_argument('--out', help="write results JSON here")
+    run.add_argument('--baseline', help="results JSON to compare against")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                     help="percent slowdown counted as a regression (default: 10)")
+    return parser
+
+
+def _corpus_args(args) -> Dict[str, Any]:
+    return {'documents': args.documents, 'paragraphs': args.paragraphs, 'tables': args.tables,
+            'table_rows': args.table_rows, 'table_cols': args.table_cols, 'merged_cells': not args.no_merged_cells,
+            'token_density': args.token_density, 'split_runs': args.split_runs, 'seed': args.seed}
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'generate':
+        file_paths = generate_corpus(args.directory, **_corpus_args(args))
+        print(f"📁 Wrote {len(file_paths)} documents to {args.directory}", file=sys.stderr)
+        return 0
+
+    temp_dir = None
+    try:
+        if args.corpus:
+            file_paths = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus)
+                                if name.endswith('.docx'))
+            corpus = {'path': os.path.abspath(args.corpus), 'documents': len(file_paths)}
+        else:
+            temp_dir = tempfile.mkdtemp(prefix='docx_bench_corpus_')
+            corpus = _corpus_args(args)
+            print(f"📁 Generating {args.documents} documents...", file=sys.stderr)
+            file_paths = generate_corpus(temp_dir, **corpus)
+
+        benchmarks = {}
+        if args.suite in ('micro', 'all'):
+            print("⏱️ Micro benchmarks...", file=sys.stderr)
+            benchmarks.update(micro_benchmarks(file_paths, args.repeats))
+        if args.suite in ('macro', 'all'):
+            print("⏱️ Macro benchmarks...", file=sys.stderr)
+            benchmarks.update(macro_benchmarks(file_paths, args.repeats, args.workers))
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'corpus': corpus,
+            'repeats': args.repeats,
+            'workers': args.workers,
+        },
+        'benchmarks': benchmarks,
+    }
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    for name, stats in benchmarks.items():
+        print(f"{name:55s} {stats['median'] * 1000:10.1f} ms")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    print(f"\nAgainst {args.baseline} (regression: > {args.threshold:g}% slower):")
+    for row in rows:
+        flag = "  ❌ regression" if row['regression'] else ""
+        print(f"{row['benchmark']:55s} {row['baseline'] * 1000:10.1f} → {row['current'] * 1000:10.1f} ms "
+              f"({row['change_pct']:+.1f}%){flag}")
+    return 1 if any(row['regression'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Result Cache
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+SQLite-backed cache of replacement results keyed by document content and replacement map.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Optional, Any
+
+# Bump when engine changes alter the output produced for the same input and map
+ENGINE_VERSION = "3.4"
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".docxreplace", "result_cache.sqlite3")
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_replacement_map(replacement_map: Dict[str, str], regex_mode: bool, engine: str) -> str:
+    """Hash of everything besides the input bytes that determines a document's output.
+
+    Map order is kept: replacements are applied in sequence, so reordering the
+    map can change the result.
+    """
+    normalized = json.dumps({
+        'map': list(replacement_map.items()),
+        'regex_mode': bool(regex_mode),
+        'engine': engine,
+        'engine_version': ENGINE_VERSION,
+    }, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Persistent (input hash, map hash) -> result store with LRU eviction by size.
+
+    An entry records the replacement count and, when the document changed,
+    the output bytes. Entries written by dry runs carry only the count and
+    are not used to produce files.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                input_hash TEXT NOT NULL,
+                map_hash TEXT NOT NULL,
+                replacements INTEGER NOT NULL,
+                output BLOB,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (input_hash, map_hash)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.commit()
+
+    def lookup(self, input_hash: str, map_hash: str, need_output: bool = True) -> Optional[Dict[str, Any]]:
+        """Return {'replacements', 'output'} for a usable entry, counting the hit or miss"""
+        row = self._conn.execute(
+            "SELECT replacements, output FROM results WHERE input_hash = ? AND map_hash = ?",
+            (input_hash, map_hash)).fetchone()
+
+        # A changed document is only usable if its output was stored
+        if row is None or (need_output and row[0] > 0 and row[1] is None):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute("UPDATE results SET last_used = ? WHERE input_hash = ? AND map_hash = ?",
+                           (time.time(), input_hash, map_hash))
+        self._conn.commit()
+        return {'replacements': row[0], 'output': row[1]}
+
+    def store(self, input_hash: str, map_hash: str, replacements: int, output: Optional[bytes] = None):
+        """Record a result, keeping an existing output when a dry run only knows the count"""
+        size = len(output) if output else 0
+        if size > self.max_bytes:
+            return
+
+        if output is None and replacements > 0:
+            existing = self._conn.execute(
+                "SELECT 1 FROM results WHERE input_hash = ? AND map_hash = ? AND output IS NOT NULL",
+                (input_hash, map_hash)).fetchone()
+            if existing:
+                return
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (input_hash, map_hash, replacements, output, size, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (input_hash, map_hash, replacements, output, size, time.time()))
+        self._conn.commit()
+        if size:
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the stored outputs fit in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so every store near the limit doesn't trigger another pass
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for input_hash, map_hash, size in self._conn.execute(
+                "SELECT input_hash, map_hash, size FROM results WHERE size > 0 ORDER BY last_used"):
+            victims.append((input_hash, map_hash))
+            freed += size
+            if freed >= target:
+                break
+
+        self._conn.executemany("DELETE FROM results WHERE input_hash = ? AND map_hash = ?", victims)
+        self._conn.commit()
+        self.evicted += len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this session plus the cache's current size"""
+        entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evicted': self.evicted,
+                'entries': entries, 'bytes': total}
+
+    def clear(self):
+        """Remove every cached result"""
+        self._conn.execute("DELETE FROM results")
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+
+    def close(self):
+        self._conn.close()
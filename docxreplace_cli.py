@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Command Line Interface
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Headless load -> replace -> save runs for cron jobs and CI pipelines.
+Summary and per-file results are printed as JSON; progress goes to stderr.
+
+    python docxreplace_cli.py --map patterns.json --folder ./docs --mode copies --output ./out
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Engine, loaders and python-docx are imported only once arguments are valid,
+# so --help and usage errors return without loading them
+MODES = {
+    'dry-run': "Dry Run (preview only)",
+    'copies': "Create Modified Copies (originals untouched)",
+    'in-place': "In-place Replace (modify originals)",
+}
+ENGINES = ('docx', 'docx-rewrite', 'xml')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog='docxreplace',
+        description="Find and replace text across Word documents without the web interface.")
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--folder', help="folder to scan recursively for .docx files")
+    source.add_argument('--excel', help="DocXScan Excel report with a 'File Path' column")
+    source.add_argument('--zip', help="ZIP archive of documents, streamed into an output ZIP")
+
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help="with --folder: file glob to include (repeatable, default: *.docx)")
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help="with --folder: file or folder glob to skip (repeatable, default: ~*.docx)")
+    parser.add_argument('--max-depth', type=int, metavar='N',
+                        help="with --folder: folder levels to descend below the root; 0 scans only the root "
+                             "(default: unlimited)")
+    parser.add_argument('--map', required=True, help="replacement JSON file ({\"find\": \"replace\", ...})")
+    parser.add_argument('--mode', choices=list(MODES), default='dry-run', help="processing mode (default: dry-run)")
+    parser.add_argument('--output', help="output folder for copies, or output .zip for --zip")
+    parser.add_argument('--mirror-tree', action='store_true',
+                        help="with --mode copies: keep each copy's subfolder relative to the inputs' common folder")
+    parser.add_argument('--regex', action='store_true', help="treat map keys as regular expressions")
+    parser.add_argument('--regex-budget', type=float, metavar='SECONDS',
+                        help="with --regex: seconds one pattern may spend on one paragraph before it is "
+                             "quarantined (default: 30, 0 = no limit)")
+    parser.add_argument('--workers', type=int, default=1, help="with --folder or --excel: worker processes (default: 1)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="with --workers 1: prefetch documents and write outputs in background threads")
+    parser.add_argument('--engine', choices=ENGINES, default='docx',
+                        help="docx: python-docx object model, editing only the touched text; docx-rewrite: "
+                             "rebuild each changed paragraph as one run; xml: raw XML streaming (default: docx)")
+    parser.add_argument('--no-quick-reject', action='store_true', help="parse every document, even ones that cannot match")
+    parser.add_argument('--profile-patterns', action='store_true',
+                        help="add per-pattern match counts and evaluation time to the report")
+    parser.add_argument('--cache', metavar='PATH', help="with --folder or --excel: SQLite result cache to reuse results from earlier runs")
+    parser.add_argument('--journal', metavar='PATH',
+                        help="run journal; if PATH holds an unfinished run with the same settings, "
+                             "files it already finished are skipped (deleted once the run completes)")
+    parser.add_argument('--json-out', metavar='PATH', help="write the JSON report to a file instead of stdout")
+    parser.add_argument('--quiet', action='store_true', help="do not print progress messages to stderr")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.mode != 'dry-run' and (args.zip or args.mode == 'copies') and not args.output:
+        parser.error("--output is required for this mode")
+
+    try:
+        with open(args.map, 'r', encoding='utf-8') as f:
+            replacement_map = json.load(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"could not load replacement map: {e}")
+    if not isinstance(replacement_map, dict):
+        parser.error("replacement map must be a JSON object")
+
+    from docxreplace_engine import (DocumentProcessor, run_documents, run_archive, DOCX_ENGINE,
+                                    DOCX_REWRITE_ENGINE, XML_ENGINE, DEFAULT_REGEX_BUDGET)
+
+    errors = DocumentProcessor.validate_replacement_map(replacement_map)
+    if errors:
+        parser.error("invalid replacement map: " + "; ".join(errors[:5]))
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    mode = MODES[args.mode]
+    engine = {'docx': DOCX_ENGINE, 'docx-rewrite': DOCX_REWRITE_ENGINE, 'xml': XML_ENGINE}[args.engine]
+    quick_reject = not args.no_quick_reject
+    regex_budget = DEFAULT_REGEX_BUDGET if args.regex_budget is None else args.regex_budget
+
+    if args.journal and (args.zip or args.mode == 'dry-run'):
+        parser.error("--journal cannot be used with --zip or --mode dry-run")
+    if args.pipeline and args.zip:
+        parser.error("--pipeline cannot be used with --zip")
+    if args.zip and (args.workers != 1 or args.cache):
+        parser.error("--workers and --cache cannot be used with --zip")
+
+    result_cache = None
+    if args.cache:
+        from docxreplace_cache import ResultCache
+        result_cache = ResultCache(args.cache)
+
+    journal = None
+    if args.journal:
+        from docxreplace_journal import RunJournal
+        journal = RunJournal(args.journal)
+
+    try:
+        if args.zip:
+            results = run_archive(args.zip, replacement_map, args.regex, mode, args.output,
+                                  log=log, engine=engine, quick_reject=quick_reject,
+                                  profile_patterns=args.profile_patterns, regex_budget=regex_budget)
+        else:
+            from docxreplace_loaders import scan_folder, read_excel_paths, DEFAULT_INCLUDE, DEFAULT_EXCLUDE
+            from docxreplace_journal import JournalMismatch
+
+            if args.folder:
+                if not os.path.isdir(args.folder):
+                    parser.error(f"folder not found: {args.folder}")
+                file_paths = scan_folder(args.folder, args.include or DEFAULT_INCLUDE,
+                                         DEFAULT_EXCLUDE if args.exclude is None else args.exclude,
+                                         args.max_depth)
+                log(f"📁 Loaded {len(file_paths)} files from folder: {os.path.basename(args.folder)}")
+            else:
+                file_paths, counts = read_excel_paths(args.excel)
+                log(f"📊 Loaded {len(file_paths)} files from Excel: {os.path.basename(args.excel)}")
+                if counts['missing'] > 0:
+                    log(f"⚠️ {counts['missing']} files from Excel list were not found")
+                if counts['duplicates'] > 0:
+                    log(f"ℹ️ Skipped {counts['duplicates']} duplicate paths in Excel list")
+
+            if args.output and mode == MODES['copies']:
+                os.makedirs(args.output, exist_ok=True)
+
+            try:
+                results = run_documents(file_paths, replacement_map, args.regex, mode, args.output,
+                                        workers=args.workers, log=log, engine=engine,
+                                        quick_reject=quick_reject, result_cache=result_cache,
+                                        profile_patterns=args.profile_patterns, regex_budget=regex_budget,
+                                        mirror_tree=args.mirror_tree, journal=journal,
+                                        pipelined=args.pipeline)
+            except JournalMismatch as e:
+                parser.error(str(e))
+    finally:
+        if result_cache is not None:
+            result_cache.close()
+        if journal is not None:
+            journal.close()
+
+    files = results.pop('files')
+    report = json.dumps({'summary': results, 'files': files}, indent=2, ensure_ascii=False)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+    return 1 if any(entry['status'] == 'error' for entry in files) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
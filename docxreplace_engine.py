@@ -0,0 +1,2886 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Replacement Engine
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Streamlit-free matching core shared by the DocXReplace web app.
+"""
+
+import codecs
+import copy
+import hashlib
+import html
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError
+from datetime import datetime
+from io import BytesIO
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.part import XmlPart
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from docxreplace_cache import ResultCache, hash_file, hash_replacement_map
+from docxreplace_journal import RunJournal
+from docxreplace_loaders import FileManifest
+from typing import Dict, List, Tuple, Optional, Callable, Union, Set, Any, IO, Iterable
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Processing modes, matching the labels offered by the web app
+DRY_RUN_MODE = "Dry Run (preview only)"
+COPIES_MODE = "Create Modified Copies (originals untouched)"
+IN_PLACE_MODE = "In-place Replace (modify originals)"
+
+# Replacement engines selectable in the web app
+DOCX_ENGINE = "python-docx (object model)"
+DOCX_REWRITE_ENGINE = "python-docx (rewrite changed paragraphs)"
+XML_ENGINE = "Raw XML (streaming)"
+
+# Result archive compression: .docx members are already deflated, so storing them is usually enough
+ARCHIVE_COMPRESSION = {
+    "Stored (fastest)": (zipfile.ZIP_STORED, None),
+    "Fast deflate": (zipfile.ZIP_DEFLATED, 1),
+    "Standard deflate": (zipfile.ZIP_DEFLATED, 6),
+}
+
+# Per-file timing stages in pipeline order. The XML engine reads, matches and
+# writes a package in one streamed pass, which is timed as a single 'stream' stage.
+# Pipelined runs add 'read' (waiting for prefetched bytes) and 'write' (write-behind flush).
+TIMING_STAGES = ('read', 'scan', 'load', 'match', 'mutate', 'save', 'copy', 'stream', 'write')
+
+# Package parts that carry document text
+STORY_PART_RE = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes|comments)\.xml$')
+
+# Tokenizer for the streaming XML engine: comments, tags (quoted attributes may hold '>') and text
+_XML_TOKEN_RE = re.compile(r'<!--.*?-->|<(?:[^>"\']|"[^"]*"|\'[^\']*\')*>|[^<]+', re.S)
+_XML_TAG_RE = re.compile(r'<(/?)([^\s/>]+)')
+_WORD_NS_RE = re.compile(r'xmlns(?::([\w.-]+))?="http://schemas\.openxmlformats\.org/wordprocessingml/2006/main"')
+_BR_TYPE_RE = re.compile(r'\stype="([^"]*)"')
+_XML_CHUNK_SIZE = 1 << 16
+
+# Quick-reject scan: text-bearing markup, and containers whose runs python-docx does not read
+_QUICK_WORD_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+_QUICK_TEXT_RE = re.compile(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>|<w:(tab|ptab|cr|noBreakHyphen)\b[^>]*/>|<w:br\b([^>]*)/>')
+_QUICK_TEXTBOX_RE = re.compile(r'<(w:txbxContent|mc:Fallback)\b[^>]*>(.*?)</\1>', re.S)
+_QUICK_SKIPPED_RE = re.compile(
+    r'<(w:ins|w:del|w:moveFrom|w:moveTo|w:sdt|w:fldSimple|w:smartTag|w:customXml|w:ruby|w:dir|w:bdo'
+    r'|w:txbxContent|mc:Fallback)\b[^>]*(?<!/)>.*?</\1>', re.S)
+_QUICK_ATOMS = {'tab': '\t', 'ptab': '\t', 'cr': '\n', 'noBreakHyphen': '-'}
+
+# Regex mode: seconds a guarded worker may spend in one pattern evaluation (one
+# pattern on one paragraph, or the merged gate) before it is stopped and that
+# pattern is quarantined. Loading and saving documents do not count.
+DEFAULT_REGEX_BUDGET = 30.0
+
+# Pipelined I/O: prefetch threads, and bytes of documents read but not yet written
+PIPELINE_READERS = 4
+PIPELINE_MAX_BYTES = 256 * 1024 * 1024
+
+# Guarded workers publish the regex pattern index they are evaluating here,
+# and in _BEACON_CLOCK the time.monotonic() the evaluation started; the two
+# sentinels mean "in the merged gate" and "not evaluating a regex"
+_PATTERN_BEACON = None
+_BEACON_CLOCK = None
+_BEACON_GATE = -1
+_BEACON_IDLE = -2
+
+
+def _signal(value: int):
+    """Publish what a guarded worker starts evaluating, and since when"""
+    if _PATTERN_BEACON is not None:
+        # Clock first: the parent reads the index first, so it never pairs a new index with an old start
+        _BEACON_CLOCK.value = time.monotonic()
+        _PATTERN_BEACON.value = value
+
+# Compiled maps kept across runs, keyed by (regex_mode, map items)
+_COMPILED_CACHE: 'OrderedDict[Tuple, Union[LiteralMatcher, RegexMatcher]]' = OrderedDict()
+_COMPILED_CACHE_SIZE = 8
+
+# Constructs whose meaning changes once a pattern is merged into an alternation
+_UNMERGEABLE_RE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
+class LiteralMatcher:
+    """Aho-Corasick automaton over the literal keys of a replacement map.
+
+    Built once per run; finds every token present in a paragraph with a single
+    linear scan instead of one substring search per pattern. Patterns are still
+    applied in map order, so maps where one replacement feeds another behave
+    exactly like the sequential str.replace loop.
+    """
+
+    __slots__ = ('patterns', 'replacements', 'invalid', 'order_independent',
+                 '_goto', '_fail', '_out', '_depth')
+
+    def __init__(self, replacement_map: Dict[str, str]):
+        # Empty keys are reported by validate_replacement_map and cannot be matched
+        items = [(old, new) for old, new in replacement_map.items() if old]
+        self.patterns = [old for old, _ in items]
+        self.replacements = [new for _, new in items]
+        # Always empty; kept, like sub()'s on_error, so both matchers share an interface
+        self.invalid: List[Tuple[str, str]] = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._depth: List[int] = [0]
+        self._build()
+
+        self.order_independent = self._check_order_independent()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    @classmethod
+    def _automaton(cls, patterns: List[str]) -> 'LiteralMatcher':
+        """Bare automaton over patterns, for scans only (no replacements)"""
+        matcher = cls.__new__(cls)
+        matcher.patterns = patterns
+        matcher._goto, matcher._fail, matcher._out, matcher._depth = [{}], [0], [()], [0]
+        matcher._build()
+        return matcher
+
+    def _build(self):
+        """Build the trie, failure links and merged output sets"""
+        goto, fail, out, depth = self._goto, self._fail, self._out, self._depth
+
+        for pattern_idx, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    fail.append(0)
+                    out.append(())
+                    depth.append(depth[state] + 1)
+                state = next_state
+            if pattern_idx not in out[state]:
+                out[state] = out[state] + (pattern_idx,)
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                if out[fail[next_state]]:
+                    out[next_state] = out[next_state] + out[fail[next_state]]
+
+    def _scan(self, text: str) -> Tuple[Set[int], int]:
+        """Return the pattern indices found in text and the final automaton state"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return found, state
+
+    def _check_order_independent(self) -> bool:
+        """Check whether a single left-to-right pass equals sequential application.
+
+        That holds when no pattern overlaps or contains another and no
+        replacement can contain, create or destroy a pattern occurrence.
+        """
+        if not self.patterns:
+            return True
+
+        reverse = LiteralMatcher._automaton([pattern[::-1] for pattern in self.patterns])
+
+        for pattern_idx, pattern in enumerate(self.patterns):
+            for matcher, text in ((self, pattern), (reverse, pattern[::-1])):
+                found, state = matcher._scan(text)
+                if found != {pattern_idx}:
+                    return False
+                if matcher._depth[matcher._fail[state]]:
+                    return False
+
+        for replacement in self.replacements:
+            if not replacement:
+                # Deleting a token joins its neighbours, which can form a new match
+                return False
+            for matcher, text in ((self, replacement), (reverse, replacement[::-1])):
+                found, state = matcher._scan(text)
+                if found or matcher._depth[state]:
+                    return False
+
+        # A replacement inside a pattern completes it once its surroundings match ('Q'->'R' with 'xRy')
+        values = LiteralMatcher._automaton(list(self.replacements))
+        if any(values._scan(pattern)[0] for pattern in self.patterns):
+            return False
+
+        return True
+
+    def find_present(self, text: str) -> Set[int]:
+        """Return the indices of all patterns occurring in text (one linear scan)"""
+        return self._scan(text)[0]
+
+    def sub(self, text: str, on_error: Optional[Callable[[str, Exception], None]] = None) -> str:
+        """Apply the replacement map to text with sequential semantics (on_error is unused: literals cannot fail)"""
+        present = self._scan(text)[0]
+        if not present:
+            return text
+
+        if self.order_independent:
+            return self._sub_single_pass(text)
+
+        patterns, replacements = self.patterns, self.replacements
+        pattern_idx = min(present)
+        while True:
+            old_text, new_text = patterns[pattern_idx], replacements[pattern_idx]
+            if old_text != new_text:
+                text = text.replace(old_text, new_text)
+                present = self._scan(text)[0]
+            remaining = [idx for idx in present if idx > pattern_idx]
+            if not remaining:
+                return text
+            pattern_idx = min(remaining)
+
+    def _sub_single_pass(self, text: str) -> str:
+        """Replace all occurrences in one scan; only valid for order-independent maps"""
+        return apply_edits(text, self._single_pass_edits(text))
+
+    def _single_pass_edits(self, text: str) -> List[Tuple[int, int, str, int]]:
+        """Collect every hit of an order-independent map in one scan"""
+        goto, fail, out = self._goto, self._fail, self._out
+        patterns, replacements = self.patterns, self.replacements
+        edits = []
+        state = 0
+
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                # Order independence guarantees exactly one, non-overlapping hit
+                pattern_idx = out[state][0]
+                edits.append((pos + 1 - len(patterns[pattern_idx]), pos + 1,
+                              replacements[pattern_idx], pattern_idx))
+                state = 0
+
+        return edits
+
+    def edit_rounds(self, text: str,
+                    on_error: Optional[Callable[[str, Exception], None]] = None,
+                    profile: Optional['PatternProfile'] = None) -> List[List[Tuple[int, int, str, int]]]:
+        """Return the edits sub() makes as rounds of (start, end, replacement, pattern_idx).
+
+        Offsets in each round refer to the text produced by the previous round.
+        on_error is unused, as in sub(). With a profile, automaton scans are charged to its shared time and each
+        pattern's own search to that pattern.
+        """
+        clock = time.perf_counter
+        started = clock()
+        present = self._scan(text)[0]
+        if not present:
+            if profile is not None:
+                profile.shared_seconds += clock() - started
+            return []
+
+        if self.order_independent:
+            rounds = [self._single_pass_edits(text)]
+            if profile is not None:
+                profile.shared_seconds += clock() - started
+                profile.record_rounds(rounds)
+            return rounds
+
+        if profile is not None:
+            profile.shared_seconds += clock() - started
+        patterns, replacements = self.patterns, self.replacements
+        rounds = []
+        pattern_idx = min(present)
+        while True:
+            old_text, new_text = patterns[pattern_idx], replacements[pattern_idx]
+            if old_text != new_text:
+                started = clock()
+                edits = []
+                start = text.find(old_text)
+                while start != -1:
+                    edits.append((start, start + len(old_text), new_text, pattern_idx))
+                    start = text.find(old_text, start + len(old_text))
+                rounds.append(edits)
+                text = apply_edits(text, edits)
+                scanned = clock()
+                present = self._scan(text)[0]
+                if profile is not None:
+                    profile.seconds[pattern_idx] += scanned - started
+                    profile.shared_seconds += clock() - scanned
+            remaining = [idx for idx in present if idx > pattern_idx]
+            if not remaining:
+                if profile is not None:
+                    profile.record_rounds(rounds)
+                return rounds
+            pattern_idx = min(remaining)
+
+
+def apply_edits(text: str, edits: List[Tuple[int, int, str, int]]) -> str:
+    """Apply one round of sorted, non-overlapping edits to text"""
+    if not edits:
+        return text
+    pieces = []
+    last_end = 0
+    for start, end, replacement, _ in edits:
+        pieces.append(text[last_end:start])
+        pieces.append(replacement)
+        last_end = end
+    pieces.append(text[last_end:])
+    return ''.join(pieces)
+
+
+def splice_segments(segments: List[Tuple[str, bool]],
+                    rounds: List[List[Tuple[int, int, str, int]]]) -> Optional[List[str]]:
+    """Apply edit rounds to a paragraph split into text segments.
+
+    Each segment is (text, editable); editable segments are w:t text, the
+    others are single-character elements such as w:tab that can only be kept
+    or dropped. Only the segments touched by an edit change, and the joined
+    result equals the edited paragraph text. Returns None when an edit cannot
+    be placed without reordering it around a kept element, or when the
+    paragraph has no editable text at all.
+    """
+    texts = [text for text, _ in segments]
+    editable = [flag for _, flag in segments]
+    if not any(editable):
+        return None
+
+    for edits in rounds:
+        # Right to left, so earlier offsets in the round stay valid
+        for start, end, replacement, _ in reversed(edits):
+            bounds = []
+            pos = 0
+            for text in texts:
+                bounds.append((pos, pos + len(text)))
+                pos += len(text)
+            joined = ''.join(texts)
+            expected = joined[:start] + replacement + joined[end:]
+
+            overlapped = [idx for idx, (seg_start, seg_end) in enumerate(bounds)
+                          if seg_start < end and seg_end > start]
+            target = next((idx for idx in overlapped if editable[idx]), None)
+            if target is None:
+                before = [idx for idx, (seg_start, _) in enumerate(bounds)
+                          if editable[idx] and seg_start <= start]
+                after = [idx for idx in range(len(texts)) if editable[idx]]
+                target = before[-1] if before else after[0]
+
+            seg_start = bounds[target][0]
+            offset = min(max(start - seg_start, 0), len(texts[target]))
+
+            for idx in overlapped:
+                cut_start, cut_end = bounds[idx]
+                text = texts[idx]
+                texts[idx] = text[:max(start - cut_start, 0)] + text[min(end - cut_start, len(text)):]
+
+            text = texts[target]
+            texts[target] = text[:offset] + replacement + text[offset:]
+            if ''.join(texts) != expected:
+                return None
+
+    return texts
+
+
+def _iter_xml_tokens(stream, chunk_size: int = _XML_CHUNK_SIZE):
+    """Yield complete XML tokens from a binary stream, reading it chunk by chunk"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    eof = False
+
+    while not eof:
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buffer += decoder.decode(chunk)
+        else:
+            buffer += decoder.decode(b'', final=True)
+            eof = True
+
+        pos = 0
+        while True:
+            match = _XML_TOKEN_RE.match(buffer, pos)
+            # A token touching the end of the buffer may continue in the next chunk
+            if match is None or (match.end() == len(buffer) and not eof):
+                break
+            yield match.group()
+            pos = match.end()
+        buffer = buffer[pos:]
+
+    if buffer:
+        yield buffer
+
+
+def _clone_zip_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """Fresh ZipInfo carrying a member's name, timestamp, compression and attributes"""
+    out_info = zipfile.ZipInfo(info.filename, info.date_time)
+    out_info.compress_type = info.compress_type
+    out_info.create_system = info.create_system
+    out_info.external_attr = info.external_attr
+    out_info.comment = info.comment
+    return out_info
+
+def _copy_member_raw(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Copy a member's stored (compressed) bytes into zout without inflating or recompressing them.
+
+    zipfile has no public raw copy, so the local header is written from a
+    copy of the member's ZipInfo (sizes inline, no data descriptor) and the
+    entry is registered the way ZipFile.write would, for the central
+    directory written on close.
+    """
+    zin.fp.seek(info.header_offset)
+    header = zin.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    zin.fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+    out_info = copy.copy(info)
+    out_info.flag_bits &= ~0x08
+    out_info.header_offset = zout.fp.tell()
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    zout.fp.write(out_info.FileHeader(zip64))
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = zin.fp.read(min(_XML_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated member: {info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    zout.filelist.append(out_info)
+    zout.NameToInfo[out_info.filename] = out_info
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+def _escape_xml_text(text: str) -> str:
+    """Escape text for use as w:t character data"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def _run_text_markup(text: str, prefix: str) -> str:
+    """w:t character data for text; each tab or line break closes the w:t, adds a w:tab/w:br and reopens it"""
+    pieces = _RUN_CONTROL_RE.split(text)
+    markup = [_escape_xml_text(pieces[0])]
+    for control, piece in zip(pieces[1::2], pieces[2::2]):
+        element = 'tab' if control == '\t' else 'br'
+        markup.append(f'</{prefix}t><{prefix}{element}/><{prefix}t xml:space="preserve">{_escape_xml_text(piece)}')
+    return ''.join(markup)
+
+
+def _match_template(new_text: str) -> Callable:
+    """Build the {{match}} replacement callable for a pattern once"""
+    def replace_with_match(match):
+        matched_groups = match.groups()
+        replacement = new_text
+        if matched_groups:
+            for group in matched_groups:
+                replacement = replacement.replace("{{match}}", group, 1)
+        else:
+            replacement = replacement.replace("{{match}}", match.group(0))
+        return replacement
+    return replace_with_match
+
+
+class RegexMatcher:
+    """Precompiled regex replacement map.
+
+    Every pattern is compiled once and its replacement callable is prebuilt.
+    Patterns that can safely share an alternation are merged into one gate
+    regex, so paragraphs without any hit are scanned once instead of N times;
+    paragraphs with a hit get the usual sequential pass over all patterns.
+    """
+
+    __slots__ = ('patterns', 'compiled', 'replacements', 'invalid', 'disabled',
+                 '_gate', '_standalone')
+
+    def __init__(self, replacement_map: Dict[str, str], disabled: Iterable[int] = (), merge: bool = True):
+        """disabled pattern indices keep their slot but never run; merge=False skips the gate"""
+        self.patterns: List[str] = []
+        self.compiled: List[re.Pattern] = []
+        self.replacements: List[Union[str, Callable]] = []
+        self.invalid: List[Tuple[str, str]] = []
+        self.disabled = frozenset(disabled)
+
+        default_flags = re.compile('').flags
+        mergeable = []
+        self._standalone: List[int] = []
+
+        for old_text, new_text in replacement_map.items():
+            try:
+                compiled = re.compile(old_text)
+            except re.error as e:
+                self.invalid.append((old_text, str(e)))
+                continue
+
+            pattern_idx = len(self.patterns)
+            self.patterns.append(old_text)
+            self.compiled.append(compiled)
+            self.replacements.append(_match_template(new_text) if "{{match}}" in new_text else new_text)
+
+            if pattern_idx in self.disabled:
+                continue
+            if (not merge or compiled.flags != default_flags or compiled.groupindex
+                    or _UNMERGEABLE_RE.search(old_text)):
+                self._standalone.append(pattern_idx)
+            else:
+                mergeable.append(f"(?P<p{pattern_idx}>{old_text})")
+
+        self._gate = None
+        if mergeable:
+            try:
+                self._gate = re.compile('|'.join(mergeable))
+            except re.error:
+                self._standalone = [idx for idx in range(len(self.patterns)) if idx not in self.disabled]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _apply(self, pattern_idx: int, text: str,
+               on_error: Optional[Callable[[str, Exception], None]]) -> str:
+        """Apply a single compiled pattern, reporting failures instead of raising"""
+        if pattern_idx in self.disabled:
+            return text
+        _signal(pattern_idx)
+        try:
+            return self.compiled[pattern_idx].sub(self.replacements[pattern_idx], text)
+        except Exception as e:
+            if on_error:
+                on_error(self.patterns[pattern_idx], e)
+            return text
+
+    def sub(self, text: str, on_error: Optional[Callable[[str, Exception], None]] = None) -> str:
+        """Apply the replacement map to text with sequential semantics"""
+        start_idx = 0
+
+        _signal(_BEACON_GATE)
+        if self._gate is not None and self._gate.search(text) is None:
+            # No merged pattern matches; only standalone ones can still fire
+            for pattern_idx in self._standalone:
+                modified_text = self._apply(pattern_idx, text, on_error)
+                if modified_text != text:
+                    text = modified_text
+                    start_idx = pattern_idx + 1
+                    break
+            else:
+                return self._leave(text)
+
+        for pattern_idx in range(start_idx, len(self.patterns)):
+            text = self._apply(pattern_idx, text, on_error)
+        return self._leave(text)
+
+    @staticmethod
+    def _leave(result):
+        """Mark the end of regex evaluation for the budget guard"""
+        _signal(_BEACON_IDLE)
+        return result
+
+    def _edits(self, pattern_idx: int, text: str,
+               on_error: Optional[Callable[[str, Exception], None]]) -> List[Tuple[int, int, str, int]]:
+        """Collect the edits of a single pattern, mirroring what _apply would do"""
+        if pattern_idx in self.disabled:
+            return []
+        _signal(pattern_idx)
+        replacement = self.replacements[pattern_idx]
+        try:
+            if callable(replacement):
+                return [(match.start(), match.end(), replacement(match), pattern_idx)
+                        for match in self.compiled[pattern_idx].finditer(text)]
+            return [(match.start(), match.end(), match.expand(replacement), pattern_idx)
+                    for match in self.compiled[pattern_idx].finditer(text)]
+        except Exception as e:
+            if on_error:
+                on_error(self.patterns[pattern_idx], e)
+            return []
+
+    def edit_rounds(self, text: str,
+                    on_error: Optional[Callable[[str, Exception], None]] = None,
+                    profile: Optional['PatternProfile'] = None) -> List[List[Tuple[int, int, str, int]]]:
+        """Return the edits sub() makes as rounds of (start, end, replacement, pattern_idx).
+
+        Offsets in each round refer to the text produced by the previous round.
+        With a profile, the merged gate search is charged to its shared time
+        and every individual pattern evaluation to that pattern.
+        """
+        clock = time.perf_counter
+        rounds = []
+        start_idx = 0
+
+        started = clock()
+        _signal(_BEACON_GATE)
+        gate_missed = self._gate is not None and self._gate.search(text) is None
+        if profile is not None:
+            profile.shared_seconds += clock() - started
+
+        if gate_missed:
+            for pattern_idx in self._standalone:
+                started = clock()
+                edits = self._edits(pattern_idx, text, on_error)
+                if profile is not None:
+                    profile.seconds[pattern_idx] += clock() - started
+                modified_text = apply_edits(text, edits)
+                if modified_text != text:
+                    rounds.append(edits)
+                    text = modified_text
+                    start_idx = pattern_idx + 1
+                    break
+            else:
+                return self._leave(rounds)
+
+        for pattern_idx in range(start_idx, len(self.patterns)):
+            started = clock()
+            edits = self._edits(pattern_idx, text, on_error)
+            if profile is not None:
+                profile.seconds[pattern_idx] += clock() - started
+            if edits:
+                rounds.append(edits)
+                text = apply_edits(text, edits)
+        if profile is not None:
+            profile.record_rounds(rounds)
+        return self._leave(rounds)
+
+
+def compile_replacement_map(replacement_map: Dict[str, str],
+                            regex_mode: bool = False) -> Union[LiteralMatcher, RegexMatcher]:
+    """Compile a replacement map once, reusing the result for identical maps"""
+    cache_key = (regex_mode, tuple(replacement_map.items()))
+    matcher = _COMPILED_CACHE.get(cache_key)
+
+    if matcher is None:
+        matcher = RegexMatcher(replacement_map) if regex_mode else LiteralMatcher(replacement_map)
+        _COMPILED_CACHE[cache_key] = matcher
+        if len(_COMPILED_CACHE) > _COMPILED_CACHE_SIZE:
+            _COMPILED_CACHE.popitem(last=False)
+    else:
+        _COMPILED_CACHE.move_to_end(cache_key)
+
+    return matcher
+
+
+class PatternProfile:
+    """Per-pattern match counts and evaluation time for one file or a whole run.
+
+    Indices follow the compiled matcher's patterns. Work done for all
+    patterns at once (the literal automaton scan, the merged regex gate) is
+    kept in shared_seconds instead of being split across patterns.
+    """
+
+    __slots__ = ('matches', 'paragraphs', 'files', 'seconds', 'shared_seconds')
+
+    def __init__(self, pattern_count: int):
+        self.matches = [0] * pattern_count
+        self.paragraphs = [0] * pattern_count
+        self.files = [0] * pattern_count
+        self.seconds = [0.0] * pattern_count
+        self.shared_seconds = 0.0
+
+    def record_rounds(self, rounds: List[List[Tuple[int, int, str, int]]]):
+        """Count the edits of one paragraph"""
+        hit = set()
+        for edits in rounds:
+            for edit in edits:
+                self.matches[edit[3]] += 1
+                hit.add(edit[3])
+        for pattern_idx in hit:
+            self.paragraphs[pattern_idx] += 1
+
+    def file_stats(self) -> Dict[str, Any]:
+        """Compact, picklable form of a single file's profile"""
+        return {
+            'patterns': {idx: (self.matches[idx], self.paragraphs[idx], self.seconds[idx])
+                         for idx in range(len(self.matches)) if self.matches[idx] or self.seconds[idx]},
+            'shared_seconds': self.shared_seconds,
+        }
+
+    def merge_file(self, stats: Dict[str, Any]):
+        """Add one file's file_stats() to a run profile"""
+        for pattern_idx, (matches, paragraphs, seconds) in stats['patterns'].items():
+            self.matches[pattern_idx] += matches
+            self.paragraphs[pattern_idx] += paragraphs
+            self.seconds[pattern_idx] += seconds
+            if matches:
+                self.files[pattern_idx] += 1
+        self.shared_seconds += stats['shared_seconds']
+
+    def report(self, patterns: List[str]) -> Dict[str, Any]:
+        """Rows in map order plus the shared time, for display and export"""
+        rows = [{'pattern': pattern, 'matches': self.matches[idx], 'paragraphs': self.paragraphs[idx],
+                 'files': self.files[idx], 'time_ms': round(self.seconds[idx] * 1000, 3)}
+                for idx, pattern in enumerate(patterns)]
+        return {'patterns': rows, 'shared_ms': round(self.shared_seconds * 1000, 3),
+                'unused': sum(1 for row in rows if not row['matches'])}
+
+
+class StageTimer:
+    """Wall-clock seconds spent in each processing stage of one file"""
+
+    __slots__ = ('timings',)
+
+    def __init__(self):
+        self.timings = {}
+
+    def add(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def since(self, stage: str, started: float) -> float:
+        """Charge the time since started to stage; returns the current clock for chaining"""
+        now = time.perf_counter()
+        self.add(stage, now - started)
+        return now
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize_timings(file_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/max per stage (and for whole files) over the files that went through it"""
+    samples = {stage: [] for stage in TIMING_STAGES}
+    samples['total'] = []
+    for entry in file_results:
+        if not entry.get('timings'):
+            continue
+        for stage, seconds in entry['timings'].items():
+            samples[stage].append(seconds)
+        samples['total'].append(entry['elapsed'])
+    
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        values.sort()
+        summary[stage] = {'files': len(values), 'total': sum(values), 'p50': _percentile(values, 50),
+                          'p95': _percentile(values, 95), 'max': values[-1]}
+    return summary
+
+def timing_rows(file_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One flat row per file with milliseconds per stage, for CSV/JSON export"""
+    rows = []
+    for entry in file_results:
+        timings = entry.get('timings') or {}
+        row = {'file': entry['file'], 'status': entry['status'], 'replacements': entry['replacements'],
+               'total_ms': round(entry.get('elapsed', 0.0) * 1000, 3)}
+        for stage in TIMING_STAGES:
+            row[f'{stage}_ms'] = round(timings[stage] * 1000, 3) if stage in timings else None
+        rows.append(row)
+    return rows
+
+def summarize_parts(file_results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Replacements per story part summed over all files, largest first"""
+    totals = {}
+    for entry in file_results:
+        for part_name, count in (entry.get('parts') or {}).items():
+            totals[part_name] = totals.get(part_name, 0) + count
+    return dict(sorted(totals.items(), key=lambda item: (-item[1], item[0])))
+
+def _format_parts(part_counts: Dict[str, int]) -> str:
+    return ", ".join(f"{part_name} {count}" for part_name, count in part_counts.items())
+
+
+def _discard_message(message: str):
+    """Default log sink for callers that do not collect console output"""
+
+
+_W_P, _W_TC, _W_TR, _W_TBL, _W_T = qn('w:p'), qn('w:tc'), qn('w:tr'), qn('w:tbl'), qn('w:t')
+_XML_SPACE = qn('xml:space')
+# Characters a run's text cannot hold; written as w:tab and w:br like python-docx's Run.text
+_RUN_CONTROL_RE = re.compile(r'([\t\n\r])')
+# The elements python-docx reads paragraph text from, in the same order
+_PARAGRAPH_RUNS_XPATH = 'w:r | w:hyperlink/w:r'
+_RUN_CONTENT_XPATH = 'w:br | w:cr | w:noBreakHyphen | w:ptab | w:t | w:tab'
+
+
+def iter_story_parts(doc: Document) -> Iterable[Tuple[str, Any, Any]]:
+    """(part name, part, root element) for every story part of the package, each once.
+
+    Covers what STORY_PART_RE names: body, headers, footers, footnotes,
+    endnotes and comments. python-docx loads some of these as plain blobs;
+    those are parsed here and written back with store_story_part.
+    """
+    for part in doc.part.package.iter_parts():
+        match = STORY_PART_RE.match(str(part.partname).lstrip('/'))
+        if match is None:
+            continue
+        root = part.element if isinstance(part, XmlPart) else parse_xml(part.blob)
+        yield match.group(1), part, root
+
+
+def store_story_part(part, root):
+    """Write an edited blob-backed story part back; XML parts are edited in place"""
+    if not isinstance(part, XmlPart):
+        part._blob = serialize_part_xml(root)
+
+
+def save_changed_parts(doc: Document, source: Union[str, IO[bytes]], output: Union[str, IO[bytes]],
+                       part_names: Iterable[str]) -> bool:
+    """Save doc by re-serializing only the named story parts of the package it was loaded from.
+
+    part_names are story part names as counted by perform_replacement_in_doc
+    ('document', 'header1', ...). Every other ZIP member is copied as its
+    stored compressed bytes, so images, fonts, styles and numbering are
+    neither inflated nor recompressed. Returns False, writing nothing, when
+    none of the parts' bytes differ from the source. Falls back to a full
+    doc.save if a part cannot be matched to a member of the source.
+    """
+    member_names = {f'word/{part_name}.xml' for part_name in part_names}
+    parts = {str(part.partname).lstrip('/'): part for part in doc.part.package.iter_parts()}
+    with zipfile.ZipFile(source, 'r') as zin:
+        members = {info.filename: info for info in zin.infolist()}
+        if not member_names <= members.keys() or not member_names <= parts.keys():
+            doc.save(output)
+            return True
+        
+        changed = {}
+        for member_name in member_names:
+            blob = parts[member_name].blob
+            if blob != zin.read(members[member_name]):
+                changed[member_name] = blob
+        if not changed:
+            return False
+        
+        with zipfile.ZipFile(output, 'w') as zout:
+            for info in zin.infolist():
+                if info.filename in changed:
+                    zout.writestr(_clone_zip_info(info), changed[info.filename])
+                else:
+                    _copy_member_raw(zin, zout, info)
+    return True
+
+
+def set_run_text(t, text: str):
+    """Give a w:t new text, writing tabs and line breaks as w:tab/w:br siblings after it"""
+    pieces = _RUN_CONTROL_RE.split(text)
+    anchor = t
+    for idx, piece in enumerate(pieces):
+        if idx % 2:
+            element = t.makeelement(qn('w:tab') if piece == '\t' else qn('w:br'), {})
+        elif idx == 0:
+            element = t
+            element.text = piece
+        elif piece:
+            element = t.makeelement(_W_T, {})
+            element.text = piece
+        else:
+            continue
+        if element.tag == _W_T and piece != piece.strip():
+            element.set(_XML_SPACE, 'preserve')
+        if element is not t:
+            anchor.addnext(element)
+        anchor = element
+
+
+def splice_paragraph_runs(p, rounds: List[List[Tuple[int, int, str, int]]], modified_text: str) -> bool:
+    """Apply edit rounds to a w:p by changing only the w:t nodes the edits touch.
+
+    Edit offsets into the paragraph text are mapped back onto the runs' text
+    elements, so tokens split across runs are handled and everything else
+    (run properties, bookmarks, field codes, drawings) stays as it was.
+    When an edit cannot be placed between the runs, the new text goes into
+    the first w:t and the paragraph's other text is cleared. Returns False
+    if the paragraph has no w:t to edit; the caller then rewrites it.
+    """
+    elements = [child for r in p.xpath(_PARAGRAPH_RUNS_XPATH) for child in r.xpath(_RUN_CONTENT_XPATH)]
+    # Page and column breaks read as '' and are never part of an edit
+    elements = [element for element in elements if element.tag == _W_T or str(element)]
+    segments = [(str(element), element.tag == _W_T) for element in elements]
+
+    new_texts = splice_segments(segments, rounds)
+    if new_texts is None:
+        first = next((idx for idx, (_, editable) in enumerate(segments) if editable), None)
+        if first is None:
+            return False
+        new_texts = ['' for _ in segments]
+        new_texts[first] = modified_text
+
+    for element, (text, editable), new_text in zip(elements, segments, new_texts):
+        if new_text == text:
+            continue
+        if editable:
+            set_run_text(element, new_text)
+        else:
+            element.getparent().remove(element)
+    return True
+
+
+def _sibling_index(element, tag: str) -> int:
+    return sum(1 for _ in element.itersiblings(tag, preceding=True))
+
+
+def _story_location(p, part_name: str, para_idx: int) -> str:
+    """Report location of a paragraph, with table coordinates (outermost first) inside cells"""
+    cells = list(p.iterancestors(_W_TC))
+    if not cells:
+        return f'{part_name}_paragraph_{para_idx}'
+    
+    location = part_name
+    for tc in reversed(cells):
+        tr = next(tc.iterancestors(_W_TR))
+        tbl = next(tr.iterancestors(_W_TBL))
+        location += (f'_table_{_sibling_index(tbl, _W_TBL)}_row_{_sibling_index(tr, _W_TR)}'
+                     f'_cell_{_sibling_index(tc, _W_TC)}')
+    return f'{location}_para_{_sibling_index(p, _W_P)}'
+
+
+class DocumentProcessor:
+    """Handle document processing operations"""
+    
+    @staticmethod
+    def validate_replacement_map(replacement_map: Dict[str, str]) -> List[str]:
+        """Validate replacement map for common issues"""
+        errors = []
+        
+        for old_text, new_text in replacement_map.items():
+            if not old_text.strip():
+                errors.append("Empty search pattern found")
+            if len(old_text) > 1000:
+                errors.append(f"Search pattern too long: {old_text[:50]}...")
+            if not isinstance(new_text, str):
+                errors.append(f"Invalid replacement type for '{old_text}': expected string")
+        
+        return errors
+    
+    @staticmethod
+    def perform_replacement_in_doc(doc: Document, file_path: str, 
+                                 replacement_map: Dict[str, str], 
+                                 regex_mode: bool = False,
+                                 matcher: Optional[Union[LiteralMatcher, RegexMatcher]] = None,
+                                 log: Optional[Callable[[str], None]] = None,
+                                 timer: Optional[StageTimer] = None,
+                                 profile: Optional[PatternProfile] = None,
+                                 parts: Optional[Dict[str, int]] = None,
+                                 splice_runs: bool = True) -> Tuple[int, List[Dict]]:
+        """Perform replacements in every story part of a document.
+
+        With splice_runs only the w:t nodes an edit touches are changed (see
+        splice_paragraph_runs); otherwise a changed paragraph is rebuilt as a
+        single run. Changed paragraphs are counted per part into parts (e.g.
+        'document', 'header1', 'footnotes') when given.
+        """
+        log = log or _discard_message
+        replacements_made = 0
+        replacement_details = []
+        # Matching and run rewriting are timed separately, summed over all paragraphs
+        clock = time.perf_counter
+        match_time = 0.0
+        mutate_time = 0.0
+        
+        # Patterns are compiled once per run; fall back to the shared cache
+        if matcher is None:
+            matcher = compile_replacement_map(replacement_map, regex_mode)
+        
+        def on_error(old_text, e):
+            if isinstance(e, re.error):
+                log(f"⚠️ Invalid regex pattern '{old_text}': {e}")
+            else:
+                log(f"❌ Error processing pattern '{old_text}': {e}")
+        
+        # match(text) -> (modified text, edit rounds or None). Profiling goes through
+        # edit_rounds, which attributes every edit to its pattern; otherwise the
+        # faster sub screens each paragraph and only changed ones are worked out as edits
+        if profile is None:
+            def match(text):
+                modified_text = matcher.sub(text, on_error)
+                if not splice_runs or modified_text == text:
+                    return modified_text, None
+                return modified_text, matcher.edit_rounds(text)
+        else:
+            def match(text):
+                rounds = matcher.edit_rounds(text, on_error, profile)
+                for edits in rounds:
+                    text = apply_edits(text, edits)
+                return text, rounds if splice_runs else None
+        
+        try:
+            # One pass per story part over every w:p in it: body, table cells (each
+            # w:tc once, nested tables included), content controls and text boxes
+            for part_name, part, root in iter_story_parts(doc):
+                part_replacements = 0
+                for para_idx, p in enumerate(list(root.iter(_W_P))):
+                    para = Paragraph(p, part)
+                    started = clock()
+                    original_text = para.text
+                    modified_text, rounds = match(original_text)
+                    matched = clock()
+                    match_time += matched - started
+                    
+                    if modified_text != original_text:
+                        if rounds is None or not splice_paragraph_runs(p, rounds, modified_text):
+                            try:
+                                para.clear()
+                                para.add_run(modified_text)
+                            except Exception:
+                                para.text = modified_text
+                        mutate_time += clock() - matched
+                        
+                        part_replacements += 1
+                        replacement_details.append({
+                            'location': _story_location(p, part_name, para_idx),
+                            'original': original_text[:100] + '...' if len(original_text) > 100 else original_text,
+                            'modified': modified_text[:100] + '...' if len(modified_text) > 100 else modified_text
+                        })
+                
+                if part_replacements:
+                    store_story_part(part, root)
+                    replacements_made += part_replacements
+                    if parts is not None:
+                        parts[part_name] = parts.get(part_name, 0) + part_replacements
+        
+        except Exception as e:
+            log(f"❌ Critical error processing document {file_path}: {e}")
+            raise
+        finally:
+            if timer is not None:
+                timer.add('match', match_time)
+                timer.add('mutate', mutate_time)
+        
+        return replacements_made, replacement_details
+
+
+class OutputRegistry:
+    """Collision-free output paths for one run's modified copies, reserved in memory.
+
+    The folder (modified_<timestamp> under output_root) is created on first
+    use. Names handed out are remembered per directory, with a next-suffix
+    counter per base name, so the Nth 'Notice.docx' of a run is named
+    without probing the filesystem; a directory that already exists is
+    listed once so earlier files are not overwritten. With mirror_root,
+    each output keeps its folder relative to mirror_root (files outside it
+    go to the top level) instead of the flat layout.
+    """
+
+    def __init__(self, output_root: str, session_timestamp: Optional[str] = None,
+                 mirror_root: Optional[str] = None, log: Optional[Callable[[str], None]] = None):
+        self.output_root = output_root
+        self.session_timestamp = session_timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.mirror_root = os.path.abspath(mirror_root) if mirror_root else None
+        self.output_dir = None
+        self._log = log or _discard_message
+        self._taken: Dict[str, Set[str]] = {}
+        self._next_suffix: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _root(self) -> str:
+        if self.output_dir is None:
+            output_dir = os.path.join(self.output_root, f"modified_{self.session_timestamp}")
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+            except PermissionError:
+                user_docs = os.path.expanduser("~/Documents")
+                output_dir = os.path.join(user_docs, "DocReplace_Output", f"modified_{self.session_timestamp}")
+                os.makedirs(output_dir, exist_ok=True)
+                self._log(f"⚠️ Using fallback output location: {output_dir}")
+            self.output_dir = output_dir
+        return self.output_dir
+
+    def _directory_for(self, file_path: str) -> str:
+        output_dir = self._root()
+        if self.mirror_root is None:
+            return output_dir
+        try:
+            rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(file_path)), self.mirror_root)
+        except ValueError:  # another drive
+            return output_dir
+        if rel_dir == os.curdir or rel_dir == os.pardir or rel_dir.startswith(os.pardir + os.sep):
+            return output_dir
+        return os.path.join(output_dir, rel_dir)
+
+    def _taken_in(self, directory: str) -> Set[str]:
+        taken = self._taken.get(directory)
+        if taken is None:
+            os.makedirs(directory, exist_ok=True)
+            with os.scandir(directory) as it:
+                taken = {os.path.normcase(entry.name) for entry in it}
+            self._taken[directory] = taken
+        return taken
+
+    def directory(self, file_path: str) -> str:
+        """Folder a modified copy of file_path goes to, created if needed; no name is reserved"""
+        with self._lock:
+            directory = self._directory_for(file_path)
+            self._taken_in(directory)
+            return directory
+
+    def reserve(self, file_path: str) -> str:
+        """Output path for a modified copy of file_path; nothing is written"""
+        with self._lock:
+            directory = self._directory_for(file_path)
+            taken = self._taken_in(directory)
+            output_filename = os.path.basename(file_path)
+            base_name, ext = os.path.splitext(output_filename)
+            key = (directory, os.path.normcase(output_filename))
+            counter = self._next_suffix.get(key, 1)
+            while os.path.normcase(output_filename) in taken:
+                output_filename = f"{base_name}_{counter}{ext}"
+                counter += 1
+            if counter > 1:
+                self._next_suffix[key] = counter
+            taken.add(os.path.normcase(output_filename))
+            return os.path.join(directory, output_filename)
+
+def write_atomically(target_path: str, write: Callable[[str], Any], mode_source: Optional[str] = None) -> bool:
+    """Have write(temp_path) produce a file beside target_path, then rename it into place.
+
+    A crash mid-write leaves the target as it was, never half written. The
+    temp name starts with '~', which the default folder scan excludes.
+    write may return False to leave the target untouched. mode_source's
+    permission bits are copied onto the new file (for in-place saves).
+    """
+    fd, temp_path = tempfile.mkstemp(prefix='~docxreplace_', suffix='.docx',
+                                     dir=os.path.dirname(os.path.abspath(target_path)))
+    os.close(fd)
+    try:
+        if write(temp_path) is False:
+            return False
+        if mode_source is not None:
+            shutil.copymode(mode_source, temp_path)
+        os.replace(temp_path, target_path)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _process_file_streaming(file_path: str, matcher: Union[LiteralMatcher, RegexMatcher], mode: str,
+                            output_target: Union[str, Callable[[str], str], None],
+                            log: Callable[[str], None],
+                            timer: StageTimer,
+                            profile: Optional[PatternProfile] = None,
+                            parts: Optional[Dict[str, int]] = None,
+                            output_dir: Optional[Callable[[str], str]] = None) -> Tuple[int, Optional[str]]:
+    """Raw-XML counterpart of the load/replace/save step; returns (replacements, saved path)"""
+    started = time.perf_counter()
+    if mode == DRY_RUN_MODE:
+        replacements_made, _ = XmlStreamProcessor.process_package(file_path, None, matcher, log, profile, parts)
+        timer.since('stream', started)
+        return replacements_made, None
+    
+    # The package is streamed into a temp file beside its destination and only kept when something changed
+    if "Modified Copies" in mode:
+        if callable(output_target):
+            temp_dir = output_dir(file_path) if output_dir else None
+        else:
+            temp_dir = output_target
+    else:
+        temp_dir = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix='~docxreplace_', suffix='.docx', dir=temp_dir)
+    os.close(fd)
+    
+    try:
+        replacements_made, _ = XmlStreamProcessor.process_package(file_path, temp_path, matcher, log, profile, parts)
+        started = timer.since('stream', started)
+        if replacements_made == 0:
+            return 0, None
+        
+        if "Modified Copies" in mode:
+            if callable(output_target):
+                output_path = output_target(file_path)
+                started = timer.since('copy', started)
+                if output_dir:
+                    os.replace(temp_path, output_path)
+                else:
+                    write_atomically(output_path, lambda staged_path: shutil.move(temp_path, staged_path))
+            else:
+                output_path = temp_path
+        else:
+            shutil.copymode(file_path, temp_path)
+            os.replace(temp_path, file_path)
+            output_path = file_path
+        timer.since('save', started)
+        
+        temp_path = None
+        return replacements_made, output_path
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def process_file(file_path: str, matcher: Union[LiteralMatcher, RegexMatcher], mode: str,
+                 output_target: Union[str, Callable[[str], str], None] = None,
+                 log: Optional[Callable[[str], None]] = None,
+                 engine: str = DOCX_ENGINE,
+                 quick_filter: Optional['QuickRejectFilter'] = None,
+                 profile_patterns: bool = False,
+                 output_dir: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+    """Load, transform and save a single document.
+
+    This is the unit of work shared by serial and process-pool runs. For
+    Modified Copies, output_target is either a callable returning the final
+    output path or a staging directory the parent moves the result out of.
+    With a callable, output_dir (if given) returns the folder the output
+    will go to without reserving a name, so the XML engine can stream
+    beside it and rename its result into place.
+    Files the quick filter rules out are returned with rejected=True.
+    Seconds spent per stage are returned in timings (see TIMING_STAGES),
+    replacements per story part in parts, and with profile_patterns the
+    file's PatternProfile stats in pattern_stats.
+    """
+    log = log or _discard_message
+    timer = StageTimer()
+    profile = PatternProfile(len(matcher)) if profile_patterns else None
+    parts = {}
+    result = {'file_path': file_path, 'replacements': 0, 'saved_path': None, 'error': None,
+              'rejected': False, 'elapsed': 0.0, 'timings': timer.timings, 'parts': parts,
+              'pattern_stats': None}
+    started = stage_started = time.perf_counter()
+    
+    try:
+        if quick_filter is not None:
+            may_match = quick_filter.may_match(file_path)
+            stage_started = timer.since('scan', stage_started)
+            if not may_match:
+                result['rejected'] = True
+                return result
+        
+        if engine == XML_ENGINE:
+            result['replacements'], result['saved_path'] = _process_file_streaming(
+                file_path, matcher, mode, output_target, log, timer, profile, parts, output_dir)
+            return result
+        
+        doc = Document(file_path)
+        timer.since('load', stage_started)
+        
+        replacements_made, _ = DocumentProcessor.perform_replacement_in_doc(
+            doc, file_path, {}, matcher=matcher, log=log, timer=timer, profile=profile, parts=parts,
+            splice_runs=engine != DOCX_REWRITE_ENGINE)
+        result['replacements'] = replacements_made
+        
+        if replacements_made > 0 and mode != DRY_RUN_MODE:
+            stage_started = time.perf_counter()
+            if "Modified Copies" in mode:
+                if callable(output_target):
+                    output_path = output_target(file_path)
+                    stage_started = timer.since('copy', stage_started)
+                else:
+                    fd, output_path = tempfile.mkstemp(suffix='.docx', dir=output_target)
+                    os.close(fd)
+                if not write_atomically(output_path, lambda temp_path: save_changed_parts(
+                        doc, file_path, temp_path, parts)):
+                    write_atomically(output_path, lambda temp_path: shutil.copyfile(file_path, temp_path))
+            else:
+                # The source is read while the new package is written, so it is saved beside it and swapped in
+                output_path = file_path
+                write_atomically(file_path, lambda temp_path: save_changed_parts(doc, file_path, temp_path, parts),
+                                 mode_source=file_path)
+            
+            timer.since('save', stage_started)
+            result['saved_path'] = output_path
+    
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        # Clean up document from memory
+        if 'doc' in locals():
+            del doc
+        if profile is not None:
+            result['pattern_stats'] = profile.file_stats()
+        result['elapsed'] = time.perf_counter() - started
+    
+    return result
+
+def _apply_cached_result(file_path: str, entry: Dict[str, Any], mode: str,
+                         output_target: Optional[Callable[[str], str]]) -> Dict[str, Any]:
+    """Produce a file's output from a result-cache entry instead of processing it"""
+    result = {'file_path': file_path, 'replacements': entry['replacements'], 'saved_path': None,
+              'error': None, 'rejected': False, 'elapsed': 0.0, 'timings': {}, 'cached': True,
+              'messages': [f"♻️ Reusing cached result for {os.path.basename(file_path)}"]}
+    started = time.perf_counter()
+    
+    try:
+        if entry['replacements'] > 0 and mode != DRY_RUN_MODE:
+            def write(temp_path):
+                with open(temp_path, 'wb') as f:
+                    f.write(entry['output'])
+            
+            if "Modified Copies" in mode:
+                output_path = output_target(file_path)
+                write_atomically(output_path, write)
+            else:
+                output_path = file_path
+                write_atomically(file_path, write, mode_source=file_path)
+            result['saved_path'] = output_path
+    except Exception as e:
+        result['error'] = str(e)
+    
+    result['elapsed'] = time.perf_counter() - started
+    result['timings']['save'] = result['elapsed']
+    return result
+
+# Per-process matcher installed by the pool initializer
+_WORKER_MATCHER = None
+_WORKER_FILTER = None
+
+def _init_pool_worker(replacement_items: Tuple, regex_mode: bool, quick_reject: bool = False):
+    """Compile the replacement map (and quick-reject filter) once in each worker process"""
+    global _WORKER_MATCHER, _WORKER_FILTER
+    _WORKER_MATCHER = compile_replacement_map(dict(replacement_items), regex_mode)
+    _WORKER_FILTER = QuickRejectFilter(_WORKER_MATCHER) if quick_reject else None
+
+def _pool_process_file(task: Tuple[str, str, Optional[str], str, bool]) -> Dict[str, Any]:
+    """Process-pool entry point; returns console lines along with the result"""
+    file_path, mode, staging_dir, engine, profile_patterns = task
+    messages = []
+    result = process_file(file_path, _WORKER_MATCHER, mode, staging_dir, messages.append, engine,
+                          _WORKER_FILTER, profile_patterns)
+    result['messages'] = messages
+    return result
+
+class RegexBudgetExceeded(Exception):
+    """A document overran the regex time budget and no pattern could be blamed"""
+
+
+class RegexQuarantine:
+    """Patterns disabled for the rest of a run after overrunning the time budget.
+
+    Shared by every guarded worker of a run; version changes whenever the
+    set changes, so workers know to restart with the new matcher.
+    """
+
+    def __init__(self, patterns: List[str], budget: float):
+        self.patterns = patterns
+        self.budget = budget
+        self.disabled: Set[int] = set()
+        self.merge = True
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def blame(self, culprit: int, worker_version: int, file_path: str, log: Callable[[str], None]) -> bool:
+        """Quarantine the pattern a stopped worker was evaluating; False if nothing is left to blame"""
+        file_name = os.path.basename(file_path)
+        with self._lock:
+            if worker_version != self.version:
+                # Another worker already changed the matcher; retry with that one first
+                return True
+            if culprit >= 0:
+                self.disabled.add(culprit)
+                self.version += 1
+                log(f"⏱️ Pattern '{self.patterns[culprit]}' exceeded the {self.budget:g}s budget on {file_name}; "
+                    f"quarantined for the rest of the run")
+                return True
+            if culprit == _BEACON_GATE and self.merge:
+                # The merged gate cannot say which pattern hung; evaluate them one at a time instead
+                self.merge = False
+                self.version += 1
+                log(f"⏱️ Combined regex scan exceeded the {self.budget:g}s budget on {file_name}; "
+                    f"evaluating patterns one at a time")
+                return True
+            return False
+
+    def snapshot(self) -> Tuple[int, Tuple[int, ...], bool]:
+        with self._lock:
+            return self.version, tuple(sorted(self.disabled)), self.merge
+
+
+def _guarded_worker_main(conn, beacon, clock, replacement_items: Tuple, disabled: Tuple[int, ...], merge: bool,
+                         quick_reject: bool):
+    """Guarded worker process: install the matcher and the beacon, then run tasks until told to stop"""
+    global _PATTERN_BEACON, _BEACON_CLOCK, _WORKER_MATCHER, _WORKER_FILTER
+    _PATTERN_BEACON = beacon
+    _BEACON_CLOCK = clock
+    _WORKER_MATCHER = RegexMatcher(dict(replacement_items), disabled, merge)
+    _WORKER_FILTER = QuickRejectFilter(_WORKER_MATCHER) if quick_reject else None
+    conn.send('ready')
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        func, args = task
+        beacon.value = _BEACON_IDLE
+        conn.send(func(*args))
+
+
+def _guarded_transform_bytes(data: bytes, dry_run: bool, engine: str,
+                             profile_patterns: bool) -> Dict[str, Any]:
+    """Guarded-worker counterpart of _transform_document_bytes for archive members"""
+    messages = []
+    timer = StageTimer()
+    profile = PatternProfile(len(_WORKER_MATCHER)) if profile_patterns else None
+    parts = {}
+    result = {'replacements': 0, 'data': None, 'error': None, 'messages': messages,
+              'timings': timer.timings, 'parts': parts, 'pattern_stats': None}
+    try:
+        result['replacements'], result['data'] = _transform_document_bytes(
+            data, _WORKER_MATCHER, dry_run, messages.append, engine, timer, profile, parts)
+    except Exception as e:
+        result['error'] = str(e)
+    if profile is not None:
+        result['pattern_stats'] = profile.file_stats()
+    return result
+
+
+class GuardedRegexWorker:
+    """A worker process whose regex evaluation can be stopped when it overruns the budget.
+
+    Python cannot interrupt a running re call, so documents are processed
+    in a child process that publishes the pattern it is evaluating and when
+    that evaluation started. When one evaluation runs longer than the budget
+    the child is killed, that pattern is quarantined and the document is
+    retried without it. Time spent loading, saving or between patterns does
+    not count, so a large document alone never trips the budget.
+    """
+
+    STARTUP_TIMEOUT = 120.0
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, replacement_items: Tuple, quick_reject: bool, quarantine: RegexQuarantine):
+        self.replacement_items = replacement_items
+        self.quick_reject = quick_reject
+        self.quarantine = quarantine
+        self.version = None
+        self._process = None
+        self._conn = None
+        self._beacon = None
+        self._clock = None
+
+    def _start(self):
+        self.version, disabled, merge = self.quarantine.snapshot()
+        ctx = multiprocessing.get_context('spawn')
+        self._beacon = ctx.RawValue('i', _BEACON_IDLE)
+        self._clock = ctx.RawValue('d', 0.0)
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_guarded_worker_main,
+            args=(child_conn, self._beacon, self._clock, self.replacement_items, disabled, merge,
+                  self.quick_reject),
+            name="docxreplace-regex-guard", daemon=True)
+        self._process.start()
+        child_conn.close()
+        # Interpreter start-up and imports do not count against the budget
+        if not self._conn.poll(self.STARTUP_TIMEOUT) or self._conn.recv() != 'ready':
+            self.close()
+            raise RuntimeError("Regex worker process failed to start")
+
+    def call(self, file_path: str, log: Callable[[str], None], func: Callable, *args) -> Any:
+        """Run func(*args) in the worker, quarantining patterns that overrun the budget"""
+        while True:
+            if self._process is None or self.version != self.quarantine.version:
+                self.close()
+                self._start()
+            self._conn.send((func, args))
+            interval = min(self.POLL_INTERVAL, self.quarantine.budget / 4)
+            culprit = self._overrun(interval)
+            if culprit is None:
+                try:
+                    return self._conn.recv()
+                except EOFError:
+                    self.close()
+                    raise RuntimeError("Regex worker process exited unexpectedly")
+            
+            version = self.version
+            self.close(kill=True)
+            if not self.quarantine.blame(culprit, version, file_path, log):
+                raise RegexBudgetExceeded(
+                    f"Exceeded the {self.quarantine.budget:g}s time budget outside regex evaluation")
+
+    def _overrun(self, interval: float) -> Optional[int]:
+        """Wait for the worker's reply; the beacon value if one evaluation overruns the budget first"""
+        while not self._conn.poll(interval):
+            culprit = self._beacon.value
+            if culprit != _BEACON_IDLE and time.monotonic() - self._clock.value > self.quarantine.budget:
+                return culprit
+        return None
+
+    def close(self, kill: bool = False):
+        """Stop the worker process; kill=True for one stuck in a regex"""
+        if self._process is None:
+            return
+        if self._process.is_alive() and not kill:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._process.join(1.0)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = self._conn = None
+
+
+def _start_regex_guard(matcher: Union[LiteralMatcher, RegexMatcher], regex_mode: bool,
+                       regex_budget: Optional[float], log: Callable[[str], None]) -> Optional[RegexQuarantine]:
+    """Warn about risky patterns and set up the time budget for a regex run"""
+    if not regex_mode:
+        return None
+    for pattern in matcher.patterns:
+        for warning in regex_risk_warnings(pattern):
+            log(f"⚠️ Pattern '{pattern}' may backtrack catastrophically: {warning}")
+    if not regex_budget or not len(matcher):
+        return None
+    log(f"🛡️ Regex time budget: {regex_budget:g}s per pattern evaluation")
+    return RegexQuarantine(matcher.patterns, regex_budget)
+
+class DocumentPipeline:
+    """Prefetch and write-behind threads around an in-memory transform.
+
+    Reader threads load upcoming documents' bytes while the caller
+    transforms the current one (see _transform_document_bytes); outputs go
+    to a single writer thread, so reading, CPU work and writing overlap on
+    slow (network) storage without a process pool. Reads are admitted in
+    file order and only while the bytes held - read but not yet written or
+    dropped - stay under max_bytes (a larger file is admitted alone), so
+    memory stays bounded however far ahead the readers could get. The
+    writer runs writes in submission order.
+    """
+
+    def __init__(self, file_paths: List[str], readers: int = PIPELINE_READERS,
+                 max_bytes: int = PIPELINE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._condition = threading.Condition()
+        self._held = 0
+        self._next_ticket = 0
+        self._closed = False
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='docxreplace-read')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='docxreplace-write')
+        self._reads = [self._readers.submit(self._read, ticket, file_path)
+                       for ticket, file_path in enumerate(file_paths)]
+    
+    def _read(self, ticket: int, file_path: str) -> Tuple[bytes, int]:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        with self._condition:
+            # Admit in file order, so the caller never waits on a read stuck behind later files
+            self._condition.wait_for(lambda: self._closed or (
+                self._next_ticket == ticket and (self._held == 0 or self._held + size <= self.max_bytes)))
+            if self._closed:
+                raise CancelledError()
+            self._next_ticket += 1
+            self._held += size
+            self._condition.notify_all()
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read(), size
+        except BaseException:
+            self.release(size)
+            raise
+    
+    def read(self, index: int) -> Tuple[bytes, int]:
+        """Bytes of the index-th file and the size charged for them; blocks until prefetched"""
+        future = self._reads[index]
+        self._reads[index] = None
+        return future.result()
+    
+    def release(self, size: int):
+        """Return a document's bytes to the budget once it is written or dropped"""
+        with self._condition:
+            self._held -= size
+            self._condition.notify_all()
+    
+    def write(self, size: int, target_path: str, data: bytes, mode_source: Optional[str] = None):
+        """Queue an atomic write of data to target_path; returns a future of the seconds it took"""
+        def flush():
+            started = time.perf_counter()
+            try:
+                write_atomically(target_path, lambda temp_path: _write_bytes(temp_path, data), mode_source)
+            finally:
+                self.release(size)
+            return time.perf_counter() - started
+        return self._writer.submit(flush)
+    
+    def close(self):
+        """Stop prefetching and wait for queued writes"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._readers.shutdown(wait=True, cancel_futures=True)
+        self._writer.shutdown(wait=True)
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _transform_buffer(file_path: str, data: bytes, matcher: Union[LiteralMatcher, RegexMatcher], mode: str,
+                      log: Callable[[str], None], engine: str = DOCX_ENGINE,
+                      quick_filter: Optional['QuickRejectFilter'] = None,
+                      profile_patterns: bool = False,
+                      guard: Optional['GuardedRegexWorker'] = None) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """process_file for a document already in memory; returns (result, bytes to write or None)
+
+    Nothing is written: for a modified document the caller writes the
+    returned bytes to the output (or over the original in place). A
+    document whose changes leave its bytes unchanged returns its input.
+    With a guard, the transform runs in that guarded regex worker.
+    """
+    timer = StageTimer()
+    profile = PatternProfile(len(matcher)) if profile_patterns else None
+    parts = {}
+    result = {'file_path': file_path, 'replacements': 0, 'saved_path': None, 'error': None,
+              'rejected': False, 'elapsed': 0.0, 'timings': timer.timings, 'parts': parts,
+              'pattern_stats': None}
+    output = None
+    started = time.perf_counter()
+    
+    try:
+        if quick_filter is not None:
+            may_match = quick_filter.may_match(BytesIO(data))
+            timer.since('scan', started)
+            if not may_match:
+                result['rejected'] = True
+                return result, None
+        
+        if guard is not None:
+            outcome = guard.call(file_path, log, _guarded_transform_bytes,
+                                 data, mode == DRY_RUN_MODE, engine, profile is not None)
+            for message in outcome['messages']:
+                log(message)
+            timer.timings.update(outcome['timings'])
+            parts.update(outcome['parts'])
+            if profile is not None and outcome['pattern_stats']:
+                profile.merge_file(outcome['pattern_stats'])
+            if outcome['error'] is not None:
+                raise RuntimeError(outcome['error'])
+            replacements_made, output = outcome['replacements'], outcome['data']
+        else:
+            replacements_made, output = _transform_document_bytes(
+                data, matcher, mode == DRY_RUN_MODE, log, engine, timer, profile, parts)
+        result['replacements'] = replacements_made
+        if replacements_made > 0 and mode != DRY_RUN_MODE and output is None:
+            output = data
+    except Exception as e:
+        result['error'] = str(e)
+        output = None
+    finally:
+        if profile is not None:
+            result['pattern_stats'] = profile.file_stats()
+        result['elapsed'] = time.perf_counter() - started
+    
+    return result, output
+
+def run_documents(file_paths: Union[List[str], FileManifest], replacement_map: Dict[str, str], regex_mode: bool,
+                  mode: str, output_folder: str = None, workers: int = 1,
+                  log: Optional[Callable[[str], None]] = None,
+                  progress: Optional[Callable[[int, int, str], None]] = None,
+                  engine: str = DOCX_ENGINE, quick_reject: bool = False,
+                  result_cache: Optional[ResultCache] = None,
+                  checkpoint: Optional[Callable[[], bool]] = None,
+                  on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  profile_patterns: bool = False,
+                  regex_budget: Optional[float] = None,
+                  mirror_tree: bool = False,
+                  journal: Optional[RunJournal] = None,
+                  pipelined: bool = False) -> Dict[str, Any]:
+    """Run the replacement over a batch of files, serially or on a process pool.
+
+    Results are consumed in input order in both cases, so console output,
+    output file names and the returned summary do not depend on workers.
+    With quick_reject, files whose text cannot match are skipped before parsing.
+    With a result_cache, files already processed with the same map are not
+    processed again. checkpoint is called before each file and may block
+    (pause); returning True cancels the rest of the run. on_file receives
+    each per-file result as soon as it is recorded. profile_patterns adds a
+    per-pattern profile of matches and evaluation time (cache hits are not
+    evaluated, so they do not contribute). In regex mode, regex_budget caps
+    the seconds one pattern evaluation may take: documents then run in guarded
+    worker processes, and a pattern that overruns is quarantined for the
+    rest of the run (see GuardedRegexWorker); results computed after that
+    are not stored in the result cache. part_replacements totals the
+    replacements per story part over the processed (not cached) files.
+    Modified copies are written once, under names from an OutputRegistry;
+    with mirror_tree they keep their folders relative to the inputs'
+    common folder. With a journal, every finished file is recorded as it
+    completes; run again with the same journal, files it already holds are
+    reported as resumed instead of being processed again, and in-place
+    files whose content changed since the journal first hashed them are
+    skipped rather than replaced twice. pipelined runs single-worker
+    batches through a DocumentPipeline, overlapping reads and writes with
+    the replacement work (in a guarded worker under a regex_budget);
+    results are recorded in input order as their writes complete.
+    """
+    log = log or _discard_message
+    total_files = len(file_paths)
+    processed_files = 0
+    modified_files = 0
+    total_replacements = 0
+    rejected_files = 0
+    reject_time = 0.0
+    candidate_files = 0
+    candidate_time = 0.0
+    file_results = []
+    cancelled = False
+    outputs = None
+    resumed_files = 0
+    session_timestamp = None
+    map_hash = hash_replacement_map(replacement_map, regex_mode, engine)
+    start_time = time.time()
+    
+    if journal is not None:
+        # A resumed run keeps the first attempt's output folder
+        session_timestamp = journal.begin({
+            'mode': mode, 'engine': engine, 'regex_mode': regex_mode, 'map_hash': map_hash,
+            'replacement_map': list(replacement_map.items()), 'output_folder': output_folder,
+            'mirror_tree': mirror_tree, 'files': list(file_paths),
+            'session_timestamp': datetime.now().strftime("%Y%m%d_%H%M%S")})['session_timestamp']
+    
+    log(f"🚀 Starting {mode} on {total_files} files...")
+    if engine != DOCX_ENGINE:
+        log(f"⚙️ Replacement engine: {engine}")
+    
+    # Compile the replacement map once per run instead of per paragraph
+    matcher = compile_replacement_map(replacement_map, regex_mode)
+    for old_text, error in matcher.invalid:
+        log(f"⚠️ Invalid regex pattern '{old_text}': {error}")
+    
+    quick_filter = QuickRejectFilter(matcher) if quick_reject else None
+    if quick_filter is not None and quick_filter.always_match:
+        log("ℹ️ Quick-reject disabled: a pattern has no required literal text")
+        quick_filter = None
+    
+    run_profile = PatternProfile(len(matcher)) if profile_patterns else None
+    quarantine = _start_regex_guard(matcher, regex_mode, regex_budget, log)
+    
+    def add_file_result(entry):
+        file_results.append(entry)
+        if on_file:
+            on_file(entry)
+    
+    def registry():
+        nonlocal outputs
+        if outputs is None:
+            mirror_root = None
+            if mirror_tree and total_files:
+                try:
+                    mirror_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in file_paths])
+                except ValueError:
+                    log("⚠️ Inputs span several drives; writing copies without their folder structure")
+            outputs = OutputRegistry(output_folder, session_timestamp, mirror_root=mirror_root, log=log)
+        return outputs
+    
+    def reserve_path(file_path):
+        return registry().reserve(file_path)
+    
+    def output_directory(file_path):
+        return registry().directory(file_path)
+    
+    def record(index, result):
+        nonlocal processed_files, modified_files, total_replacements
+        nonlocal rejected_files, reject_time, candidate_files, candidate_time
+        file_path = result['file_path']
+        file_name = os.path.basename(file_path)
+        replacements_made = result['replacements']
+        
+        for message in result.get('messages', ()):
+            log(message)
+        
+        if run_profile is not None and result.get('pattern_stats'):
+            run_profile.merge_file(result['pattern_stats'])
+        
+        if result['error'] is not None:
+            log(f"❌ Error processing {file_name}: {result['error']}")
+            add_file_result({'file': file_path, 'status': 'error', 'replacements': 0,
+                             'output': None, 'error': result['error'],
+                             'elapsed': result['elapsed'], 'timings': result['timings']})
+            return
+        
+        if result.get('cached'):
+            pass
+        elif result.get('rejected'):
+            rejected_files += 1
+            reject_time += result['elapsed']
+        else:
+            candidate_files += 1
+            candidate_time += result['elapsed']
+        
+        if replacements_made > 0:
+            if mode == DRY_RUN_MODE:
+                log(f"🔍 Would modify {file_name}: {replacements_made} replacements")
+                modified_files += 1
+            else:
+                if "Modified Copies" in mode:
+                    if result.get('staged'):
+                        # Pool workers save to a staging file; name it like the serial path would
+                        moved = time.perf_counter()
+                        output_path = reserve_path(file_path)
+                        shutil.move(result['saved_path'], output_path)
+                        result['saved_path'] = output_path
+                        moved = time.perf_counter() - moved
+                        result['timings']['copy'] = result['timings'].get('copy', 0.0) + moved
+                        result['elapsed'] += moved
+                    log(f"✅ Created modified copy of {file_name}: {replacements_made} replacements")
+                else:
+                    log(f"✅ Modified {file_name}: {replacements_made} replacements")
+                modified_files += 1
+                total_replacements += replacements_made
+            status = 'would_modify' if mode == DRY_RUN_MODE else 'modified'
+        else:
+            log(f"➖ No changes needed: {file_name}")
+            status = 'unchanged'
+        
+        add_file_result({'file': file_path, 'status': status, 'replacements': replacements_made,
+                         'output': result['saved_path'], 'error': None,
+                         'elapsed': result['elapsed'], 'timings': result['timings'],
+                         'parts': result.get('parts') or {}})
+        processed_files += 1
+    
+    pending = []
+    for i, file_path in enumerate(file_paths):
+        if not os.path.exists(file_path):
+            log(f"⚠️ File not found: {file_path}")
+            add_file_result({'file': file_path, 'status': 'missing', 'replacements': 0,
+                             'output': None, 'error': None, 'elapsed': 0.0, 'timings': {}})
+            continue
+        done = journal.completed(file_path) if journal is not None else None
+        if done is not None:
+            # Finished by an earlier attempt of this run; count it without touching it again
+            resumed_files += 1
+            processed_files += 1
+            if done['replacements'] > 0:
+                modified_files += 1
+                if mode != DRY_RUN_MODE:
+                    total_replacements += done['replacements']
+            add_file_result({'file': file_path, 'status': done['status'], 'replacements': done['replacements'],
+                             'output': done['output'], 'error': None, 'elapsed': 0.0, 'timings': {},
+                             'parts': done['parts'], 'resumed': True})
+            continue
+        pending.append((i, file_path))
+    if resumed_files:
+        log(f"⏭️ Resuming: {resumed_files} files already done in an earlier attempt")
+    
+    # Hash inputs for the result cache and the journal
+    input_hashes = {}
+    if result_cache is not None or journal is not None:
+        for i, file_path in pending:
+            try:
+                # A manifest reuses hashes from earlier runs while the file is unchanged
+                if isinstance(file_paths, FileManifest):
+                    input_hashes[i] = file_paths.content_hash(i)
+                else:
+                    input_hashes[i] = hash_file(file_path)
+            except OSError:
+                continue
+    
+    if journal is not None:
+        if mode == IN_PLACE_MODE:
+            # Rewritten by an attempt that stopped before journaling it; replacing again could double-apply
+            changed = [(i, file_path) for i, file_path in pending
+                       if i in input_hashes and journal.changed_since_start(file_path, input_hashes[i])]
+            for i, file_path in changed:
+                log(f"⚠️ Skipped {os.path.basename(file_path)}: changed since this run started")
+                add_file_result({'file': file_path, 'status': 'skipped', 'replacements': 0,
+                                 'output': None, 'error': 'changed since the run started',
+                                 'elapsed': 0.0, 'timings': {}})
+            pending = [item for item in pending if item not in changed]
+        journal.record_inputs({file_path: input_hashes[i] for i, file_path in pending if i in input_hashes})
+    
+    # Look every file up in the result cache first; only misses are processed
+    cache_hits = {}
+    cache_lookups = 0
+    if result_cache is not None:
+        for i, file_path in pending:
+            if i not in input_hashes:
+                continue
+            cache_lookups += 1
+            entry = result_cache.lookup(input_hashes[i], map_hash, need_output=mode != DRY_RUN_MODE)
+            if entry is not None:
+                cache_hits[i] = entry
+    
+    def finish(index, result):
+        record(index, result)
+        if journal is not None and result['error'] is None:
+            try:
+                journal.record(file_results[-1])
+            except Exception as e:
+                log(f"⚠️ Could not journal {os.path.basename(result['file_path'])}: {str(e)}")
+        if result_cache is None or index not in input_hashes or result.get('cached') or result['error'] is not None:
+            return
+        if quarantine is not None and quarantine.disabled:
+            # Computed without the quarantined patterns, so not a result for map_hash
+            return
+        try:
+            output = None
+            if result['replacements'] > 0 and result['saved_path']:
+                with open(result['saved_path'], 'rb') as f:
+                    output = f.read()
+            result_cache.store(input_hashes[index], map_hash, result['replacements'], output)
+        except Exception as e:
+            log(f"⚠️ Could not cache result for {os.path.basename(result['file_path'])}: {str(e)}")
+    
+    misses = [(i, file_path) for i, file_path in pending if i not in cache_hits]
+    if pipelined and workers > 1 and len(misses) > 1:
+        log("ℹ️ Pipelined I/O is off with several workers; the worker processes already overlap reads and writes")
+        pipelined = False
+    
+    if misses and not pipelined and (quarantine is not None or (workers > 1 and len(misses) > 1)):
+        staging_dir = None
+        if "Modified Copies" in mode:
+            staging_dir = tempfile.mkdtemp(prefix='.docx_replace_staging_', dir=output_folder)
+        
+        guards = []
+        if quarantine is not None:
+            # One long-lived guarded process per thread; threads only wait on them
+            local = threading.local()
+            
+            def work(task):
+                worker = getattr(local, 'worker', None)
+                if worker is None:
+                    worker = local.worker = GuardedRegexWorker(
+                        tuple(replacement_map.items()), quick_filter is not None, quarantine)
+                    guards.append(worker)
+                messages = []
+                try:
+                    result = worker.call(task[0], messages.append, _pool_process_file, task)
+                except Exception as e:
+                    result = {'file_path': task[0], 'replacements': 0, 'saved_path': None, 'error': str(e),
+                              'rejected': False, 'elapsed': 0.0, 'timings': {}, 'pattern_stats': None,
+                              'messages': []}
+                result['messages'] = messages + result['messages']
+                return result
+            
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            log(f"⚙️ Using {workers} worker processes")
+            work = _pool_process_file
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_worker,
+                initargs=(tuple(replacement_map.items()), regex_mode, quick_filter is not None))
+        try:
+            with executor:
+                tasks = [(file_path, mode, staging_dir, engine, profile_patterns) for _, file_path in misses]
+                chunksize = max(1, min(16, len(tasks) // (workers * 4)))
+                results = executor.map(work, tasks, chunksize=chunksize)
+                for i, file_path in pending:
+                    if not cancelled and checkpoint and checkpoint():
+                        # Drop queued work; files already running in a worker are still recorded below
+                        cancelled = True
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    if cancelled and i in cache_hits:
+                        continue
+                    if progress and not cancelled:
+                        progress(i, total_files, file_path)
+                    if i in cache_hits:
+                        finish(i, _apply_cached_result(file_path, cache_hits[i], mode, reserve_path))
+                        continue
+                    try:
+                        result = next(results)
+                    except CancelledError:
+                        break
+                    result['staged'] = staging_dir is not None
+                    finish(i, result)
+        finally:
+            for worker in guards:
+                worker.close()
+            if staging_dir:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+    elif pipelined and misses:
+        log(f"⚙️ Pipelined I/O: {PIPELINE_READERS} prefetch threads, "
+            f"up to {PIPELINE_MAX_BYTES // (1024 * 1024)} MB in flight")
+        pipeline = DocumentPipeline([file_path for _, file_path in misses])
+        # Regex runs with a time budget transform in a guarded worker process
+        guard = GuardedRegexWorker(tuple(replacement_map.items()), False, quarantine) if quarantine else None
+        # Transformed files whose writes may still be queued, recorded in input order as they land
+        writing = deque()
+        
+        def record_written(block: bool):
+            while writing and (block or writing[0][2] is None or writing[0][2].done()):
+                index, result, write = writing.popleft()
+                if write is not None:
+                    try:
+                        result['timings']['write'] = write.result()
+                        result['elapsed'] += result['timings']['write']
+                    except Exception as e:
+                        result['error'] = str(e)
+                        result['saved_path'] = None
+                finish(index, result)
+        
+        try:
+            read_index = 0
+            for i, file_path in pending:
+                if checkpoint and checkpoint():
+                    cancelled = True
+                    break
+                if progress:
+                    progress(i, total_files, file_path)
+                if i in cache_hits:
+                    record_written(True)
+                    finish(i, _apply_cached_result(file_path, cache_hits[i], mode, reserve_path))
+                    continue
+                
+                started = time.perf_counter()
+                try:
+                    data, size = pipeline.read(read_index)
+                except Exception as e:
+                    read_index += 1
+                    writing.append((i, {'file_path': file_path, 'replacements': 0, 'saved_path': None,
+                                        'error': str(e), 'rejected': False, 'elapsed': 0.0, 'timings': {},
+                                        'pattern_stats': None}, None))
+                    record_written(False)
+                    continue
+                read_index += 1
+                waited = time.perf_counter() - started
+                
+                result, output = _transform_buffer(file_path, data, matcher, mode, log, engine, quick_filter,
+                                                   profile_patterns, guard)
+                result['timings']['read'] = waited
+                result['elapsed'] += waited
+                del data
+                write = None
+                if output is None:
+                    pipeline.release(size)
+                else:
+                    if "Modified Copies" in mode:
+                        result['saved_path'] = reserve_path(file_path)
+                        write = pipeline.write(size, result['saved_path'], output)
+                    else:
+                        result['saved_path'] = file_path
+                        write = pipeline.write(size, file_path, output, mode_source=file_path)
+                writing.append((i, result, write))
+                record_written(False)
+        finally:
+            pipeline.close()
+            record_written(True)
+            if guard is not None:
+                guard.close()
+    else:
+        for i, file_path in pending:
+            if checkpoint and checkpoint():
+                cancelled = True
+                break
+            if progress:
+                progress(i, total_files, file_path)
+            if i in cache_hits:
+                finish(i, _apply_cached_result(file_path, cache_hits[i], mode, reserve_path))
+            else:
+                finish(i, process_file(file_path, matcher, mode, reserve_path, log, engine, quick_filter,
+                                       profile_patterns, output_directory))
+    
+    if cancelled:
+        log(f"⏹️ Run cancelled after {processed_files} of {total_files} files")
+    
+    pattern_profile = None
+    if run_profile is not None:
+        pattern_profile = run_profile.report(matcher.patterns)
+        log(f"🧬 Pattern profile: {pattern_profile['unused']} of {len(matcher)} patterns never matched")
+    quarantined = [matcher.patterns[idx] for idx in sorted(quarantine.disabled)] if quarantine else []
+    part_counts = summarize_parts(file_results)
+    
+    # Final summary
+    elapsed_total = time.time() - start_time
+    time_saved = 0.0
+    if rejected_files and candidate_files:
+        # Estimate: what the skipped files would have cost at the average full-processing time
+        time_saved = max(0.0, rejected_files * candidate_time / candidate_files - reject_time)
+    
+    if mode == DRY_RUN_MODE:
+        log("\n📋 Dry Run Complete:")
+        log(f"   • Files processed: {processed_files}")
+        log(f"   • Files that would be modified: {modified_files}")
+        if part_counts:
+            log(f"   • Replacements by part: {_format_parts(part_counts)}")
+        if quick_filter is not None:
+            log(f"   • Quick-reject skipped: {rejected_files} files (~{time_saved:.1f}s saved)")
+        if result_cache is not None:
+            log(f"   • Result cache: {len(cache_hits)} hits, {cache_lookups - len(cache_hits)} misses")
+        if quarantined:
+            log(f"   • Quarantined patterns: {len(quarantined)}")
+        log(f"   • Time elapsed: {elapsed_total:.1f}s")
+    else:
+        log("\n🎉 Replacement Complete:")
+        log(f"   • Files processed: {processed_files}")
+        log(f"   • Files modified: {modified_files}")
+        log(f"   • Total replacements: {total_replacements}")
+        if part_counts:
+            log(f"   • Replacements by part: {_format_parts(part_counts)}")
+        if quick_filter is not None:
+            log(f"   • Quick-reject skipped: {rejected_files} files (~{time_saved:.1f}s saved)")
+        if result_cache is not None:
+            log(f"   • Result cache: {len(cache_hits)} hits, {cache_lookups - len(cache_hits)} misses")
+        if quarantined:
+            log(f"   • Quarantined patterns: {len(quarantined)}")
+        log(f"   • Time elapsed: {elapsed_total:.1f}s")
+        if outputs is not None and outputs.output_dir:
+            log(f"   • Output folder: {outputs.output_dir}")
+    
+    if journal is not None and not cancelled:
+        journal.finish({'processed_files': processed_files, 'modified_files': modified_files,
+                        'total_replacements': total_replacements})
+    
+    return {
+        'processed_files': processed_files,
+        'modified_files': modified_files,
+        'total_replacements': total_replacements,
+        'resumed_files': resumed_files,
+        'journal': journal.path if journal is not None else None,
+        'rejected_files': rejected_files,
+        'time_saved': time_saved,
+        'cache_hits': len(cache_hits),
+        'cache_misses': cache_lookups - len(cache_hits),
+        'output_dir': outputs.output_dir if outputs is not None else None,
+        'mode': mode,
+        'cancelled': cancelled,
+        'stage_timings': summarize_timings(file_results),
+        'part_replacements': part_counts,
+        'pattern_profile': pattern_profile,
+        'quarantined_patterns': quarantined,
+        'files': file_results
+    }
+
+
+class XmlStreamProcessor:
+    """Replacement engine that works directly on the package XML.
+
+    Story parts are streamed token by token and only w:t character data is
+    rewritten; everything outside a paragraph is passed through untouched and
+    each paragraph is buffered only until its closing tag, so memory stays
+    flat regardless of document size. Every other ZIP member's compressed
+    bytes are copied through as they are.
+    """
+
+    @staticmethod
+    def process_package(src_path: Union[str, IO[bytes]], dst_path: Union[str, IO[bytes], None],
+                        matcher: Union[LiteralMatcher, RegexMatcher],
+                        log: Optional[Callable[[str], None]] = None,
+                        profile: Optional[PatternProfile] = None,
+                        parts: Optional[Dict[str, int]] = None) -> Tuple[int, List[Dict]]:
+        """Rewrite src_path into dst_path; with no dst_path only count the changes.
+
+        Changed paragraphs are counted per story part into parts when given.
+        """
+        log = log or _discard_message
+        replacements_made = 0
+        replacement_details = []
+
+        def on_error(old_text, e):
+            if isinstance(e, re.error):
+                log(f"⚠️ Invalid regex pattern '{old_text}': {e}")
+            else:
+                log(f"❌ Error processing pattern '{old_text}': {e}")
+
+        with zipfile.ZipFile(src_path, 'r') as zin:
+            zout = zipfile.ZipFile(dst_path, 'w') if dst_path else None
+            try:
+                for info in zin.infolist():
+                    if not STORY_PART_RE.match(info.filename):
+                        if zout is not None:
+                            _copy_member_raw(zin, zout, info)
+                        continue
+
+                    with zin.open(info) as src:
+                        dst = zout.open(_clone_zip_info(info), 'w') if zout is not None else None
+                        try:
+                            part_name = info.filename[len('word/'):-len('.xml')]
+                            count, details = XmlStreamProcessor._rewrite_story_part(
+                                src, dst, part_name, matcher, on_error, profile)
+                            replacements_made += count
+                            replacement_details.extend(details)
+                            if count and parts is not None:
+                                parts[part_name] = parts.get(part_name, 0) + count
+                        finally:
+                            if dst is not None:
+                                dst.close()
+            finally:
+                if zout is not None:
+                    zout.close()
+
+        return replacements_made, replacement_details
+
+    @staticmethod
+    def _rewrite_story_part(src, dst, part_name: str,
+                            matcher: Union[LiteralMatcher, RegexMatcher],
+                            on_error: Callable[[str, Exception], None],
+                            profile: Optional[PatternProfile] = None) -> Tuple[int, List[Dict]]:
+        """Stream one story part, rewriting each top-level paragraph as it closes"""
+        replacements_made = 0
+        replacement_details = []
+        pending = []
+        pending_size = 0
+        prefix = None
+        paragraph = None
+        depth = 0
+        para_idx = 0
+
+        def write(text):
+            nonlocal pending_size
+            if dst is None:
+                return
+            pending.append(text)
+            pending_size += len(text)
+            if pending_size >= _XML_CHUNK_SIZE:
+                dst.write(''.join(pending).encode('utf-8'))
+                pending.clear()
+                pending_size = 0
+
+        for token in _iter_xml_tokens(src):
+            tag = _XML_TAG_RE.match(token) if token.startswith('<') and not token.startswith(('<?', '<!')) else None
+
+            if prefix is None and tag is not None and not tag.group(1):
+                ns = _WORD_NS_RE.search(token)
+                prefix = (ns.group(1) + ':' if ns.group(1) else '') if ns else 'w:'
+
+            is_paragraph = tag is not None and tag.group(2) == f'{prefix}p'
+            if paragraph is None:
+                if is_paragraph and not tag.group(1) and not token.endswith('/>'):
+                    paragraph = [token]
+                    depth = 1
+                else:
+                    write(token)
+                continue
+
+            paragraph.append(token)
+            if is_paragraph and not token.endswith('/>'):
+                depth += -1 if tag.group(1) else 1
+                if depth == 0:
+                    for original_text, modified_text in XmlStreamProcessor._rewrite_paragraph(
+                            paragraph, prefix, matcher, on_error, profile):
+                        replacements_made += 1
+                        replacement_details.append({
+                            'location': f'{part_name}_paragraph_{para_idx}',
+                            'original': original_text[:100] + '...' if len(original_text) > 100 else original_text,
+                            'modified': modified_text[:100] + '...' if len(modified_text) > 100 else modified_text
+                        })
+                    para_idx += 1
+                    write(''.join(paragraph))
+                    paragraph = None
+
+        if paragraph is not None:
+            write(''.join(paragraph))
+        if dst is not None and pending:
+            dst.write(''.join(pending).encode('utf-8'))
+
+        return replacements_made, replacement_details
+
+    @staticmethod
+    def _rewrite_paragraph(tokens: List[str], prefix: str,
+                           matcher: Union[LiteralMatcher, RegexMatcher],
+                           on_error: Callable[[str, Exception], None],
+                           profile: Optional[PatternProfile] = None) -> List[Tuple[str, str]]:
+        """Apply the matcher to a buffered paragraph (and any nested text-box paragraphs).
+
+        Tokens are edited in place; returns (original, modified) text per changed paragraph.
+        """
+        p_tag, t_tag, tabs_tag = f'{prefix}p', f'{prefix}t', f'{prefix}tabs'
+        atoms = {f'{prefix}tab': '\t', f'{prefix}ptab': '\t', f'{prefix}cr': '\n',
+                 f'{prefix}noBreakHyphen': '-'}
+        br_tag = f'{prefix}br'
+
+        # Each segment: [kind, token index, text, start tag index]; kind is 't'
+        # (w:t text), 'empty' (w:t without text, indexed by its start tag) or 'atom'
+        stack = []
+        finished = []
+        open_t = None
+        tabs_depth = 0
+
+        for idx, token in enumerate(tokens):
+            if not token.startswith('<'):
+                if open_t is not None and stack:
+                    stack[-1].append(['t', idx, html.unescape(token), open_t])
+                    open_t = None
+                continue
+            tag = _XML_TAG_RE.match(token)
+            if tag is None:
+                continue
+            closing, name = tag.group(1), tag.group(2)
+            empty = token.endswith('/>')
+
+            if name == p_tag and not empty:
+                if closing:
+                    if stack:
+                        finished.append(stack.pop())
+                else:
+                    stack.append([])
+            elif not stack:
+                continue
+            elif name == t_tag:
+                if closing:
+                    if open_t is not None:
+                        stack[-1].append(['empty', open_t, '', open_t])
+                    open_t = None
+                elif not empty:
+                    open_t = idx
+            elif name == tabs_tag and not empty:
+                tabs_depth += -1 if closing else 1
+            elif empty and not tabs_depth and name in atoms:
+                stack[-1].append(['atom', idx, atoms[name], idx])
+            elif empty and name == br_tag:
+                br_type = _BR_TYPE_RE.search(token)
+                if br_type is None or br_type.group(1) == 'textWrapping':
+                    stack[-1].append(['atom', idx, '\n', idx])
+
+        changed = []
+        for segments in finished:
+            original_text = ''.join(seg[2] for seg in segments)
+            rounds = matcher.edit_rounds(original_text, on_error, profile)
+            if not rounds:
+                continue
+            modified_text = original_text
+            for edits in rounds:
+                modified_text = apply_edits(modified_text, edits)
+            if modified_text == original_text:
+                continue
+
+            new_texts = splice_segments([(seg[2], seg[0] != 'atom') for seg in segments], rounds)
+            if new_texts is None:
+                # Collapse into the first text node, or turn the first element into one
+                first = next((i for i, seg in enumerate(segments) if seg[0] != 'atom'), 0)
+                new_texts = ['' for _ in segments]
+                new_texts[first] = modified_text
+                if segments[first][0] == 'atom':
+                    segments[first][0] = 'replace'
+
+            for (kind, idx, text, start_idx), new_text in zip(segments, new_texts):
+                if new_text == text and kind != 'replace':
+                    continue
+                escaped = _run_text_markup(new_text, prefix)
+                head = _RUN_CONTROL_RE.split(new_text, 1)[0]
+                preserve = head != head.strip()
+                if kind == 'atom':
+                    tokens[idx] = ''
+                elif kind == 'replace':
+                    tokens[idx] = f'<{t_tag} xml:space="preserve">{escaped}</{t_tag}>'
+                elif kind == 'empty':
+                    start_tag = tokens[idx]
+                    if preserve and 'xml:space' not in start_tag:
+                        start_tag = start_tag[:-1] + ' xml:space="preserve">'
+                    tokens[idx] = start_tag + escaped
+                else:
+                    tokens[idx] = escaped
+                    if preserve and 'xml:space' not in tokens[start_idx]:
+                        tokens[start_idx] = tokens[start_idx][:-1] + ' xml:space="preserve">'
+
+            changed.append((original_text, modified_text))
+
+        return changed
+
+
+def _literal_search_regex(literals: List[str]) -> Optional[re.Pattern]:
+    """Compile literals into a trie-shaped alternation that finds any of them in one C-level search"""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        chain = []
+        while '' not in node and len(node) == 1:
+            (ch, node), = node.items()
+            chain.append(re.escape(ch))
+        prefix = ''.join(chain)
+        if '' in node:
+            # A literal ends here; longer ones sharing this prefix add nothing to a search
+            return prefix
+        return prefix + '(?:' + '|'.join(re.escape(ch) + build(child) for ch, child in node.items()) + ')'
+
+    return re.compile(build(trie)) if trie else None
+
+
+def _required_literal(pattern: re.Pattern) -> Optional[str]:
+    """Longest literal every match of pattern must contain, or None if there is none"""
+    if pattern.flags & (re.IGNORECASE | re.VERBOSE):
+        return None
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+
+    runs = []
+
+    def walk(items):
+        current = []
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                current.append(chr(av))
+                continue
+            if op is sre_constants.SUBPATTERN and not av[1] and not av[2]:
+                # Plain (capturing) group: its content is part of the sequence
+                runs.append(''.join(current))
+                current = []
+                walk(av[3])
+                continue
+            runs.append(''.join(current))
+            current = []
+            if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+                walk(av[2])
+        runs.append(''.join(current))
+
+    walk(parsed)
+    best = max(runs, key=len, default='')
+    return best or None
+
+
+# Possessive quantifiers (Python 3.11+) never backtrack, so they are not listed
+_BACKTRACKING_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+
+def _is_unbounded_repeat(op, av) -> bool:
+    return op in _BACKTRACKING_REPEATS and av[1] == sre_constants.MAXREPEAT
+
+def _contains_unbounded(items) -> bool:
+    for op, av in items:
+        if _is_unbounded_repeat(op, av):
+            return True
+        if op in _BACKTRACKING_REPEATS and _contains_unbounded(av[2]):
+            return True
+        if op is sre_constants.SUBPATTERN and _contains_unbounded(av[3]):
+            return True
+        if op is sre_constants.BRANCH and any(_contains_unbounded(branch) for branch in av[1]):
+            return True
+    return False
+
+# Character classes approximated over Latin-1, which is enough to tell whether two pieces can overlap
+_LATIN1 = range(256)
+_CATEGORY_CHARS = {
+    sre_constants.CATEGORY_DIGIT: {c for c in _LATIN1 if chr(c).isdigit()},
+    sre_constants.CATEGORY_SPACE: {c for c in _LATIN1 if chr(c).isspace()},
+    sre_constants.CATEGORY_WORD: {c for c in _LATIN1 if chr(c).isalnum() or c == ord('_')},
+}
+_CATEGORY_CHARS.update({
+    sre_constants.CATEGORY_NOT_DIGIT: set(_LATIN1) - _CATEGORY_CHARS[sre_constants.CATEGORY_DIGIT],
+    sre_constants.CATEGORY_NOT_SPACE: set(_LATIN1) - _CATEGORY_CHARS[sre_constants.CATEGORY_SPACE],
+    sre_constants.CATEGORY_NOT_WORD: set(_LATIN1) - _CATEGORY_CHARS[sre_constants.CATEGORY_WORD],
+})
+
+def _first_chars(items) -> Optional[Set[int]]:
+    """Characters a match of items can start with, or None when it can start with anything"""
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            return {av}
+        if op is sre_constants.NOT_LITERAL or op is sre_constants.ANY:
+            return None
+        if op is sre_constants.IN:
+            chars = set()
+            negate = False
+            for set_op, set_av in av:
+                if set_op is sre_constants.NEGATE:
+                    negate = True
+                elif set_op is sre_constants.LITERAL:
+                    chars.add(set_av)
+                elif set_op is sre_constants.RANGE:
+                    chars.update(range(set_av[0], min(set_av[1], 255) + 1))
+                elif set_op is sre_constants.CATEGORY and set_av in _CATEGORY_CHARS:
+                    chars |= _CATEGORY_CHARS[set_av]
+                else:
+                    return None
+            return set(_LATIN1) - chars if negate else chars
+        if op is sre_constants.SUBPATTERN:
+            return _first_chars(av[3])
+        if op in _BACKTRACKING_REPEATS and av[0] >= 1:
+            return _first_chars(av[2])
+        if op is sre_constants.BRANCH:
+            chars = set()
+            for branch in av[1]:
+                branch_chars = _first_chars(branch)
+                if branch_chars is None:
+                    return None
+                chars |= branch_chars
+            return chars
+        return None
+    return set()
+
+def _overlaps(first: Optional[Set[int]], second: Optional[Set[int]]) -> bool:
+    if first is None or second is None:
+        return first != set() and second != set()
+    return bool(first & second)
+
+def regex_risk_warnings(pattern: str) -> List[str]:
+    """Static check for constructs that commonly backtrack exponentially.
+
+    Flags an unbounded quantifier over a group that is itself repeated, when
+    the rest of each iteration can match the same characters ((a+)+,
+    (\\w+\\s?)*, ([a-z]+.)+), and an unbounded quantifier over alternatives
+    that can start with the same character ((ab|a.)*). A heuristic: it can
+    miss problems and flag harmless patterns.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    warnings = []
+
+    def walk(items):
+        for op, av in items:
+            if _is_unbounded_repeat(op, av):
+                body = av[2]
+                while len(body) == 1 and body[0][0] is sre_constants.SUBPATTERN:
+                    body = body[0][1][3]
+                required = [item for item in body if sre_parse.SubPattern(body.state, [item]).getwidth()[0] > 0]
+                repeated = [item for item in (required or body) if _contains_unbounded([item])]
+                # An inner repeat that can also consume what the rest of the iteration needs
+                # leaves the engine exponentially many ways to split the input
+                if repeated and all(item in repeated or _overlaps(_first_chars([item]), _first_chars(repeated[:1]))
+                                    for item in (required or body)):
+                    warnings.append("nested quantifiers: a repeated group whose parts can match the same text")
+                for item_op, item_av in body:
+                    if item_op is not sre_constants.BRANCH:
+                        continue
+                    starts = [_first_chars(branch) for branch in item_av[1]]
+                    if any(_overlaps(first, other) for i, first in enumerate(starts) for other in starts[i + 1:]):
+                        warnings.append("repeated alternation whose branches can match the same text")
+            if op in _BACKTRACKING_REPEATS:
+                walk(av[2])
+            elif op is sre_constants.SUBPATTERN:
+                walk(av[3])
+            elif op is sre_constants.BRANCH:
+                for branch in av[1]:
+                    walk(branch)
+            elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+                walk(av[1])
+
+    walk(parsed)
+    return list(dict.fromkeys(warnings))
+
+
+class QuickRejectFilter:
+    """Cheap pre-parse scan that rules out documents with no possible match.
+
+    Only the story parts are inflated; their markup is stripped with a few
+    regexes and the text is searched for the map's literals (or, in regex
+    mode, a literal every match of each pattern must contain). The text is
+    built the way both engines see it, so a rejected file never holds a
+    match the full engine would have found.
+    """
+
+    __slots__ = ('always_match', '_search')
+
+    def __init__(self, matcher: Union[LiteralMatcher, RegexMatcher]):
+        if isinstance(matcher, RegexMatcher):
+            literals = [_required_literal(compiled) for compiled in matcher.compiled]
+            self.always_match = any(literal is None for literal in literals)
+        else:
+            literals = list(matcher.patterns)
+            self.always_match = False
+        self._search = None if self.always_match else _literal_search_regex(literals)
+
+    @staticmethod
+    def _extract_text(xml: str) -> str:
+        """Concatenate w:t text and text-like run elements in document order"""
+        pieces = []
+        for match in _QUICK_TEXT_RE.finditer(xml):
+            if match.group(2):
+                pieces.append(_QUICK_ATOMS[match.group(2)])
+            elif match.group(3) is not None:
+                br_type = _BR_TYPE_RE.search(match.group(3))
+                if br_type is None or br_type.group(1) == 'textWrapping':
+                    pieces.append('\n')
+            else:
+                pieces.append(match.group(1))
+        text = ''.join(pieces)
+        return html.unescape(text) if '&' in text else text
+
+    def may_match(self, file_path: Union[str, IO[bytes]]) -> bool:
+        """Return False only when no story part can contain a match"""
+        if self.always_match:
+            return True
+        if self._search is None:
+            return False
+
+        with zipfile.ZipFile(file_path, 'r') as zin:
+            for name in zin.namelist():
+                if not STORY_PART_RE.match(name):
+                    continue
+                xml = zin.read(name).decode('utf-8', 'replace')
+                if _QUICK_WORD_NS not in xml:
+                    return True
+
+                # python-docx reads runs outside tracked changes, content controls and
+                # text boxes; the XML engine reads everything but keeps text boxes apart
+                texts = [self._extract_text(_QUICK_SKIPPED_RE.sub('', xml)),
+                         self._extract_text(_QUICK_TEXTBOX_RE.sub('', xml))]
+                texts.extend(self._extract_text(match.group(2)) for match in _QUICK_TEXTBOX_RE.finditer(xml))
+                if any(self._search.search(text) for text in texts):
+                    return True
+
+        return False
+
+
+def _is_archive_document(name: str) -> bool:
+    """Same member filter the ZIP loader applies: .docx files that are not Office lock files"""
+    return name.endswith('.docx') and not os.path.basename(name).startswith('~')
+
+def count_archive_documents(source: Union[str, IO[bytes]]) -> int:
+    """Number of documents in a ZIP, read from the central directory only"""
+    with zipfile.ZipFile(source, 'r') as zin:
+        return sum(1 for name in zin.namelist() if _is_archive_document(name))
+
+def _transform_document_bytes(data: bytes, matcher: Union[LiteralMatcher, RegexMatcher],
+                              dry_run: bool, log: Callable[[str], None],
+                              engine: str = DOCX_ENGINE,
+                              timer: Optional[StageTimer] = None,
+                              profile: Optional[PatternProfile] = None,
+                              parts: Optional[Dict[str, int]] = None) -> Tuple[int, Optional[bytes]]:
+    """Replace in one in-memory document; returns (replacements, new bytes or None)"""
+    timer = timer or StageTimer()
+    started = time.perf_counter()
+    if engine == XML_ENGINE:
+        if dry_run:
+            replacements_made, _ = XmlStreamProcessor.process_package(BytesIO(data), None, matcher, log, profile, parts)
+            timer.since('stream', started)
+            return replacements_made, None
+        output = BytesIO()
+        replacements_made, _ = XmlStreamProcessor.process_package(BytesIO(data), output, matcher, log, profile, parts)
+        timer.since('stream', started)
+    else:
+        doc = Document(BytesIO(data))
+        timer.since('load', started)
+        parts = {} if parts is None else parts
+        replacements_made, _ = DocumentProcessor.perform_replacement_in_doc(
+            doc, '', {}, matcher=matcher, log=log, timer=timer, profile=profile, parts=parts,
+            splice_runs=engine != DOCX_REWRITE_ENGINE)
+        if replacements_made == 0 or dry_run:
+            return replacements_made, None
+        started = time.perf_counter()
+        output = BytesIO()
+        saved = save_changed_parts(doc, BytesIO(data), output, parts)
+        timer.since('save', started)
+        if not saved:
+            return replacements_made, None
+    
+    return replacements_made, (output.getvalue() if replacements_made > 0 else None)
+
+def run_archive(source: Union[str, IO[bytes]], replacement_map: Dict[str, str], regex_mode: bool,
+                mode: str, output_path: Optional[str] = None,
+                log: Optional[Callable[[str], None]] = None,
+                progress: Optional[Callable[[int, int, str], None]] = None,
+                engine: str = DOCX_ENGINE, quick_reject: bool = False,
+                checkpoint: Optional[Callable[[], bool]] = None,
+                on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+                profile_patterns: bool = False,
+                regex_budget: Optional[float] = None) -> Dict[str, Any]:
+    """Stream a ZIP of documents member by member into an output ZIP.
+
+    Nothing is extracted to disk: each document is read, transformed and
+    written into output_path before the next one is touched, so memory is
+    bounded by the largest single document. Members that are not documents,
+    and documents without matches, are copied into the output unchanged.
+    In a dry run no output archive is written. checkpoint, on_file,
+    profile_patterns and regex_budget work as in run_documents; a cancelled
+    run still writes a complete archive, with the remaining documents
+    copied through untouched.
+    """
+    log = log or _discard_message
+    dry_run = mode == DRY_RUN_MODE
+    processed_files = 0
+    modified_files = 0
+    total_replacements = 0
+    rejected_files = 0
+    reject_time = 0.0
+    candidate_files = 0
+    candidate_time = 0.0
+    file_results = []
+    cancelled = False
+    start_time = time.time()
+    
+    def add_file_result(entry):
+        file_results.append(entry)
+        if on_file:
+            on_file(entry)
+    
+    matcher = compile_replacement_map(replacement_map, regex_mode)
+    for old_text, error in matcher.invalid:
+        log(f"⚠️ Invalid regex pattern '{old_text}': {error}")
+    
+    quick_filter = QuickRejectFilter(matcher) if quick_reject else None
+    if quick_filter is not None and quick_filter.always_match:
+        log("ℹ️ Quick-reject disabled: a pattern has no required literal text")
+        quick_filter = None
+    
+    run_profile = PatternProfile(len(matcher)) if profile_patterns else None
+    quarantine = _start_regex_guard(matcher, regex_mode, regex_budget, log)
+    guard = None
+    if quarantine is not None:
+        guard = GuardedRegexWorker(tuple(replacement_map.items()), False, quarantine)
+    
+    with zipfile.ZipFile(source, 'r') as zin:
+        members = zin.infolist()
+        documents = [info for info in members if _is_archive_document(info.filename)]
+        total_files = len(documents)
+        log(f"🚀 Starting {mode} on {total_files} files (streaming from archive)...")
+        if engine != DOCX_ENGINE:
+            log(f"⚙️ Replacement engine: {engine}")
+        
+        zout = None if dry_run else zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+        try:
+            index = 0
+            for info in members:
+                if not _is_archive_document(info.filename):
+                    if zout is not None:
+                        _copy_member_raw(zin, zout, info)
+                    continue
+                
+                file_name = info.filename
+                if not cancelled and checkpoint and checkpoint():
+                    cancelled = True
+                    log(f"⏹️ Run cancelled after {processed_files} of {total_files} files")
+                if cancelled:
+                    if zout is not None:
+                        _copy_member_raw(zin, zout, info)
+                    continue
+                if progress:
+                    progress(index, total_files, file_name)
+                index += 1
+                
+                timer = StageTimer()
+                profile = PatternProfile(len(matcher)) if run_profile is not None else None
+                started = time.perf_counter()
+                data = zin.read(info)
+                stage_started = timer.since('load', started)
+                new_data = None
+                parts = {}
+                may_match = True
+                try:
+                    may_match = quick_filter is None or quick_filter.may_match(BytesIO(data))
+                    if quick_filter is not None:
+                        timer.since('scan', stage_started)
+                    if not may_match:
+                        rejected_files += 1
+                        replacements_made = 0
+                    elif guard is not None:
+                        outcome = guard.call(file_name, log, _guarded_transform_bytes,
+                                             data, dry_run, engine, profile is not None)
+                        for message in outcome['messages']:
+                            log(message)
+                        timer.timings.update(outcome['timings'])
+                        parts.update(outcome['parts'])
+                        if profile is not None and outcome['pattern_stats']:
+                            profile.merge_file(outcome['pattern_stats'])
+                        if outcome['error'] is not None:
+                            raise RuntimeError(outcome['error'])
+                        replacements_made, new_data = outcome['replacements'], outcome['data']
+                    else:
+                        replacements_made, new_data = _transform_document_bytes(
+                            data, matcher, dry_run, log, engine, timer, profile, parts)
+                except Exception as e:
+                    log(f"❌ Error processing {file_name}: {str(e)}")
+                    add_file_result({'file': file_name, 'status': 'error', 'replacements': 0,
+                                     'output': None, 'error': str(e),
+                                     'elapsed': time.perf_counter() - started, 'timings': timer.timings})
+                    replacements_made = None
+                if profile is not None:
+                    run_profile.merge_file(profile.file_stats())
+                
+                if zout is not None:
+                    # Unchanged and failed documents go into the output exactly as they came in
+                    stage_started = time.perf_counter()
+                    if new_data is None:
+                        _copy_member_raw(zin, zout, info)
+                    else:
+                        zout.writestr(_clone_zip_info(info), new_data)
+                    timer.since('copy' if new_data is None else 'save', stage_started)
+                
+                if replacements_made is not None:
+                    if may_match:
+                        candidate_files += 1
+                        candidate_time += time.perf_counter() - started
+                    else:
+                        reject_time += time.perf_counter() - started
+                    processed_files += 1
+                    if replacements_made > 0:
+                        modified_files += 1
+                        if dry_run:
+                            log(f"🔍 Would modify {file_name}: {replacements_made} replacements")
+                        else:
+                            total_replacements += replacements_made
+                            log(f"✅ Modified {file_name}: {replacements_made} replacements")
+                        status = 'would_modify' if dry_run else 'modified'
+                    else:
+                        log(f"➖ No changes needed: {file_name}")
+                        status = 'unchanged'
+                    add_file_result({'file': file_name, 'status': status, 'replacements': replacements_made,
+                                     'output': file_name if status == 'modified' else None, 'error': None,
+                                     'elapsed': time.perf_counter() - started, 'timings': timer.timings,
+                                     'parts': parts})
+                data = new_data = None
+        finally:
+            if guard is not None:
+                guard.close()
+            if zout is not None:
+                zout.close()
+    
+    pattern_profile = None
+    if run_profile is not None:
+        pattern_profile = run_profile.report(matcher.patterns)
+        log(f"🧬 Pattern profile: {pattern_profile['unused']} of {len(matcher)} patterns never matched")
+    
+    elapsed_total = time.time() - start_time
+    part_counts = summarize_parts(file_results)
+    time_saved = 0.0
+    if rejected_files and candidate_files:
+        # Estimate: what the skipped documents would have cost at the average full-processing time
+        time_saved = max(0.0, rejected_files * candidate_time / candidate_files - reject_time)
+    
+    if dry_run:
+        log("\n📋 Dry Run Complete:")
+        log(f"   • Files processed: {processed_files}")
+        log(f"   • Files that would be modified: {modified_files}")
+    else:
+        log("\n🎉 Replacement Complete:")
+        log(f"   • Files processed: {processed_files}")
+        log(f"   • Files modified: {modified_files}")
+        log(f"   • Total replacements: {total_replacements}")
+    if part_counts:
+        log(f"   • Replacements by part: {_format_parts(part_counts)}")
+    if quick_filter is not None:
+        log(f"   • Quick-reject skipped: {rejected_files} files (~{time_saved:.1f}s saved)")
+    quarantined = [matcher.patterns[idx] for idx in sorted(quarantine.disabled)] if quarantine else []
+    if quarantined:
+        log(f"   • Quarantined patterns: {len(quarantined)}")
+    log(f"   • Time elapsed: {elapsed_total:.1f}s")
+    if not dry_run:
+        log(f"   • Output archive: {output_path}")
+    
+    return {
+        'processed_files': processed_files,
+        'modified_files': modified_files,
+        'total_replacements': total_replacements,
+        'rejected_files': rejected_files,
+        'time_saved': time_saved,
+        'output_dir': None,
+        'output_archive': None if dry_run else output_path,
+        'mode': mode,
+        'cancelled': cancelled,
+        'stage_timings': summarize_timings(file_results),
+        'part_replacements': part_counts,
+        'pattern_profile': pattern_profile,
+        'quarantined_patterns': quarantined,
+        'files': file_results
+    }
+
+
+def directory_fingerprint(directory: str) -> str:
+    """Hash of every file's relative path, size and mtime under directory"""
+    digest = hashlib.sha1()
+    pending = [directory]
+    entries = []
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    entries.append((os.path.relpath(entry.path, directory), stat.st_size, stat.st_mtime_ns))
+    
+    for rel_path, size, mtime_ns in sorted(entries):
+        digest.update(f"{rel_path}\0{size}\0{mtime_ns}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+def build_result_archive(output_dir: str, archive_path: str,
+                         compression: str = "Stored (fastest)") -> str:
+    """Write every file under output_dir into a ZIP at archive_path, streaming each from disk"""
+    compress_type, compress_level = ARCHIVE_COMPRESSION[compression]
+    with zipfile.ZipFile(archive_path, 'w', compress_type, compresslevel=compress_level) as zipf:
+        for root, dirs, files in os.walk(output_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                zipf.write(file_path, os.path.relpath(file_path, output_dir))
+    return archive_path
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Background Jobs
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Runs processing off the Streamlit script thread. Jobs live in a process-wide
+registry, so a page that reloads can re-attach to a run by its job ID.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Console lines kept in memory per job for pages that attach late or re-attach;
+# the complete log goes to the job's run log file
+JOB_LOG_LIMIT = 1000
+# Finished jobs are forgotten after this long
+JOB_RETENTION_SECONDS = 6 * 60 * 60
+
+QUEUED = 'queued'
+RUNNING = 'running'
+PAUSED = 'paused'
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+FINISHED_STATES = (COMPLETED, CANCELLED, FAILED)
+
+_jobs: Dict[str, 'Job'] = {}
+_jobs_lock = threading.Lock()
+
+
+class RunLogWriter:
+    """Append-only log file written by its own thread.
+
+    write() only enqueues, so a slow disk or network share never stalls
+    processing. The writer drains everything queued before each flush.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, 'w', encoding='utf-8')
+        self._thread = threading.Thread(target=self._drain, name="docxreplace-run-log", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        self._queue.put(line)
+
+    def _drain(self):
+        while True:
+            line = self._queue.get()
+            while line is not None:
+                self._file.write(line + '\n')
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._file.flush()
+            if line is None:
+                break
+        self._file.close()
+
+    def close(self):
+        """Flush everything written so far and close the file"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class Job:
+    """One background run and everything the page polls for.
+
+    The worker thread writes through log/update_progress/add_file and calls
+    checkpoint between files; the page reads snapshot() and lines_since()
+    and drives pause/resume/cancel. All shared state is guarded by one lock.
+    """
+
+    def __init__(self, job_id: str, description: str, log_path: Optional[str] = None):
+        self.id = job_id
+        self.description = description
+        self.log_path = log_path
+        self.status = QUEUED
+        self.created = time.time()
+        self.finished = None
+        self.results = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._lines = deque(maxlen=JOB_LOG_LIMIT)
+        self._line_count = 0
+        self._files = []
+        self._progress = (0, 0, '')
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._run_log = RunLogWriter(log_path) if log_path else None
+
+    # Worker side
+
+    def log(self, message: str):
+        """Append a timestamped console line"""
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        with self._lock:
+            self._lines.append(line)
+            self._line_count += 1
+        if self._run_log:
+            self._run_log.write(line)
+
+    def update_progress(self, index: int, total: int, file_path: str):
+        with self._lock:
+            self._progress = (index, total, file_path)
+
+    def add_file(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._files.append(entry)
+
+    def checkpoint(self) -> bool:
+        """Block while paused; True once the job has been cancelled"""
+        if not self._resume.is_set():
+            with self._lock:
+                self.status = PAUSED
+            self._resume.wait()
+            with self._lock:
+                if self.status == PAUSED:
+                    self.status = RUNNING
+        return self._cancel.is_set()
+
+    # Page side
+
+    def pause(self):
+        if self.status in (QUEUED, RUNNING):
+            self._resume.clear()
+            self.log("⏸️ Pause requested; the current file will finish first")
+
+    def resume(self):
+        if not self._resume.is_set():
+            self._resume.set()
+            self.log("▶️ Resumed")
+
+    def cancel(self):
+        if self.status not in FINISHED_STATES and not self._cancel.is_set():
+            self._cancel.set()
+            self._resume.set()
+            self.log("⏹️ Cancel requested; stopping after the current file")
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def pause_requested(self) -> bool:
+        return not self._resume.is_set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent view of progress and per-file status counts"""
+        with self._lock:
+            index, total, file_path = self._progress
+            statuses = {}
+            for entry in self._files:
+                statuses[entry['status']] = statuses.get(entry['status'], 0) + 1
+            return {
+                'id': self.id,
+                'status': self.status,
+                'index': index,
+                'total': total,
+                'current_file': file_path,
+                'files_done': len(self._files),
+                'statuses': statuses,
+            }
+
+    def lines_since(self, cursor: int) -> Tuple[List[str], int]:
+        """Console lines appended after cursor, and the new cursor"""
+        with self._lock:
+            oldest = self._line_count - len(self._lines)
+            start = max(cursor, oldest)
+            return list(self._lines)[start - oldest:], self._line_count
+
+
+def _run_job(job: Job, target: Callable[[Job], Dict[str, Any]]):
+    job.status = RUNNING
+    job.log(f"▶️ Job {job.id} started: {job.description}")
+    status = FAILED
+    try:
+        job.results = target(job)
+        status = CANCELLED if job.results.get('cancelled') else COMPLETED
+    except Exception as e:
+        job.error = str(e)
+        job.log(f"❌ Processing error: {str(e)}")
+    finally:
+        # The run log must be complete before the page can see the job as done and offer it
+        if job._run_log:
+            job._run_log.close()
+        job.finished = time.time()
+        job.status = status
+
+
+def start_job(target: Callable[[Job], Dict[str, Any]], description: str = "",
+              log_path: Optional[str] = None) -> Job:
+    """Run target(job) on a daemon thread and register the job.
+
+    With log_path, every console line is also written to that file; it is
+    complete once the job is done.
+    """
+    _prune_jobs()
+    job = Job(uuid.uuid4().hex[:12], description, log_path)
+    with _jobs_lock:
+        _jobs[job.id] = job
+
+    thread = threading.Thread(target=_run_job, args=(job, target), name=f"docxreplace-job-{job.id}", daemon=True)
+    thread.start()
+    return job
+
+
+def get_job(job_id: Optional[str]) -> Optional[Job]:
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job.finished and job.finished < cutoff]:
+            del _jobs[job_id]
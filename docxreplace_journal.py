@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - Run Journal
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Append-only record of a folder/Excel run, so a run interrupted by a crash,
+a lost browser session or a cancel can be resumed without redoing finished files.
+"""
+
+import glob
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from docxreplace_cache import hash_file
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".docxreplace", "journals")
+
+# Settings that must match for a journal to be resumed by a run
+RESUME_KEYS = ('mode', 'engine', 'regex_mode', 'map_hash', 'output_folder', 'mirror_tree')
+DONE_STATUSES = ('modified', 'would_modify', 'unchanged')
+
+# Journals open for writing in this process, i.e. of runs still in progress
+_open_journals = set()
+
+
+class JournalMismatch(Exception):
+    """A journal was resumed by a run with different settings"""
+
+
+def _stat_pair(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class RunJournal:
+    """JSON-lines journal of one run.
+
+    The first line is a short header (mode, engine, file count, start time)
+    for listing journals cheaply; the second holds the run's settings,
+    including the replacement map and file list, so a run can be started
+    again from the journal alone. 'inputs' lines record each file's content hash before it is processed,
+    'file' lines each finished file's outcome, output path and the
+    size/mtime its input and output had afterwards, numbered by how many
+    files are done. A run that completes deletes its journal, so a journal
+    on disk is always of an interrupted run. Every line is flushed as it is
+    written; a line torn by a crash is skipped when the journal is read back.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.settings: Optional[Dict[str, Any]] = None
+        self.input_hashes: Dict[str, str] = {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.summary: Optional[Dict[str, Any]] = None
+        self._file = None
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                kind = record.pop('type', None)
+                if kind == 'run':
+                    self.settings = record
+                elif kind == 'inputs':
+                    self.input_hashes.update(record['hashes'])
+                elif kind == 'file':
+                    self.entries[record['file']] = record
+                elif kind == 'end':
+                    self.summary = record
+
+    def _append(self, *records: Dict[str, Any]):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a+', encoding='utf-8')
+            _open_journals.add(os.path.abspath(self.path))
+            # Start on a fresh line if the last attempt died mid-write
+            if self._file.tell() > 0:
+                self._file.seek(self._file.tell() - 1)
+                if self._file.read(1) != '\n':
+                    self._file.write('\n')
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        # Flushed to the OS, which keeps it if this process dies
+        self._file.flush()
+
+    @property
+    def finished(self) -> bool:
+        return self.summary is not None
+
+    def begin(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Write the settings of a new journal, or check a resumed one's; returns the journal's settings.
+
+        Raises JournalMismatch if a resumed journal's RESUME_KEYS differ from settings.
+        """
+        if self.settings is None:
+            self.settings = dict(settings)
+            header = {'type': 'header', 'mode': settings.get('mode'), 'engine': settings.get('engine'),
+                      'file_count': len(settings.get('files', ())),
+                      'session_timestamp': settings.get('session_timestamp')}
+            self._append(header, {'type': 'run', **self.settings})
+            return self.settings
+
+        changed = [key for key in RESUME_KEYS if self.settings.get(key) != settings.get(key)]
+        if changed:
+            raise JournalMismatch(f"Journal {os.path.basename(self.path)} belongs to a different run "
+                             f"({', '.join(changed)} changed)")
+        if self.summary is not None:
+            self.summary = None
+        return self.settings
+
+    def record_inputs(self, hashes: Dict[str, str]):
+        """Content hashes of files about to be processed; the first hash seen for a file is kept"""
+        new = {path: content_hash for path, content_hash in hashes.items() if path not in self.input_hashes}
+        if new:
+            self.input_hashes.update(new)
+            self._append({'type': 'inputs', 'hashes': new})
+
+    def changed_since_start(self, file_path: str, content_hash: str) -> bool:
+        """True if a file no longer has the content it had when the journal first saw it"""
+        recorded = self.input_hashes.get(file_path)
+        return recorded is not None and recorded != content_hash
+
+    def record(self, entry: Dict[str, Any]):
+        """Record a finished file from its run_documents result entry"""
+        if entry['status'] not in DONE_STATUSES:
+            return
+        file_path = entry['file']
+        record = {'file': file_path, 'status': entry['status'], 'replacements': entry['replacements'],
+                  'output': entry['output'], 'parts': entry.get('parts') or {},
+                  'input_hash': self.input_hashes.get(file_path), 'stat': _stat_pair(file_path),
+                  'output_stat': None, 'output_hash': None, 'finished': time.time(),
+                  'done': len(self.entries) + (file_path not in self.entries)}
+        if entry['output'] == file_path:
+            # Rewritten in place: remember the new content so a resume can recognize it
+            record['output_hash'] = hash_file(file_path)
+        elif entry['output']:
+            record['output_stat'] = _stat_pair(entry['output'])
+        self.entries[file_path] = record
+        self._append({'type': 'file', **record})
+
+    def completed(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """The journal entry of a file that is still in the state the run left it in, or None"""
+        entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        if _stat_pair(file_path) != entry['stat']:
+            # Touched since (copied back, restored): compare content instead
+            expected = entry['output_hash'] if entry['output'] == file_path else entry['input_hash']
+            try:
+                if expected is None or hash_file(file_path) != expected:
+                    return None
+            except OSError:
+                return None
+        if entry['output'] and entry['output'] != file_path and _stat_pair(entry['output']) != entry['output_stat']:
+            return None
+        return entry
+
+    def finish(self, summary: Dict[str, Any]):
+        """Mark the run complete: nothing is left to resume, so the journal is deleted"""
+        self.summary = dict(summary)
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            _open_journals.discard(os.path.abspath(self.path))
+
+
+def new_journal_path(directory: str = DEFAULT_JOURNAL_DIR) -> str:
+    return os.path.join(directory, f"run_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{time.time_ns() % 10**6:06d}.jsonl")
+
+
+def _last_record(f, block_size: int = 1 << 16) -> Optional[Dict[str, Any]]:
+    """The last complete JSON line of a journal, read backwards from the end"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    tail = b''
+    while end > 0:
+        start = max(0, end - block_size)
+        f.seek(start)
+        tail = f.read(end - start) + tail
+        end = start
+        lines = tail.split(b'\n')
+        # lines[0] may be cut short unless the start of the file was reached
+        for line in reversed(lines if end == 0 else lines[1:]):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+    return None
+
+
+def interrupted_journals(directory: str = DEFAULT_JOURNAL_DIR) -> List[Dict[str, Any]]:
+    """Runs that started but never finished, newest first; runs still in progress are left out.
+
+    Only each journal's header line and last line are read, never the full
+    settings; entries hold path, header (mode, engine, file_count,
+    session_timestamp) and done (files finished so far).
+    """
+    journals = []
+    for path in sorted(glob.glob(os.path.join(directory, 'run_*.jsonl')), key=os.path.getmtime, reverse=True):
+        if os.path.abspath(path) in _open_journals:
+            continue
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                last = _last_record(f)
+        except (OSError, ValueError):
+            continue
+        if header.pop('type', None) != 'header':
+            continue
+        done = last.get('done', 0) if last and last.get('type') == 'file' else 0
+        journals.append({'path': path, 'header': header, 'done': done})
+    return journals
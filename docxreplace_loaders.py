@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+DocXReplace v3.0 - File Loaders
+Copyright 2025 Hrishik Kunduru. All rights reserved.
+
+Streamlit-free discovery of the documents to process, shared by the web app and the CLI.
+"""
+
+import fnmatch
+import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, IO
+from docxreplace_cache import hash_file
+
+EXCEL_PATH_COLUMN = 'File Path'
+
+# Existence checks are I/O bound (network shares), so a thread pool overlaps their latency
+EXISTS_CHECK_WORKERS = 16
+EXCEL_BATCH_SIZE = 500
+
+# Folder scanning: default rules reproduce the .docx / no-lock-file filter. The exclude
+# names a file type, so folders whose names start with '~' are still scanned
+DEFAULT_INCLUDE = ('*.docx',)
+DEFAULT_EXCLUDE = ('~*.docx',)
+SCAN_WORKERS = 8
+SCAN_BATCH_SIZE = 500
+
+
+class FileManifest:
+    """Loaded documents with size and mtime captured once at load time.
+
+    Behaves like the list of paths it replaces (len, iteration, indexing,
+    truthiness), but keeps stat data in typed arrays and a running total so
+    stats never touch the filesystem. Content hashes are computed on demand
+    and reused while the file's size and mtime are unchanged.
+    """
+
+    __slots__ = ('paths', 'sizes', 'mtimes', 'total_size', '_hashes')
+
+    def __init__(self, records: Iterable[Tuple[str, int, int]] = ()):
+        self.paths = []
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        self.total_size = 0
+        self._hashes = {}
+        for path, size, mtime_ns in records:
+            self.add(path, size, mtime_ns)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getitem__(self, index):
+        return self.paths[index]
+
+    def add(self, path: str, size: Optional[int] = None, mtime_ns: Optional[int] = None):
+        """Append a file, statting it only if the caller has no stat data"""
+        if size is None or mtime_ns is None:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.paths.append(path)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        self.total_size += size
+
+    def extend(self, records: Iterable[Tuple[str, int, int]]):
+        for path, size, mtime_ns in records:
+            self.add(path, size, mtime_ns)
+
+    def content_hash(self, index: int) -> str:
+        """SHA-256 of a file, cached until its size or mtime changes"""
+        stat = os.stat(self.paths[index])
+        cached = self._hashes.get(index)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        content_hash = hash_file(self.paths[index])
+        self._hashes[index] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return content_hash
+
+
+def _stat_record(path: str) -> Optional[Tuple[str, int, int]]:
+    """(path, size, mtime_ns) for an existing file, None otherwise"""
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def _matches_any(patterns: Tuple[str, ...], name: str, rel_path: str) -> bool:
+    """True if a glob matches the entry: globs with a '/' its path below the scan root, others its name"""
+    return any(fnmatch.fnmatch(rel_path if '/' in pattern else name, pattern) for pattern in patterns)
+
+
+def _scan_directory(path: str, rel_path: str, include: Tuple[str, ...],
+                    exclude: Tuple[str, ...]) -> Tuple[List[Tuple[str, int, int]], List[Tuple[str, str]], bool]:
+    """One directory level: (matching file records, subdirectories to descend into, read error)"""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                entry_rel = f"{rel_path}/{entry.name}" if rel_path else entry.name
+                if _matches_any(exclude, entry.name, entry_rel):
+                    continue
+                # DirEntry answers these from the directory listing, without an extra stat
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, entry_rel))
+                elif entry.is_file() and _matches_any(include, entry.name, entry_rel):
+                    # Free on Windows (cached from the listing); one stat per match elsewhere
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    except OSError:
+        return files, subdirs, True
+    return files, subdirs, False
+
+
+def scan_folder(folder_path: str, include: Tuple[str, ...] = DEFAULT_INCLUDE,
+                exclude: Tuple[str, ...] = DEFAULT_EXCLUDE, max_depth: Optional[int] = None,
+                on_batch: Optional[Callable[[List[Tuple[str, int, int]], Dict[str, int]], None]] = None,
+                batch_size: int = SCAN_BATCH_SIZE, max_workers: int = SCAN_WORKERS) -> FileManifest:
+    """Manifest of all matching documents under folder_path, sorted by path.
+
+    Directories are listed concurrently on a thread pool. Include globs
+    select files; exclude globs drop files and prune whole directories.
+    A glob containing '/' is matched against the entry's path relative to
+    folder_path, any other glob against the entry name alone. max_depth None scans the whole tree, 0 only folder_path
+    itself, N the folders up to N levels below it. on_batch
+    receives (path, size, mtime_ns) records in batches (in discovery order)
+    with running counts, before the whole tree has been walked.
+    """
+    include = tuple(include) or DEFAULT_INCLUDE
+    exclude = tuple(exclude)
+    loaded_files = []
+    batch = []
+    counts = {'found': 0, 'folders': 0, 'errors': 0}
+
+    def flush():
+        nonlocal batch
+        if on_batch and batch:
+            on_batch(batch, dict(counts))
+        batch = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {pool.submit(_scan_directory, folder_path, '', include, exclude): 0}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = running.pop(future)
+                files, subdirs, failed = future.result()
+                counts['folders'] += 1
+                counts['errors'] += failed
+                counts['found'] += len(files)
+                loaded_files.extend(files)
+                batch.extend(files)
+
+                if max_depth is None or depth < max_depth:
+                    for sub_path, sub_rel in subdirs:
+                        running[pool.submit(_scan_directory, sub_path, sub_rel, include, exclude)] = depth + 1
+
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+
+    loaded_files.sort()
+    return FileManifest(loaded_files)
+
+
+def iter_excel_paths(excel_source: Union[str, IO[bytes]], column: str = EXCEL_PATH_COLUMN) -> Iterator[str]:
+    """Stream one column of the report's first sheet without loading the rest of the workbook"""
+    from openpyxl import load_workbook  # only needed for Excel input
+
+    workbook = load_workbook(excel_source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        if column not in header:
+            raise ValueError(f"Excel file must contain '{column}' column")
+
+        col = header.index(column) + 1
+        for (value,) in sheet.iter_rows(min_row=2, min_col=col, max_col=col, values_only=True):
+            if value is not None and str(value).strip():
+                yield str(value).strip()
+    finally:
+        workbook.close()
+
+
+def read_excel_paths(excel_source: Union[str, IO[bytes]],
+                     on_batch: Optional[Callable[[List[Tuple[str, int, int]], Dict[str, int]], None]] = None,
+                     batch_size: int = EXCEL_BATCH_SIZE,
+                     max_workers: int = EXISTS_CHECK_WORKERS) -> Tuple[FileManifest, Dict[str, int]]:
+    """Manifest of the existing, de-duplicated paths listed in a DocXScan Excel report.
+
+    Paths are statted in batches on a bounded thread pool (the stat doubles
+    as the existence check); on_batch receives each batch of records along
+    with the running counts, so callers can publish results before the
+    whole report has been read.
+    """
+    loaded_files = FileManifest()
+    counts = {'found': 0, 'missing': 0, 'duplicates': 0}
+    seen = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def check(batch):
+            existing = [record for record in pool.map(_stat_record, batch) if record is not None]
+            loaded_files.extend(existing)
+            counts['found'] += len(existing)
+            counts['missing'] += len(batch) - len(existing)
+            if on_batch:
+                on_batch(existing, dict(counts))
+
+        batch = []
+        for path in iter_excel_paths(excel_source):
+            key = os.path.normcase(os.path.normpath(path))
+            if key in seen:
+                counts['duplicates'] += 1
+                continue
+            seen.add(key)
+            batch.append(path)
+            if len(batch) >= batch_size:
+                check(batch)
+                batch = []
+        if batch:
+            check(batch)
+
+    return loaded_files, counts
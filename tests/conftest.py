@@ -0,0 +1,15 @@
+"""Make the top-level docxreplace_* modules importable from the tests, and shared fixtures"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Six generated documents with tokens in body text, tables and headers"""
+    from docxreplace_bench import generate_corpus
+    return generate_corpus(str(tmp_path / 'in'), documents=6, paragraphs=20, tables=1, seed=11)
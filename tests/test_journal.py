@@ -0,0 +1,94 @@
+"""Run journal: resuming interrupted runs without redoing or double-applying finished files"""
+
+import os
+
+import pytest
+from docx import Document
+
+from docxreplace_bench import BENCH_LITERAL_MAP
+from docxreplace_engine import run_documents, COPIES_MODE, IN_PLACE_MODE, DOCX_ENGINE, XML_ENGINE
+from docxreplace_journal import RunJournal, JournalMismatch, interrupted_journals
+
+
+def texts(file_path):
+    doc = Document(file_path)
+    return ([p.text for p in doc.paragraphs]
+            + [p.text for section in doc.sections for p in section.header.paragraphs])
+
+
+def cancel_after(files_done):
+    calls = []
+
+    def checkpoint():
+        calls.append(None)
+        return len(calls) > files_done
+    return checkpoint
+
+
+@pytest.mark.parametrize('engine', [DOCX_ENGINE, XML_ENGINE])
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_copies_resume_after_cancel(corpus, tmp_path, engine, pipelined):
+    reference = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'reference'),
+                              engine=engine)
+
+    output = str(tmp_path / 'out')
+    journal_path = str(tmp_path / 'journals' / 'run_test.jsonl')
+    journal = RunJournal(journal_path)
+    first = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, output, engine=engine,
+                          checkpoint=cancel_after(2), journal=journal, pipelined=pipelined)
+    journal.close()
+    assert first['cancelled'] and first['processed_files'] == 2
+    [listed] = interrupted_journals(str(tmp_path / 'journals'))
+    assert (listed['done'], listed['header']['file_count'], listed['header']['mode']) == (2, len(corpus), COPIES_MODE)
+
+    journal = RunJournal(journal_path)
+    resumed = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, output, engine=engine,
+                            journal=journal, pipelined=pipelined)
+    journal.close()
+
+    assert resumed['resumed_files'] == 2
+    assert resumed['total_replacements'] == reference['total_replacements']
+    assert resumed['output_dir'] == first['output_dir']
+    # Every input has exactly one copy, and the journal of the completed run is gone
+    outputs = [entry['output'] for entry in resumed['files'] if entry['output']]
+    assert sorted(os.listdir(resumed['output_dir'])) == sorted(os.path.basename(path) for path in outputs)
+    assert len(outputs) == len(corpus)
+    assert [texts(path) for path in outputs] == \
+           [texts(entry['output']) for entry in reference['files'] if entry['output']]
+    assert not os.path.exists(journal_path)
+
+
+def test_in_place_resume_never_replaces_twice(corpus, tmp_path):
+    chained = {'<<FileService.': '<<FileService.X'}
+    journal_path = str(tmp_path / 'run_test.jsonl')
+    journal = RunJournal(journal_path)
+    run_documents(corpus, chained, False, IN_PLACE_MODE, checkpoint=cancel_after(2), journal=journal)
+    journal.close()
+
+    # An attempt that replaced a file but died before journaling it
+    unrecorded = corpus[2]
+    run_documents([unrecorded], chained, False, IN_PLACE_MODE)
+    after_crash = texts(unrecorded)
+
+    journal = RunJournal(journal_path)
+    resumed = run_documents(corpus, chained, False, IN_PLACE_MODE, journal=journal)
+    journal.close()
+
+    statuses = {os.path.basename(entry['file']): entry['status'] for entry in resumed['files']}
+    assert resumed['resumed_files'] == 2
+    assert statuses[os.path.basename(unrecorded)] == 'skipped'
+    assert texts(unrecorded) == after_crash
+    for file_path in corpus:
+        assert all('<<FileService.XX' not in text for text in texts(file_path))
+
+
+def test_resume_refuses_other_settings(corpus, tmp_path):
+    journal_path = str(tmp_path / 'run_test.jsonl')
+    journal = RunJournal(journal_path)
+    run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'out'),
+                  checkpoint=cancel_after(1), journal=journal)
+    journal.close()
+
+    with pytest.raises(JournalMismatch):
+        run_documents(corpus, {'other': 'map'}, False, COPIES_MODE, str(tmp_path / 'out'),
+                      journal=RunJournal(journal_path))
@@ -0,0 +1,32 @@
+"""Folder scanning rules shared by the web app and the CLI"""
+
+import os
+
+from docxreplace_loaders import scan_folder
+
+
+def make_tree(root, *relative_paths):
+    for relative_path in relative_paths:
+        file_path = os.path.join(root, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b'docx')
+
+
+def scanned(root, **kwargs):
+    return sorted(os.path.relpath(path, root).replace(os.sep, '/') for path in scan_folder(str(root), **kwargs))
+
+
+def test_max_depth_counts_levels_below_the_root(tmp_path):
+    make_tree(tmp_path, 'top.docx', 'a/one.docx', 'a/b/two.docx')
+    assert scanned(tmp_path) == ['a/b/two.docx', 'a/one.docx', 'top.docx']
+    assert scanned(tmp_path, max_depth=0) == ['top.docx']
+    assert scanned(tmp_path, max_depth=1) == ['a/one.docx', 'top.docx']
+    # A glob with a '/' is matched against the relative path
+    assert scanned(tmp_path, exclude=['a/b']) == ['a/one.docx', 'top.docx']
+
+
+def test_default_exclude_skips_lock_files_not_tilde_folders(tmp_path):
+    make_tree(tmp_path, 'report.docx', '~$report.docx', '~docxreplace_tmp.docx', '~archive/old.docx', 'notes.txt')
+    assert scanned(tmp_path) == ['report.docx', '~archive/old.docx']
+    assert scanned(tmp_path, exclude=['~*']) == ['report.docx']
@@ -0,0 +1,82 @@
+"""LiteralMatcher against the sequential str.replace loop it replaces"""
+
+import random
+
+import pytest
+
+from docxreplace_engine import LiteralMatcher, apply_edits
+from docxreplace_bench import BENCH_LITERAL_MAP
+
+
+def sequential_literal(replacement_map, text):
+    for old_text, new_text in replacement_map.items():
+        if old_text:
+            text = text.replace(old_text, new_text)
+    return text
+
+
+def rounds_text(matcher, text):
+    for edits in matcher.edit_rounds(text):
+        text = apply_edits(text, edits)
+    return text
+
+
+def random_text(rng, alphabet, length):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_literal_matcher_matches_sequential_replace(seed):
+    rng = random.Random(seed)
+    # A tiny alphabet makes overlapping, nested and chained keys common
+    replacement_map = {}
+    for _ in range(rng.randint(1, 6)):
+        replacement_map[random_text(rng, 'abc', rng.randint(1, 3))] = random_text(rng, 'abcd', rng.randint(0, 3))
+    matcher = LiteralMatcher(replacement_map)
+
+    for _ in range(25):
+        text = random_text(rng, 'abcd ', rng.randint(0, 30))
+        expected = sequential_literal(replacement_map, text)
+        assert matcher.sub(text) == expected, (replacement_map, text)
+        assert rounds_text(matcher, text) == expected, (replacement_map, text)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_literal_matcher_replacement_inside_a_later_key(seed):
+    rng = random.Random(seed)
+    # Values cut from the middle of other keys: replacing one token completes another
+    keys = [random_text(rng, 'abc', rng.randint(3, 5)) for _ in range(rng.randint(2, 4))]
+    replacement_map = {'Q': 'R', 'xRy': 'Z'}
+    for key in keys:
+        other = rng.choice(keys)
+        start = rng.randint(1, len(other) - 2)
+        replacement_map[key] = other[start:rng.randint(start + 1, len(other) - 1)]
+    matcher = LiteralMatcher(replacement_map)
+    assert not matcher.order_independent
+
+    for _ in range(25):
+        text = random_text(rng, 'abcQRxy ', rng.randint(0, 30))
+        expected = sequential_literal(replacement_map, text)
+        assert matcher.sub(text) == expected, (replacement_map, text)
+        assert rounds_text(matcher, text) == expected, (replacement_map, text)
+
+
+def test_literal_matcher_replacement_completing_a_key():
+    matcher = LiteralMatcher({'Q': 'R', 'xRy': 'Z'})
+    assert not matcher.order_independent
+    assert matcher.sub('xQy') == rounds_text(matcher, 'xQy') == 'Z'
+
+
+def test_literal_matcher_chained_and_overlapping_keys():
+    replacement_map = {'<<A>>': '<<B>>', '<<B>>': '<<C>>', 'A>': 'x', '': 'ignored'}
+    matcher = LiteralMatcher(replacement_map)
+    for text in ('<<A>> <<B>>', '<<A>><<A>>', 'A> <<A', ''):
+        assert matcher.sub(text) == sequential_literal(replacement_map, text)
+        assert rounds_text(matcher, text) == sequential_literal(replacement_map, text)
+
+
+def test_literal_matcher_on_bench_map():
+    matcher = LiteralMatcher(BENCH_LITERAL_MAP)
+    text = "Call <<FileService.Open>> then </ff><c><u>x</u></pp> <i>y</i> <<FileService."
+    assert matcher.sub(text) == sequential_literal(BENCH_LITERAL_MAP, text)
+    assert rounds_text(matcher, text) == sequential_literal(BENCH_LITERAL_MAP, text)
@@ -0,0 +1,57 @@
+"""Modified copies: names reserved in memory, each copy written once"""
+
+import os
+
+from docx import Document
+
+import docxreplace_engine
+from docxreplace_engine import OutputRegistry, run_documents, COPIES_MODE
+
+
+def test_same_names_get_suffixes_without_touching_disk(tmp_path):
+    outputs = OutputRegistry(str(tmp_path), '20250101_000000')
+    reserved = [outputs.reserve(os.path.join(folder, 'Notice.docx')) for folder in ('a', 'b', 'c')]
+    assert [os.path.basename(path) for path in reserved] == ['Notice.docx', 'Notice_1.docx', 'Notice_2.docx']
+    assert {os.path.dirname(path) for path in reserved} == {str(tmp_path / 'modified_20250101_000000')}
+    assert os.listdir(outputs.output_dir) == []
+
+
+def test_existing_outputs_are_not_overwritten(tmp_path):
+    existing = tmp_path / 'modified_20250101_000000'
+    existing.mkdir()
+    (existing / 'Notice.docx').write_bytes(b'earlier run')
+    outputs = OutputRegistry(str(tmp_path), '20250101_000000')
+    assert os.path.basename(outputs.reserve('Notice.docx')) == 'Notice_1.docx'
+
+
+def test_mirror_root_keeps_subfolders(tmp_path):
+    outputs = OutputRegistry(str(tmp_path / 'out'), '20250101_000000', mirror_root=str(tmp_path / 'in'))
+    root = outputs.reserve(str(tmp_path / 'in' / 'top.docx'))
+    nested = outputs.reserve(str(tmp_path / 'in' / 'x' / 'y' / 'deep.docx'))
+    outside = outputs.reserve(str(tmp_path / 'elsewhere' / 'far.docx'))
+    base = str(tmp_path / 'out' / 'modified_20250101_000000')
+    assert root == os.path.join(base, 'top.docx')
+    assert nested == os.path.join(base, 'x', 'y', 'deep.docx')
+    assert outside == os.path.join(base, 'far.docx')
+
+
+def test_copies_are_written_once(tmp_path, monkeypatch):
+    sources = []
+    for folder in ('a', 'b'):
+        os.makedirs(tmp_path / 'in' / folder)
+        doc = Document()
+        doc.add_paragraph(f"Dear <<Name>> from {folder}")
+        sources.append(str(tmp_path / 'in' / folder / 'Notice.docx'))
+        doc.save(sources[-1])
+    originals = [open(path, 'rb').read() for path in sources]
+
+    def no_copy(*args, **kwargs):
+        raise AssertionError("a modified copy was copied before being written")
+    monkeypatch.setattr(docxreplace_engine.shutil, 'copyfile', no_copy)
+    monkeypatch.setattr(docxreplace_engine.shutil, 'copy2', no_copy)
+
+    results = run_documents(sources, {'<<Name>>': 'Ada'}, False, COPIES_MODE, str(tmp_path / 'out'))
+    assert [os.path.basename(entry['output']) for entry in results['files']] == ['Notice.docx', 'Notice_1.docx']
+    assert [Document(entry['output']).paragraphs[0].text for entry in results['files']] == \
+           ['Dear Ada from a', 'Dear Ada from b']
+    assert [open(path, 'rb').read() for path in sources] == originals
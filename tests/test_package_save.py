@@ -0,0 +1,63 @@
+"""Minimal-rewrite saves: members without replacements are copied without recompressing"""
+
+import os
+import zipfile
+
+from docx import Document
+
+from docxreplace_bench import BENCH_LITERAL_MAP
+from docxreplace_engine import (run_archive, save_changed_parts, DocumentProcessor, compile_replacement_map,
+                                COPIES_MODE)
+
+
+def test_save_changed_parts_copies_other_members_raw(corpus, tmp_path):
+    source = corpus[0]
+    doc = Document(source)
+    parts = {}
+    DocumentProcessor.perform_replacement_in_doc(doc, source, {}, matcher=compile_replacement_map(BENCH_LITERAL_MAP),
+                                                 parts=parts)
+    assert parts
+
+    output = str(tmp_path / 'out.docx')
+    assert save_changed_parts(doc, source, output, parts)
+
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output) as zout:
+        assert zout.testzip() is None
+        assert zin.namelist() == zout.namelist()
+        for info in zin.infolist():
+            if info.filename.startswith('word/') and info.filename[5:-4] in parts:
+                continue
+            copied = zout.getinfo(info.filename)
+            assert (copied.compress_type, copied.CRC, copied.compress_size) == \
+                   (info.compress_type, info.CRC, info.compress_size)
+    assert Document(output).paragraphs[0].text == doc.paragraphs[0].text
+
+
+def test_run_archive_copies_untouched_members_raw(corpus, tmp_path):
+    plain = str(tmp_path / 'plain.docx')
+    doc = Document()
+    doc.add_paragraph("Nothing to replace here")
+    doc.save(plain)
+    source = str(tmp_path / 'in.zip')
+    # Not the output's compression level, so recompressed members would show
+    with zipfile.ZipFile(source, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr('notes/', b'')
+        zf.writestr('notes/readme.txt', b'not a document ' * 200)
+        for file_path in corpus:
+            zf.write(file_path, 'docs/' + os.path.basename(file_path))
+        zf.write(plain, 'docs/plain.docx')
+
+    output = str(tmp_path / 'out.zip')
+    results = run_archive(source, {'no such text': 'x', '<<FileService.': '<<FS.'}, False, COPIES_MODE, output)
+    assert results['modified_files'] == len(corpus)
+
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output) as zout:
+        assert zout.testzip() is None
+        assert zin.namelist() == zout.namelist()
+        for info in zin.infolist():
+            copied = zout.getinfo(info.filename)
+            if info.filename.startswith('docs/bench_'):
+                assert zout.read(copied) != zin.read(info)
+                continue
+            assert (copied.compress_type, copied.CRC, copied.compress_size) == \
+                   (info.compress_type, info.CRC, info.compress_size)
@@ -0,0 +1,42 @@
+"""Regex time budget: quarantined patterns and what the run keeps of their results"""
+
+import os
+
+import pytest
+from docx import Document
+
+from docxreplace_cache import ResultCache
+from docxreplace_engine import run_documents, COPIES_MODE
+
+# Exponential on a run of a's that does not end the text
+BACKTRACKING_MAP = {r'(a+)+$': 'X'}
+
+
+def write_document(file_path, *paragraphs):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(file_path)
+    return file_path
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_results_after_a_quarantine_are_not_cached(tmp_path, pipelined):
+    slow = write_document(str(tmp_path / 'a_slow.docx'), 'a' * 40 + '!')
+    plain = write_document(str(tmp_path / 'b_plain.docx'), 'aaa')
+    os.makedirs(tmp_path / 'out')
+
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    try:
+        guarded = run_documents([slow, plain], BACKTRACKING_MAP, True, COPIES_MODE, str(tmp_path / 'out'),
+                                result_cache=cache, regex_budget=0.5, pipelined=pipelined)
+        assert guarded['quarantined_patterns'] == [r'(a+)+$']
+        assert guarded['total_replacements'] == 0
+
+        # Without the slow document the pattern is never quarantined
+        rerun = run_documents([plain], BACKTRACKING_MAP, True, COPIES_MODE, str(tmp_path / 'out'),
+                              result_cache=cache, regex_budget=0.5, pipelined=pipelined)
+        assert rerun['cache_hits'] == 0
+        assert rerun['total_replacements'] == 1
+    finally:
+        cache.close()
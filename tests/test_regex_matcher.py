@@ -0,0 +1,67 @@
+"""RegexMatcher against the sequential re.sub loop it replaces"""
+
+import random
+import re
+
+import pytest
+
+from docxreplace_engine import RegexMatcher, apply_edits
+from docxreplace_bench import BENCH_REGEX_MAP
+
+
+def sequential_regex(replacement_map, text):
+    """The original per-paragraph regex loop, {{match}} templates included"""
+    for old_text, new_text in replacement_map.items():
+        if "{{match}}" in new_text:
+            def replace_with_match(match, new_text=new_text):
+                replacement = new_text
+                if match.groups():
+                    for group in match.groups():
+                        replacement = replacement.replace("{{match}}", group, 1)
+                else:
+                    replacement = replacement.replace("{{match}}", match.group(0))
+                return replacement
+            text = re.sub(old_text, replace_with_match, text)
+        else:
+            text = re.sub(old_text, new_text, text)
+    return text
+
+
+def rounds_text(matcher, text):
+    for edits in matcher.edit_rounds(text):
+        text = apply_edits(text, edits)
+    return text
+
+
+def random_text(rng, alphabet, length):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+REGEX_MAPS = [
+    BENCH_REGEX_MAP,
+    {r'a+': 'b', r'b{2}': 'A', r'(c)(d)?': r'<\1>'},
+    {r'^a': 'start', r'a$': 'end', r'\s+': ' '},
+    {r'(a)(b)': '{{match}}-{{match}}', r'x*': '.', r'c|d': '{{match}}{{match}}'},
+    {r'(?i)AB': 'ba', r'b(?=a)': 'B', r'(?<=c)a': 'C'},
+]
+
+
+@pytest.mark.parametrize('map_idx', range(len(REGEX_MAPS)))
+@pytest.mark.parametrize('merge', [True, False])
+def test_regex_matcher_matches_sequential_sub(map_idx, merge):
+    replacement_map = REGEX_MAPS[map_idx]
+    matcher = RegexMatcher(replacement_map, merge=merge)
+    rng = random.Random(map_idx)
+    texts = ['', '<<FileService.Open>> [[MCOMPUTEINTO( PROMTX( <b> </b>']
+    texts += [random_text(rng, 'abcdx <>/[]', rng.randint(0, 25)) for _ in range(60)]
+
+    for text in texts:
+        expected = sequential_regex(replacement_map, text)
+        assert matcher.sub(text) == expected, (replacement_map, text)
+        assert rounds_text(matcher, text) == expected, (replacement_map, text)
+
+
+def test_regex_matcher_reports_invalid_patterns():
+    matcher = RegexMatcher({'(unclosed': 'x', 'ok': 'fine'})
+    assert [pattern for pattern, _ in matcher.invalid] == ['(unclosed']
+    assert matcher.sub('ok (unclosed') == 'fine (unclosed'
@@ -0,0 +1,35 @@
+"""Result cache: runs reuse results for unchanged (content, map) pairs"""
+
+import shutil
+
+from docx import Document
+
+from docxreplace_bench import BENCH_LITERAL_MAP
+from docxreplace_cache import ResultCache
+from docxreplace_engine import run_documents, COPIES_MODE
+
+
+def test_result_cache_hits_until_map_or_file_changes(corpus, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.db'))
+    try:
+        first = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'a'), result_cache=cache)
+        again = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'b'), result_cache=cache)
+        assert (first['cache_hits'], again['cache_hits']) == (0, len(corpus))
+        assert again['total_replacements'] == first['total_replacements']
+
+        other_map = dict(BENCH_LITERAL_MAP, extra='value')
+        changed = run_documents(corpus, other_map, False, COPIES_MODE, str(tmp_path / 'c'), result_cache=cache)
+        assert changed['cache_hits'] == 0
+
+        # Keyed by content: a copy of a cached document still hits, an edited one does not
+        shutil.copyfile(corpus[1], corpus[0])
+        copied = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'd'), result_cache=cache)
+        assert copied['cache_hits'] == len(corpus)
+
+        doc = Document(corpus[0])
+        doc.add_paragraph("<<FileService.Edited>>")
+        doc.save(corpus[0])
+        edited = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'e'), result_cache=cache)
+        assert edited['cache_hits'] == len(corpus) - 1
+    finally:
+        cache.close()
@@ -0,0 +1,101 @@
+"""Run-level splicing in the python-docx engine"""
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from docxreplace_engine import DocumentProcessor, compile_replacement_map
+
+
+def replace(doc, replacement_map, splice_runs=True):
+    matcher = compile_replacement_map(replacement_map, False)
+    return DocumentProcessor.perform_replacement_in_doc(doc, '', {}, matcher=matcher, splice_runs=splice_runs)
+
+
+def run_content(paragraph):
+    """(tag, text) of every text-bearing run child, in document order"""
+    content = []
+    for run in paragraph._p.iter(qn('w:r')):
+        for child in run:
+            if child.tag in (qn('w:t'), qn('w:br'), qn('w:tab')):
+                content.append((child.tag.split('}')[1], child.text or ''))
+    return content
+
+
+def test_line_breaks_and_tabs_become_elements():
+    doc = Document()
+    paragraph = doc.add_paragraph('Hello </pp>World')
+    paragraph.add_run(' a</tt>b ').bold = True
+
+    replace(doc, {'</pp>': '\n', '</tt>': '\t'})
+
+    assert paragraph.text == 'Hello \nWorld a\tb '
+    assert all('\n' not in text and '\t' not in text for _, text in run_content(paragraph))
+    assert run_content(paragraph) == [('t', 'Hello '), ('br', ''), ('t', 'World'),
+                                      ('t', ' a'), ('tab', ''), ('t', 'b ')]
+    assert paragraph.runs[1].bold
+
+
+def test_breaks_match_paragraph_rewrite():
+    spliced, rewritten = Document(), Document()
+    for doc in (spliced, rewritten):
+        doc.add_paragraph('one</pp>two\r</tt>three')
+
+    replace(spliced, {'</pp>': '\n', '</tt>': '\t'})
+    replace(rewritten, {'</pp>': '\n', '</tt>': '\t'}, splice_runs=False)
+
+    assert spliced.paragraphs[0].text == rewritten.paragraphs[0].text
+    assert ([tag for tag, _ in run_content(spliced.paragraphs[0]) if tag != 't']
+            == [tag for tag, _ in run_content(rewritten.paragraphs[0]) if tag != 't'])
+
+
+def test_surrounding_whitespace_is_preserved():
+    doc = Document()
+    paragraph = doc.add_paragraph('x<<A>>y')
+
+    replace(doc, {'x<<A>>': ' lead', 'y': 'trail\t'})
+
+    texts = [element for element in paragraph._p.iter(qn('w:t'))]
+    assert all(element.get(qn('xml:space')) == 'preserve' for element in texts if element.text != element.text.strip())
+    assert paragraph.text == ' leadtrail\t'
+
+
+def test_token_split_across_formatted_runs():
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    paragraph.add_run('Call <<File').bold = True
+    paragraph.add_run('Service.').italic = True
+    paragraph.add_run('Open>> now')
+    tail = paragraph.add_run(' and keep')
+    tail.underline = True
+
+    replace(doc, {'<<FileService.': '<<NewFileService.'})
+
+    assert paragraph.text == 'Call <<NewFileService.Open>> now and keep'
+    runs = paragraph.runs
+    assert len(runs) == 4
+    assert runs[0].bold and runs[1].italic and runs[3].underline
+    assert runs[3].text == ' and keep'
+
+
+def test_splice_segments_reproduces_the_edited_text():
+    import random
+    from docxreplace_engine import LiteralMatcher, apply_edits, splice_segments
+
+    rng = random.Random(7)
+    matcher = LiteralMatcher({'<<A>>': '[x]', 'B>': '', '\t<': '<\n'})
+    for _ in range(200):
+        pieces = [rng.choice(['<<', 'A>', '>', 'B', '>>', 'text ', '<', 'A']) for _ in range(rng.randint(1, 8))]
+        # Split into text segments and kept single-character elements (tabs)
+        segments = []
+        for piece in pieces:
+            segments.append(('\t', False) if rng.random() < 0.15 else (piece, True))
+        text = ''.join(segment for segment, _ in segments)
+        rounds = matcher.edit_rounds(text)
+        modified = text
+        for edits in rounds:
+            modified = apply_edits(modified, edits)
+
+        new_texts = splice_segments(segments, rounds)
+        if new_texts is not None:
+            assert ''.join(new_texts) == modified
+            assert all(new == old for new, (old, editable) in zip(new_texts, segments) if not editable and new)
@@ -0,0 +1,74 @@
+"""Raw-XML streaming engine: same text as the python-docx engine, written beside its destination"""
+
+import os
+import tempfile
+from io import BytesIO
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+
+from docxreplace_bench import BENCH_LITERAL_MAP, BENCH_REGEX_MAP
+from docxreplace_engine import (XmlStreamProcessor, compile_replacement_map, run_documents,
+                                COPIES_MODE, DOCX_ENGINE, XML_ENGINE)
+
+
+def run_content(paragraph):
+    """(tag, text) of every text-bearing run child, in document order"""
+    content = []
+    for run in paragraph._p.iter(qn('w:r')):
+        for child in run:
+            if child.tag in (qn('w:t'), qn('w:br'), qn('w:tab')):
+                content.append((child.tag.split('}')[1], child.text or ''))
+    return content
+
+
+def texts(file_path):
+    doc = Document(file_path)
+    return ([p.text for p in doc.paragraphs]
+            + [p.text for section in doc.sections for p in section.header.paragraphs])
+
+
+@pytest.mark.parametrize('regex_mode', [False, True])
+def test_xml_engine_matches_docx_engine(corpus, tmp_path, regex_mode):
+    replacement_map = BENCH_REGEX_MAP if regex_mode else BENCH_LITERAL_MAP
+    outputs = {engine: run_documents(corpus, replacement_map, regex_mode, COPIES_MODE, str(tmp_path / engine),
+                                     engine=engine)
+               for engine in (DOCX_ENGINE, XML_ENGINE)}
+    assert outputs[XML_ENGINE]['total_replacements'] == outputs[DOCX_ENGINE]['total_replacements'] > 0
+    assert [texts(entry['output']) for entry in outputs[XML_ENGINE]['files']] == \
+           [texts(entry['output']) for entry in outputs[DOCX_ENGINE]['files']]
+
+
+def test_xml_engine_writes_breaks_like_docx_engine():
+    source = Document()
+    source.add_paragraph('Hello </pp>World')
+    source.add_paragraph().add_run(' a</tt>b')
+    data = BytesIO()
+    source.save(data)
+
+    output = BytesIO()
+    matcher = compile_replacement_map({'</pp>': '\n', '</tt>': '\t'}, False)
+    replacements, _ = XmlStreamProcessor.process_package(BytesIO(data.getvalue()), output, matcher, lambda message: None)
+    result = Document(BytesIO(output.getvalue()))
+
+    assert replacements == 2
+    assert [p.text for p in result.paragraphs] == ['Hello \nWorld', ' a\tb']
+    assert all('\n' not in text and '\t' not in text for p in result.paragraphs for _, text in run_content(p))
+    assert [tag for tag, _ in run_content(result.paragraphs[0])] == ['t', 'br', 't']
+    assert [tag for tag, _ in run_content(result.paragraphs[1])] == ['t', 'tab', 't']
+
+
+def test_xml_copies_stream_beside_their_destination(corpus, tmp_path, monkeypatch):
+    temp_dirs = []
+    mkstemp = tempfile.mkstemp
+
+    def recording_mkstemp(*args, **kwargs):
+        temp_dirs.append(kwargs.get('dir'))
+        return mkstemp(*args, **kwargs)
+    monkeypatch.setattr(tempfile, 'mkstemp', recording_mkstemp)
+
+    results = run_documents(corpus, BENCH_LITERAL_MAP, False, COPIES_MODE, str(tmp_path / 'out'), engine=XML_ENGINE)
+    assert results['modified_files'] == len(corpus)
+    assert set(temp_dirs) == {results['output_dir']}
+    assert sorted(os.listdir(results['output_dir'])) == sorted(os.path.basename(path) for path in corpus)